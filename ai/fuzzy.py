@@ -1,41 +1,283 @@
+import hashlib
+import json
+import os
+import tempfile
+
 import numpy as np
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
+
+from config import FUZZY_CONTROLLER, FUZZY_TABLE_SPEED_STEP, FUZZY_TABLE_CURVE_STEP, FUZZY_TABLE_CACHE_DIR
+from config import FUZZY_TABLE_MAX_ERROR
+
+# Universes (start, stop, step) for inputs and output
+SPEED_UNIVERSE = (0, 16, 0.1)
+CURVE_UNIVERSE = (0, 1.1, 0.01)
+ACCEL_UNIVERSE = (-1, 1.1, 0.01)
+
+# Membership functions => triangle breakpoints [a, b, c]
+SPEED_TERMS = {
+    'slow': [0, 0, 6],
+    'medium': [4, 8, 12],
+    'fast': [10, 15, 15],
+}
+CURVE_TERMS = {
+    'gentle': [0, 0, 0.6],
+    'sharp': [0.4, 1, 1],
+}
+ACCEL_TERMS = {
+    'brake': [-1, -1, 0],
+    'maintain': [-0.5, 0, 0.5],
+    'accelerate': [0, 1, 1],
+}
+
+# Rules => (speed term, curve term, acceleration term)
+RULES = [
+    ('fast', 'sharp', 'brake'),
+    ('fast', 'gentle', 'maintain'),
+    ('slow', 'gentle', 'accelerate'),
+    ('slow', 'sharp', 'maintain'),
+    ('medium', 'sharp', 'brake'),
+    ('medium', 'gentle', 'maintain'),
+]
+
+# Valid input range
+MAX_SPEED = 15.0
+MAX_CURVE = 1.0
 
 def _build_fuzzy_system():
+    # skfuzzy is only needed for the exact reference controller, so it is imported here
+    import skfuzzy as fuzz
+    from skfuzzy import control as ctrl
 
     # Inputs => speed and curve
-    speed = ctrl.Antecedent(np.arange(0, 16, 0.1), 'speed')
-    curve = ctrl.Antecedent(np.arange(0, 1.1, 0.01), 'curve')
+    speed = ctrl.Antecedent(np.arange(*SPEED_UNIVERSE), 'speed')
+    curve = ctrl.Antecedent(np.arange(*CURVE_UNIVERSE), 'curve')
 
     # Output => acceleration prediction
-    acceleration = ctrl.Consequent(np.arange(-1, 1.1, 0.01), 'acceleration')
+    acceleration = ctrl.Consequent(np.arange(*ACCEL_UNIVERSE), 'acceleration')
 
     # Membership functions
-    speed['slow'] = fuzz.trimf(speed.universe, [0, 0, 6])
-    speed['medium'] = fuzz.trimf(speed.universe, [4, 8, 12])
-    speed['fast'] = fuzz.trimf(speed.universe, [10, 15, 15])
-
-    curve['gentle'] = fuzz.trimf(curve.universe, [0, 0, 0.6])
-    curve['sharp'] = fuzz.trimf(curve.universe, [0.4, 1, 1])
-
-    acceleration['brake'] = fuzz.trimf(acceleration.universe, [-1, -1, 0])
-    acceleration['maintain'] = fuzz.trimf(acceleration.universe, [-0.5, 0, 0.5])
-    acceleration['accelerate'] = fuzz.trimf(acceleration.universe, [0, 1, 1])
+    for name, abc in SPEED_TERMS.items():
+        speed[name] = fuzz.trimf(speed.universe, abc)
+    for name, abc in CURVE_TERMS.items():
+        curve[name] = fuzz.trimf(curve.universe, abc)
+    for name, abc in ACCEL_TERMS.items():
+        acceleration[name] = fuzz.trimf(acceleration.universe, abc)
 
     # Rules
-    rule1 = ctrl.Rule(speed['fast'] & curve['sharp'], acceleration['brake'])
-    rule2 = ctrl.Rule(speed['fast'] & curve['gentle'], acceleration['maintain'])
-    rule3 = ctrl.Rule(speed['slow'] & curve['gentle'], acceleration['accelerate'])
-    rule4 = ctrl.Rule(speed['slow'] & curve['sharp'], acceleration['maintain'])
-    rule5 = ctrl.Rule(speed['medium'] & curve['sharp'], acceleration['brake'])
-    rule6 = ctrl.Rule(speed['medium'] & curve['gentle'], acceleration['maintain'])
-
-    acceleration_ctrl = ctrl.ControlSystem([rule1, rule2, rule3, rule4, rule5, rule6])
+    rules = [ctrl.Rule(speed[s] & curve[c], acceleration[a]) for s, c, a in RULES]
+
+    acceleration_ctrl = ctrl.ControlSystem(rules)
     return ctrl.ControlSystemSimulation(acceleration_ctrl)
 
-# Global simulation instance
-_fuzzy_sim = _build_fuzzy_system()
+# Global simulation instance, built on first use
+_fuzzy_sim = None
+
+def compute_fuzzy_acceleration(current_speed: float, road_curvature: float) -> float:
+    """Full skfuzzy inference (slow, exact reference for the table)."""
+    global _fuzzy_sim
+    if _fuzzy_sim is None:
+        _fuzzy_sim = _build_fuzzy_system()
+
+    # Clamping to valid range
+    current_speed = np.clip(current_speed, 0, MAX_SPEED)
+    road_curvature = np.clip(road_curvature, 0, MAX_CURVE)
+
+    _fuzzy_sim.input['speed'] = current_speed
+    _fuzzy_sim.input['curve'] = road_curvature
+    _fuzzy_sim.compute()
+    return float(_fuzzy_sim.output['acceleration'])
+
+
+# -------------------------------------------------
+# Precomputed speed x curvature lookup table
+# -------------------------------------------------
+def _trimf(x, abc):
+    """Triangle membership evaluated on any array (same shape as skfuzzy's trimf)."""
+    a, b, c = abc
+    y = np.zeros_like(x, dtype=np.float64)
+    if a != b:
+        rising = (a < x) & (x < b)
+        y[rising] = (x[rising] - a) / (b - a)
+    if b != c:
+        falling = (b < x) & (x < c)
+        y[falling] = (c - x[falling]) / (c - b)
+    y[x == b] = 1.0
+    return y
+
+def _sampled_mf(x, universe, terms):
+    """Membership of x, interpolated from the mf sampled on the skfuzzy universe."""
+    u = np.arange(*universe)
+    return {name: np.interp(x, u, _trimf(u, abc)) for name, abc in terms.items()}
+
+def _infer_grid(speeds, curves, terms=None, output_points=501, chunk=16):
+    """
+    Vectorized Mamdani inference (min AND, min implication, max aggregation,
+    centroid) over every (speed, curve) pair. The output universe is sampled
+    finer than skfuzzy's so the clipped shapes are resolved almost exactly.
+    terms => (speed, curve, acceleration) term dicts; None => the module's.
+    """
+    speed_terms, curve_terms, accel_terms = terms or (SPEED_TERMS, CURVE_TERMS, ACCEL_TERMS)
+    speed_mf = _sampled_mf(speeds, SPEED_UNIVERSE, speed_terms)
+    curve_mf = _sampled_mf(curves, CURVE_UNIVERSE, curve_terms)
+
+    u = np.arange(*ACCEL_UNIVERSE)
+    out_x = np.union1d(u, np.linspace(u[0], u[-1], output_points))
+    out_mf = _sampled_mf(out_x, ACCEL_UNIVERSE, accel_terms)
+
+    # Activation of each output term: max over rules of min(speed, curve)
+    activation = {name: np.zeros((len(speeds), len(curves))) for name in accel_terms}
+    for s, c, a in RULES:
+        strength = np.minimum.outer(speed_mf[s], curve_mf[c])
+        np.maximum(activation[a], strength, out=activation[a])
+
+    # Defuzzify a few speed rows at a time to bound memory
+    table = np.zeros((len(speeds), len(curves)))
+    dx = np.diff(out_x)
+    for i in range(0, len(speeds), chunk):
+        rows = slice(i, i + chunk)
+        aggregated = np.zeros(activation['brake'][rows].shape + (len(out_x),))
+        for name, mf in out_mf.items():
+            np.maximum(aggregated, np.minimum(activation[name][rows][..., None], mf), out=aggregated)
+
+        # Exact centroid of the piecewise-linear aggregated function
+        y1, y2 = aggregated[..., :-1], aggregated[..., 1:]
+        area = 0.5 * (y1 + y2) * dx
+        moment = dx * (y1 * (2 * out_x[:-1] + out_x[1:]) + y2 * (out_x[:-1] + 2 * out_x[1:])) / 6.0
+        total = area.sum(axis=-1)
+        table[rows] = np.where(total > 0, moment.sum(axis=-1) / np.where(total > 0, total, 1.0), 0.0)
+
+    return table
+
+class FuzzyTable:
+    """
+    Dense speed x curvature surface of the fuzzy controller, queried by
+    bilinear interpolation instead of running skfuzzy every frame.
+    At the default 0.1 x 0.01 grid max_error() stays below
+    FUZZY_TABLE_MAX_ERROR (0.01), checked by tests/test_fuzzy.py (and by
+    python -m ai.fuzzy, which exits non-zero otherwise).
+    terms => (speed, curve, acceleration) term dicts to tabulate other
+    breakpoints than the module's; max_error() always compares to skfuzzy
+    built from the module's terms. values => a previously computed surface
+    for the same grid (see load()), skipping inference.
+    """
+
+    def __init__(self, speed_step=FUZZY_TABLE_SPEED_STEP, curve_step=FUZZY_TABLE_CURVE_STEP, terms=None, values=None):
+        self.speed_step = speed_step
+        self.curve_step = curve_step
+        self.terms = terms
+
+        # Grid nodes always include both ends of the input range
+        self.speeds = np.linspace(0, MAX_SPEED, int(round(MAX_SPEED / speed_step)) + 1)
+        self.curves = np.linspace(0, MAX_CURVE, int(round(MAX_CURVE / curve_step)) + 1)
+        if values is None:
+            values = _infer_grid(self.speeds, self.curves, terms)
+        elif np.shape(values) != (len(self.speeds), len(self.curves)):
+            raise ValueError(f"table of shape {np.shape(values)} does not fit a {speed_step} x {curve_step} grid")
+        self.values = np.asarray(values, dtype=np.float64)
+
+        # Plain Python rows make scalar lookups cheaper than NumPy indexing
+        self._rows = self.values.tolist()
+        self._speed_scale = (len(self.speeds) - 1) / MAX_SPEED
+        self._curve_scale = (len(self.curves) - 1) / MAX_CURVE
+
+    def lookup(self, current_speed: float, road_curvature: float) -> float:
+        """Scalar query, same contract as get_acceleration_action."""
+        s = min(max(current_speed, 0.0), MAX_SPEED) * self._speed_scale
+        c = min(max(road_curvature, 0.0), MAX_CURVE) * self._curve_scale
+
+        i = min(int(s), len(self.speeds) - 2)
+        j = min(int(c), len(self.curves) - 2)
+        ts = s - i
+        tc = c - j
+
+        row0 = self._rows[i]
+        row1 = self._rows[i + 1]
+        top = row0[j] + (row0[j + 1] - row0[j]) * tc
+        bottom = row1[j] + (row1[j + 1] - row1[j]) * tc
+        return top + (bottom - top) * ts
+
+    def lookup_many(self, speeds, curvatures):
+        """Batched query over NumPy arrays; returns an array of commands."""
+        s = np.clip(np.asarray(speeds, dtype=np.float64), 0, MAX_SPEED) * self._speed_scale
+        c = np.clip(np.asarray(curvatures, dtype=np.float64), 0, MAX_CURVE) * self._curve_scale
+
+        i = np.minimum(s.astype(np.intp), len(self.speeds) - 2)
+        j = np.minimum(c.astype(np.intp), len(self.curves) - 2)
+        ts = s - i
+        tc = c - j
+
+        v = self.values
+        top = v[i, j] + (v[i, j + 1] - v[i, j]) * tc
+        bottom = v[i + 1, j] + (v[i + 1, j + 1] - v[i + 1, j]) * tc
+        return top + (bottom - top) * ts
+
+    def save(self, path):
+        """Store the surface as .npy, written to a temp file and renamed into place."""
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=parent, prefix=".tmp-", suffix=".npy")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, self.values)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, speed_step=FUZZY_TABLE_SPEED_STEP, curve_step=FUZZY_TABLE_CURVE_STEP):
+        """A saved surface; neither skfuzzy nor the inference runs."""
+        return cls(speed_step, curve_step, values=np.load(path))
+
+    def max_error(self, samples=2000, seed=0):
+        """Largest absolute difference to skfuzzy over random inputs."""
+        rng = np.random.default_rng(seed)
+        speeds = rng.uniform(0, MAX_SPEED, samples)
+        curves = rng.uniform(0, MAX_CURVE, samples)
+        approx = self.lookup_many(speeds, curves)
+        exact = np.array([compute_fuzzy_acceleration(s, c) for s, c in zip(speeds, curves)])
+        return float(np.max(np.abs(approx - exact)))
+
+# Bump whenever the inference changes; tables cached by older code are then ignored
+TABLE_FORMAT_VERSION = 1
+
+def table_cache_path(cache_dir, speed_step=FUZZY_TABLE_SPEED_STEP, curve_step=FUZZY_TABLE_CURVE_STEP):
+    """Cache file for the module's controller at one grid resolution."""
+    inputs = {
+        "version": TABLE_FORMAT_VERSION,
+        "steps": [speed_step, curve_step],
+        "universes": [SPEED_UNIVERSE, CURVE_UNIVERSE, ACCEL_UNIVERSE],
+        "terms": [SPEED_TERMS, CURVE_TERMS, ACCEL_TERMS],
+        "rules": RULES,
+        "range": [MAX_SPEED, MAX_CURVE],
+    }
+    key = hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()[:20]
+    return os.path.join(cache_dir, f"fuzzy-{key}.npy")
+
+def load_or_build_table(cache_dir=FUZZY_TABLE_CACHE_DIR):
+    """The default table, read from the cache when present, else built and stored there."""
+    if cache_dir is None:
+        return FuzzyTable()
+
+    path = table_cache_path(cache_dir)
+    if os.path.exists(path):
+        try:
+            return FuzzyTable.load(path)
+        except (OSError, ValueError):
+            pass # Unreadable or stale entry => rebuild it below
+    table = FuzzyTable()
+    table.save(path)
+    return table
+
+# Built on first use so the grid resolution can still be changed in config
+_table = None
+
+def get_acceleration_table():
+    global _table
+    if _table is None:
+        _table = load_or_build_table()
+    return _table
+
+def set_acceleration_table(table):
+    """Install a table (e.g. with tuned terms) for this process; None => rebuild the default on next use."""
+    global _table
+    _table = table
 
 def get_acceleration_action(current_speed: float, road_curvature: float) -> float:
     """
@@ -44,11 +286,25 @@ def get_acceleration_action(current_speed: float, road_curvature: float) -> floa
         < 0  → brake
         ≈ 0  → maintain
     """
-    # Clamping to valid range
-    current_speed = np.clip(current_speed, 0, 15)
-    road_curvature = np.clip(road_curvature, 0, 1.0)
+    if FUZZY_CONTROLLER == "table":
+        return get_acceleration_table().lookup(current_speed, road_curvature)
+    return compute_fuzzy_acceleration(current_speed, road_curvature)
 
-    _fuzzy_sim.input['speed'] = current_speed
-    _fuzzy_sim.input['curve'] = road_curvature
-    _fuzzy_sim.compute()
-    return float(_fuzzy_sim.output['acceleration'])
\ No newline at end of file
+
+if __name__ == "__main__":
+    # python -m ai.fuzzy => prebuild the cached table (e.g. before starting pool workers)
+    # and check its error bound; exit status 1 if the table is off by FUZZY_TABLE_MAX_ERROR or more
+    import sys
+    import time
+
+    start = time.perf_counter()
+    table = FuzzyTable()
+    built = time.perf_counter() - start
+    path = table_cache_path(FUZZY_TABLE_CACHE_DIR or ".")
+    table.save(path)
+    print(f"built {table.values.shape} table in {built:.2f}s => {path}")
+    error = table.max_error()
+    print(f"max error vs skfuzzy: {error:.4f} (bound {FUZZY_TABLE_MAX_ERROR})")
+    if error >= FUZZY_TABLE_MAX_ERROR:
+        print("table exceeds its error bound")
+        sys.exit(1)
@@ -1,11 +1,14 @@
 import math
+import time
 
-from utils.geometry import closest_point_on_track, distance
-from car.car import Car
-from utils.geometry import get_future_heading
+from config import TRACK_PROGRESS_UNIT
+from ai.policy_table import PolicyTable
+from utils import kernels
 
 class HeuristicAgent:
-    def __init__(self, lookahead_depth = 3, progress_weight = 1.0, centering_weight = 0.1, off_track_penalty = 1000):
+    def __init__(self, lookahead_depth = 3, progress_weight = 1.0, centering_weight = 0.1, off_track_penalty = 1000,
+                 search = "hold", beam_width = 3, node_budget = None, time_budget = None,
+                 opponent_weight = 0.0, opponent_clearance = 25.0, line_lookahead = 25.0, policy_table = False):
         self.lookahead_depth = lookahead_depth
         self.actions = ["left", "right", "straight"]
 
@@ -13,55 +16,189 @@ class HeuristicAgent:
         self.progress_weight = progress_weight # Forward progress weight; high value => aggressive driving, low value => cautious driving
         self.centering_weight = centering_weight # Weight for staying near center; high value => stay close to edge, low value => cut/drift to increase progress
         self.off_track_penalty = off_track_penalty # Hard constraint to stay in lane
+        self.opponent_weight = opponent_weight # Penalty for ending a rollout on top of an opponent (0 => ignore other cars)
+        self.opponent_clearance = opponent_clearance # Distance between car centers below which the penalty applies
 
-    def decide_action(self, car, track):
+        # Search settings
+        self.search = search # "hold" => hold one action for N steps, "beam" => search action sequences, "line" => follow the track's racing line
+        self.beam_width = beam_width # Sequences kept per depth level in beam search
+        self.node_budget = node_budget # Max states evaluated per decision (None => unlimited)
+        self.time_budget = time_budget # Max seconds per decision (None => unlimited)
+        self.line_lookahead = line_lookahead # Racing line mode: minimum distance (px) to the point steered at
+        self.policy_table = policy_table # Reuse decisions from a quantized state table (hold/beam search without opponents)
+        self.policy = None # PolicyTable of the track being raced, created on the first decision
+
+    def decide_action(self, car, track, opponents=None):
         # Return best action based on lookahead and heuristic
+        # opponents => (x, y, vx, vy) of nearby cars, assumed to keep their velocity
+        if not self.opponent_weight:
+            opponents = None
+        if self.search == "line":
+            return self._follow_line(car, track)
+        if self.policy_table and not opponents:
+            return self._table_action(car, track)
+        return self._search(car, track, opponents)
+
+    def _table_action(self, car, track):
+        """Stored action for the car's quantized state, searched and stored on a miss."""
+        if self.policy is None or self.policy.track is not track:
+            self.policy = PolicyTable.for_agent(track, self, car)
+        key = self.policy.key(car)
+        action = self.policy.get(key)
+        if action is None:
+            action = self._search(car, track)
+            self.policy.put(key, action)
+        elif self.policy.should_verify():
+            self.policy.record_check(self._search(car, track) == action)
+        return action
+
+    def _search(self, car, track, opponents=None):
+        if self.search == "beam":
+            return self._beam_search(car, track, opponents)
+
         best_action = "straight" # Default action
         best_score = -float('inf') # Smallest value
 
-        for action in self.actions:
-            # Car state cloning
-            sim_car = self._clone_car(car)
-            
-            # Simulating N steps
-            for _ in range(self.lookahead_depth):
-                self._apply_action(sim_car, action)
-                sim_car.update()
-
-            # Evaluation
-            score = self._evaluate_state(sim_car, track)
-            
+        # Compiled kernels roll out and score every action in one call
+        rows = self._kernel_scores(car, track) if kernels.ENABLED else None
+        origin = self._origin(car, track)
+
+        for k, action in enumerate(self.actions):
+            if rows is not None:
+                score, x, y = rows[k]
+            else:
+                # Simulating N steps on a plain (x, y, angle) state
+                turn = self._turn(car, action)
+                x, y, angle = car.x, car.y, car.angle
+                for _ in range(self.lookahead_depth):
+                    x, y, angle = self._step(x, y, angle, car.speed, turn)
+
+                # Evaluation
+                score, _ = self._evaluate(x, y, angle, track, car.track_hint, origin)
+            if opponents:
+                score += self._opponent_penalty(x, y, opponents, self.lookahead_depth)
+
             if score > best_score:
                 best_score = score
                 best_action = action
 
         return best_action
 
-    def _clone_car(self, car):
-        clone = Car(car.x, car.y, car.angle)
-        clone.speed = car.speed
-        clone.max_speed = car.max_speed
-        clone.acceleration_rate = car.acceleration_rate
-        clone.brake_rate = car.brake_rate
-        clone.turn_rate = car.turn_rate
-        
-        return clone
-
-    def _apply_action(self, car, action):
+    def _kernel_scores(self, car, track):
+        """(score, x, y) after each action's rollout, from kernels.hold_scores; same values as the loop."""
+        points, arc, grid, future = track.kernel_tables(10)
+        turns = tuple(float(self._turn(car, action)) for action in self.actions)
+        hint = -1 if car.track_hint is None else car.track_hint
+        return kernels.hold_scores(car.x, car.y, car.angle, car.speed, turns, self.lookahead_depth, points, arc, grid, hint,
+                                   future, float(track.width // 2), float(self.progress_weight), float(self.centering_weight),
+                                   float(self.off_track_penalty), TRACK_PROGRESS_UNIT).tolist()
+
+    def _beam_search(self, car, track, opponents=None):
+        """
+        Depth-limited beam search over action sequences. Each child extends
+        its parent's state by one step, so rollout prefixes are shared, and
+        only the beam_width best sequences are expanded at the next depth.
+        Returns the first action of the best sequence found within budget.
+        """
+        deadline = time.perf_counter() + self.time_budget if self.time_budget else None
+        turns = [(action, self._turn(car, action)) for action in self.actions]
+        speed = car.speed
+        origin = self._origin(car, track)
+        nodes = 0
+
+        # Beam entries => (score, first_action, x, y, angle, track_index)
+        beam = [(0.0, "straight", car.x, car.y, car.angle, car.track_hint)]
+        for depth in range(self.lookahead_depth):
+            if self.node_budget is not None and depth > 0 and nodes + len(beam) * len(turns) > self.node_budget:
+                break
+
+            children = []
+            for _, first_action, x, y, angle, idx in beam:
+                for action, turn in turns:
+                    nx, ny, nangle = self._step(x, y, angle, speed, turn)
+                    score, nidx = self._evaluate(nx, ny, nangle, track, idx, origin)
+                    if opponents:
+                        score += self._opponent_penalty(nx, ny, opponents, depth + 1)
+                    children.append((score, action if depth == 0 else first_action, nx, ny, nangle, nidx))
+            nodes += len(children)
+
+            # Stable sort keeps the action order for ties, like the hold search
+            children.sort(key=lambda child: child[0], reverse=True)
+            beam = children[:self.beam_width]
+
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+
+        return beam[0][1]
+
+    def _follow_line(self, car, track):
+        """
+        Pure pursuit on the precomputed racing line: steer toward the line point
+        a speed-dependent distance ahead. Constant work per tick; the car's
+        closest centerline index (from get_track_info) locates it on the line.
+        """
+        line = track.racing_line()
+        station = line.station((car.x, car.y), car.track_hint)
+        ahead = max(self.line_lookahead, 3 * car.speed)
+        tx, ty = line.point(station + int(ahead / line.spacing) + 1)
+
+        desired = math.atan2(ty - car.y, tx - car.x)
+        error = math.atan2(math.sin(desired - car.angle), math.cos(desired - car.angle))
+        if error > car.turn_rate / 2:
+            return "right"
+        elif error < -car.turn_rate / 2:
+            return "left"
+        return "straight"
+
+    def target_speed(self, car, track):
+        """Racing line mode: the slowest profile speed within the next tick of travel."""
+        line = track.racing_line()
+        station = line.station((car.x, car.y), car.track_hint)
+        reach = int(car.speed / line.spacing) + 2
+        return min(line.speed_at(station + k) for k in range(reach))
+
+    def _turn(self, car, action):
         if action == "left":
-            car.turn_left()
+            return -car.turn_rate
         elif action == "right":
-            car.turn_right()
+            return car.turn_rate
+        return 0.0
+
+    def _step(self, x, y, angle, speed, turn):
+        # Same motion as Car.turn_left/turn_right followed by Car.update
+        angle += turn
+        return x + speed * math.cos(angle), y + speed * math.sin(angle), angle
+
+    def _opponent_penalty(self, x, y, opponents, steps):
+        """Negative score growing as the rollout ends closer to where an opponent will be."""
+        penalty = 0.0
+        clearance = self.opponent_clearance
+        for ox, oy, vx, vy in opponents:
+            d = math.hypot(x - (ox + vx * steps), y - (oy + vy * steps))
+            if d < clearance:
+                penalty -= self.opponent_weight * (clearance - d) / clearance
+        return penalty
 
     def _evaluate_state(self, car, track):
-        car_pos = (car.x, car.y)
-        closest_point, idx = closest_point_on_track(car_pos, track.centerline)
-        dist_to_center = distance(car_pos, closest_point)
+        score, _ = self._evaluate(car.x, car.y, car.angle, track, car.track_hint)
+        return score
+
+    def _origin(self, car, track):
+        # Progress at the car's own closest index; rollouts are scored relative to it across the start line
+        return None if car.track_hint is None else track.distance_at(car.track_hint)
+
+    def _evaluate(self, x, y, angle, track, hint=None, origin=None):
+        """
+        Returns (score, closest_index) for a simulated position. origin =>
+        progress of the car the rollout started from (see Track.unwrap_progress).
+        """
+        along, idx, dist_to_center = track.progress((x, y), hint)
+        if origin is not None:
+            along = track.unwrap_progress(along, origin)
 
         # Heuristic components
-        progress_score = self.progress_weight * idx # Higher index -> more progress 
+        progress_score = self.progress_weight * along / TRACK_PROGRESS_UNIT # Further along the track -> more progress
         centering_penalty = -self.centering_weight * dist_to_center  # Penalizing distance from ideal line
-        collision_penalty = 0
 
         # Hard penalty for going off-track
         collision_penalty = 0
@@ -69,10 +206,10 @@ class HeuristicAgent:
             collision_penalty = -self.off_track_penalty
 
         # Heading alignment bonus
-        ideal_heading = get_future_heading(track.centerline, idx, look_ahead=10)
-        heading_error = abs(math.atan2(math.sin(car.angle - ideal_heading), math.cos(car.angle - ideal_heading)))
+        ideal_heading = track.future_heading_at(idx, 10)
+        heading_error = abs(math.atan2(math.sin(angle - ideal_heading), math.cos(angle - ideal_heading)))
         alignment_bonus = -0.5 * heading_error
 
         total_score = progress_score + centering_penalty + collision_penalty + alignment_bonus
 
-        return total_score
\ No newline at end of file
+        return total_score, idx
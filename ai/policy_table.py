@@ -0,0 +1,235 @@
+# ai/policy_table.py
+import argparse
+import hashlib
+import json
+import math
+import os
+import tempfile
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from config import POLICY_TABLE_SIZE, POLICY_OFFSET_BIN, POLICY_HEADING_BIN, POLICY_SPEED_BIN, POLICY_VERIFY_EVERY
+
+ACTIONS = ["left", "right", "straight"]
+_ACTION_CODE = {action: i for i, action in enumerate(ACTIONS)}
+
+# Bump whenever the state key or the stored layout changes; old tables are then ignored
+POLICY_FORMAT_VERSION = 1
+
+# Agent settings that decide its steering without opponents (the table is bypassed when any are near)
+_AGENT_SETTINGS = ("lookahead_depth", "progress_weight", "centering_weight", "off_track_penalty",
+                   "search", "beam_width", "node_budget", "time_budget")
+
+
+def policy_cache_name(agent, car, offset_bin=POLICY_OFFSET_BIN, heading_bin=POLICY_HEADING_BIN, speed_bin=POLICY_SPEED_BIN):
+    inputs = {
+        "version": POLICY_FORMAT_VERSION,
+        "agent": {name: getattr(agent, name) for name in _AGENT_SETTINGS},
+        "bins": [offset_bin, heading_bin, speed_bin],
+        "car": [car.max_speed, car.turn_rate],
+    }
+    key = hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()[:20]
+    return f"policy-{key}.npy"
+
+
+# Track => {cache name: PolicyTable}, so agents with the same settings on one track share a table
+_shared = weakref.WeakKeyDictionary()
+
+
+class PolicyTable:
+    """
+    An agent's steering decisions on one track, memoized over a quantized
+    state: (closest track index, lateral offset bin, heading error bin,
+    speed bin). Holds at most capacity entries and evicts the least
+    recently used. States in one bin can still prefer different actions,
+    so every verify_every-th hit is also searched live and the agreement
+    rate shows what the lookups cost in accuracy.
+    """
+
+    def __init__(self, track, capacity=POLICY_TABLE_SIZE, offset_bin=POLICY_OFFSET_BIN, heading_bin=POLICY_HEADING_BIN,
+                 speed_bin=POLICY_SPEED_BIN, verify_every=POLICY_VERIFY_EVERY, path=None):
+        self.track = track
+        self.capacity = capacity
+        self.offset_bin = offset_bin
+        self.heading_bin = heading_bin
+        self.speed_bin = speed_bin
+        self.verify_every = verify_every
+        self.path = path # .npy file the table is loaded from and saved to (None => memory only)
+        self.entries = OrderedDict() # key -> action, least recently used first
+        self.dirty = False
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.checked = 0 # Hits also searched live
+        self.agreed = 0 # ... where the live search chose the stored action
+        self._until_verify = verify_every
+
+        # Centerline frame per index: point, heading and its cos and sin
+        self._last = len(track.centerline) - 1 # Same point as index 0
+        self._frames = [(x, y, h, math.cos(h), math.sin(h)) for (x, y), h in zip(track.centerline, track.heading.tolist())]
+
+        if path is not None and os.path.exists(path):
+            try:
+                self._load(path)
+            except (OSError, ValueError):
+                pass # Unreadable entry => start empty and overwrite it on save
+
+    @classmethod
+    def for_agent(cls, track, agent, car, **kwargs):
+        """
+        The agent's table for track, stored in the track's cache directory
+        when it has one. Agents whose settings give the same cache name get
+        the same table, so cars sharing a roster entry fill one table and
+        none overwrites another's entries on save; kwargs only apply when it
+        is created.
+        """
+        name = policy_cache_name(agent, car)
+        tables = _shared.setdefault(track, {})
+        table = tables.get(name)
+        if table is None:
+            path = None
+            if track.cache_path is not None and os.path.isdir(track.cache_path):
+                path = os.path.join(track.cache_path, name)
+            table = tables[name] = cls(track, path=path, **kwargs)
+        return table
+
+    def key(self, car):
+        """Quantized state of car; its track_hint (set by get_track_info each tick) is the track index."""
+        index = car.track_hint
+        if index is None:
+            index = self.track.closest_point((car.x, car.y))[1]
+        if index == self._last:
+            index = 0
+        x, y, heading, c, s = self._frames[index]
+        dx = car.x - x
+        dy = car.y - y
+        offset = dy * c - dx * s # Positive => right of the centerline (y points down)
+        error = (car.angle - heading + math.pi) % math.tau - math.pi
+        return (index, math.floor(offset / self.offset_bin), math.floor(error / self.heading_bin),
+                math.floor(car.speed / self.speed_bin))
+
+    def get(self, key):
+        """Stored action for key (now the most recently used), or None."""
+        action = self.entries.get(key)
+        if action is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return action
+
+    def put(self, key, action):
+        self.entries[key] = action
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        self.dirty = True
+
+    def should_verify(self):
+        """True on every verify_every-th hit."""
+        if not self.verify_every:
+            return False
+        self._until_verify -= 1
+        if self._until_verify > 0:
+            return False
+        self._until_verify = self.verify_every
+        return True
+
+    def record_check(self, agreed):
+        self.checked += 1
+        self.agreed += agreed
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "checked": self.checked,
+            "agreement": self.agreed / self.checked if self.checked else None,
+        }
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = self.checked = self.agreed = 0
+
+    # -------------------------------------------------
+    # Persistence
+    # -------------------------------------------------
+    def save(self):
+        """Write the entries (least recently used first) if they changed, to a temp file renamed into place."""
+        if self.path is None or not self.dirty:
+            return
+        rows = np.array([key + (_ACTION_CODE[action],) for key, action in self.entries.items()], dtype=np.int32).reshape(-1, 5)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), prefix=".tmp-", suffix=".npy")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, rows)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+    def _load(self, path):
+        rows = np.load(path)
+        if rows.ndim != 2 or rows.shape[1] != 5:
+            raise ValueError(f"policy table {path} has shape {rows.shape}, expected (n, 5)")
+        for *key, code in rows[-self.capacity:].tolist():
+            self.entries[tuple(key)] = ACTIONS[code]
+
+
+# -------------------------------------------------
+# Accuracy/latency trade-off
+# -------------------------------------------------
+def _decision_ms(sim, ticks):
+    """Mean steering time per car per tick over a race, in ms."""
+    from utils.profiler import Profiler
+
+    sim.profiler = Profiler(window=ticks)
+    sim.run(ticks)
+    return sim.profiler.stats()["phases"]["decide_action"]["mean_ms"] / len(sim.cars)
+
+
+def main():
+    from config import RACE_ROSTER
+    from race.simulation import RaceSimulation
+
+    parser = argparse.ArgumentParser(prog="python -m ai.policy_table",
+                                     description="Compare table-driven steering with live search on one track")
+    parser.add_argument("--seed", type=int, default=1, help="track seed")
+    parser.add_argument("--races", type=int, default=3, help="races that fill and use the table")
+    parser.add_argument("--ticks", type=int, default=20000, help="tick limit per race")
+    args = parser.parse_args()
+
+    # Opponents are ignored throughout, so every decision can use the table
+    agents = [dict(entry["agent"], opponent_weight=0) for entry in RACE_ROSTER]
+    live = RaceSimulation(seed=args.seed, roster=[{"agent": agent} for agent in agents])
+    print(f"live search    {_decision_ms(live, args.ticks):.4f} ms/decision, {live.tick} ticks")
+
+    # Races share the tables through the track cache. The last one checks every hit against live search instead of timing
+    for race in range(args.races + 1):
+        verify = race == args.races
+        sim = RaceSimulation(seed=args.seed, roster=[{"agent": dict(agent, policy_table=True)} for agent in agents])
+        for agent, car in zip(sim.agents, sim.cars):
+            agent.policy = PolicyTable.for_agent(sim.track, agent, car, verify_every=1 if verify else 0)
+
+        tables = list({id(agent.policy): agent.policy for agent in sim.agents}.values()) # Shared tables once
+        if verify:
+            sim.run(args.ticks)
+            checked = sum(table.checked for table in tables)
+            agreed = sum(table.agreed for table in tables)
+            print(f"agreement      {agreed / checked if checked else 0.0:.1%} of {checked} hits chose what live search chose")
+        else:
+            ms = _decision_ms(sim, args.ticks)
+            hits = sum(table.hits for table in tables)
+            lookups = hits + sum(table.misses for table in tables)
+            entries = sum(len(table.entries) for table in tables)
+            print(f"table race {race + 1}   {ms:.4f} ms/decision, hit rate {hits / lookups if lookups else 0.0:.1%}, "
+                  f"{entries} entries, {sim.tick} ticks")
+
+
+if __name__ == "__main__":
+    main()
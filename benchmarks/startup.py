@@ -0,0 +1,66 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+DEFAULT_TARGET = 1.0 # Seconds from process start to the first simulated tick
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What a headless run does before its first tick
+FIRST_TICK = "from race.simulation import RaceSimulation; RaceSimulation(seed=1).step()"
+
+
+def _run(args):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def import_times(code=FIRST_TICK):
+    """(module, self us, cumulative us) for every import code triggers, from -X importtime."""
+    stderr = _run(["-X", "importtime", "-c", code]).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def cold_start(code=FIRST_TICK, runs=3):
+    """Best wall time of a fresh interpreter running code, in seconds."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        _run(["-c", code])
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup",
+                                     description="Import-time report and cold start to first tick")
+    parser.add_argument("--target", type=float, default=DEFAULT_TARGET, help="seconds allowed to the first tick")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports (by cumulative time) to list")
+    parser.add_argument("--window", action="store_true", help="also import pygame and the renderer, as main.py does")
+    args = parser.parse_args()
+
+    code = FIRST_TICK
+    if args.window:
+        code = "import pygame, render.renderer; " + code
+
+    rows = import_times(code)
+    print(f"{'module':<40} {'self ms':>8} {'cumul ms':>9}")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{name:<40} {self_us / 1000:8.1f} {cumulative_us / 1000:9.1f}")
+    if any(name.strip() == "skfuzzy" for name, _, _ in rows):
+        print("note: skfuzzy was imported before the first tick")
+
+    elapsed = cold_start(code)
+    print(f"cold start to first tick: {elapsed:.3f}s (target {args.target:.3f}s)")
+    if elapsed > args.target:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
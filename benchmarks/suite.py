@@ -0,0 +1,256 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD = 0.2 # Allowed slowdown against the baseline (0.2 => 20%)
+BENCH_SEED = 7
+REPEATS = 7
+
+
+# -------------------------------------------------
+# Timing helpers
+# -------------------------------------------------
+def time_calls(func, args_list, repeats=REPEATS):
+    """Best of repeats, in microseconds per call, over a fixed list of argument tuples."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for args in args_list:
+            func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best / len(args_list) * 1e6
+
+
+def _track():
+    from track.track import Track
+    return Track(seed=BENCH_SEED)
+
+
+def _positions(track, count, rng):
+    """Seeded positions on and around the track, within half a track width of the centerline."""
+    positions = []
+    for _ in range(count):
+        x, y = track.centerline[rng.randrange(len(track.centerline))]
+        positions.append((x + rng.uniform(-track.width / 2, track.width / 2),
+                          y + rng.uniform(-track.width / 2, track.width / 2)))
+    return positions
+
+
+# -------------------------------------------------
+# Microbenchmarks => microseconds per call (lower is better)
+# -------------------------------------------------
+def bench_closest_point_on_track(quick):
+    from utils.geometry import closest_point_on_track
+    track = _track()
+    positions = _positions(track, 50 if quick else 200, random.Random(BENCH_SEED))
+    return time_calls(closest_point_on_track, [(p, track.centerline) for p in positions])
+
+
+def bench_track_closest_point(quick):
+    track = _track()
+    positions = _positions(track, 500 if quick else 5000, random.Random(BENCH_SEED))
+    return time_calls(track.closest_point, [(p,) for p in positions])
+
+
+def bench_compute_curvature(quick):
+    from utils.geometry import compute_curvature
+    points = _track().centerline
+    n = len(points)
+    step = 4 if quick else 1
+    return time_calls(compute_curvature, [(points[i - 1], points[i], points[(i + 1) % n]) for i in range(0, n, step)])
+
+
+def bench_get_acceleration_action(quick):
+    from ai.fuzzy import get_acceleration_action
+    get_acceleration_action(0.0, 0.0) # Build the table outside the timing
+    rng = random.Random(BENCH_SEED)
+    samples = [(rng.uniform(0, 15), rng.uniform(0, 1)) for _ in range(500 if quick else 5000)]
+    return time_calls(get_acceleration_action, samples)
+
+
+def _decide_action(search, quick):
+    from car.car import Car
+    from ai.heuristic_agent import HeuristicAgent
+    from config import AGGRESSIVE_AGENT
+
+    track = _track()
+    track.racing_line() # Load or compute the line outside the timing
+    rng = random.Random(BENCH_SEED)
+    agent = HeuristicAgent(**dict(AGGRESSIVE_AGENT, search=search))
+    args = []
+    for x, y in _positions(track, 100 if quick else 1000, rng):
+        car = Car(x, y, angle=rng.uniform(-3.14, 3.14), verbose=False)
+        car.speed = rng.uniform(0, car.max_speed)
+        car.get_track_info(track) # Sets the track hint like a running race
+        args.append((car, track))
+    return time_calls(agent.decide_action, args)
+
+
+def bench_decide_action(quick):
+    return _decide_action("hold", quick)
+
+
+def bench_decide_action_beam(quick):
+    return _decide_action("beam", quick)
+
+
+def bench_decide_action_line(quick):
+    return _decide_action("line", quick)
+
+
+# -------------------------------------------------
+# Macrobenchmarks => ticks per second (higher is better)
+# -------------------------------------------------
+def _race(cars, max_ticks):
+    def bench(quick):
+        from config import CAUTIOUS_AGENT, AGGRESSIVE_AGENT
+        from race.simulation import RaceSimulation
+
+        track = _track()
+        configs = [(CAUTIOUS_AGENT, AGGRESSIVE_AGENT)[i % 2] for i in range(cars)]
+        ticks = max_ticks // 4 if quick else max_ticks
+
+        # Best of a few identical races, each from a fresh grid
+        best = 0.0
+        for _ in range(1 if quick else 3):
+            sim = RaceSimulation(track=track, agent_configs=configs)
+            start = time.perf_counter()
+            ran = sim.run(ticks)
+            best = max(best, ran / (time.perf_counter() - start))
+        return best
+    return bench
+
+
+# -------------------------------------------------
+# Startup => seconds from a fresh interpreter to the first tick (lower is better)
+# -------------------------------------------------
+def bench_cold_start(quick):
+    from benchmarks.startup import cold_start
+    return cold_start(runs=1 if quick else 3)
+
+
+# name => (function, unit, higher is better)
+BENCHMARKS = {
+    "closest_point_on_track": (bench_closest_point_on_track, "us/call", False),
+    "track_closest_point": (bench_track_closest_point, "us/call", False),
+    "compute_curvature": (bench_compute_curvature, "us/call", False),
+    "get_acceleration_action": (bench_get_acceleration_action, "us/call", False),
+    "decide_action": (bench_decide_action, "us/call", False),
+    "decide_action_beam": (bench_decide_action_beam, "us/call", False),
+    "decide_action_line": (bench_decide_action_line, "us/call", False),
+    "race_2_cars": (_race(2, 3000), "ticks/s", True),
+    "race_10_cars": (_race(10, 1000), "ticks/s", True),
+    "race_100_cars": (_race(100, 200), "ticks/s", True),
+    "cold_start_first_tick": (bench_cold_start, "s", False),
+}
+
+
+# -------------------------------------------------
+# Baseline
+# -------------------------------------------------
+def run_benchmarks(names=None, quick=False):
+    from utils.kernels import warm_up
+
+    # Load the compiled kernels up front so the first timed benchmark does not pay for it (cold start measures that)
+    warm_up()
+    results = {}
+    for name, (func, unit, higher_is_better) in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        # Start from a clean heap so one benchmark's garbage is not collected inside the next one's timing
+        gc.collect()
+        results[name] = {"value": func(quick), "unit": unit, "higher_is_better": higher_is_better}
+    return results
+
+
+def environment():
+    from utils.kernels import COMPILED
+    return {"python": platform.python_version(), "machine": platform.machine(), "system": platform.system(),
+            "kernels": "numba" if COMPILED else "python"}
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+        f.write("\n")
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Rows of (name, current, baseline, change, regressed). change is the
+    relative slowdown: positive => slower than the baseline.
+    """
+    rows = []
+    for name, result in results.items():
+        base = baseline["results"].get(name) if baseline else None
+        if base is None:
+            rows.append((name, result, None, None, False))
+            continue
+        if result["higher_is_better"]:
+            change = base["value"] / result["value"] - 1
+        else:
+            change = result["value"] / base["value"] - 1
+        rows.append((name, result, base, change, change > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description="Benchmarks against a stored baseline")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--quick", action="store_true", help="smaller inputs, for a fast sanity run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="slowdown flagged as a regression")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--output", metavar="JSON", help="also write these results to a file")
+    args = parser.parse_args()
+
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    results = run_benchmarks(args.names, args.quick)
+    baseline = load_baseline(args.baseline)
+    rows = compare(results, baseline, args.threshold)
+    if baseline is not None and baseline.get("environment") != environment():
+        print(f"note: baseline recorded with {baseline.get('environment')}, now {environment()}; "
+              "numbers may not compare (re-record with --save)")
+
+    regressions = 0
+    for name, result, base, change, regressed in rows:
+        line = f"{name:<24} {result['value']:12.2f} {result['unit']:<8}"
+        if base is not None:
+            line += f" baseline {base['value']:12.2f}  {change:+7.1%} time"
+        if regressed:
+            line += "  REGRESSION"
+            regressions += 1
+        print(line)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+    if args.save:
+        # Keep entries of benchmarks that were not run this time
+        merged = dict(baseline["results"]) if baseline else {}
+        merged.update(results)
+        save_baseline(merged, args.baseline)
+        print(f"baseline written to {args.baseline}")
+    elif regressions:
+        print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
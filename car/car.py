@@ -1,12 +1,11 @@
 import math
-import pygame
 
-from config import CAR_WIDTH, CAR_HEIGHT, SCREEN_WIDTH, SCREEN_HEIGHT
-from utils.geometry import closest_point_on_track, compute_curvature, distance
+from config import CAR_WIDTH, CAR_HEIGHT, SCREEN_WIDTH, SCREEN_HEIGHT, RACE_LAPS
+from utils.geometry import distance
 from ai.fuzzy import get_acceleration_action
 
 class Car:
-    def __init__(self, x, y, angle=0.0, color=(255, 255, 255)):
+    def __init__(self, x, y, angle=0.0, color=(255, 255, 255), verbose=True):
         # x and y => position of the car; angle => orientation of the car(in radian)
         self.x = x
         self.y = y
@@ -18,11 +17,25 @@ class Car:
         self.acceleration_rate = 0.3
         self.brake_rate = 0.4
         self.turn_rate = 0.15
+        self.launch_speed = 1.0 # Below this the fuzzy "maintain" accelerates instead, so a car stopped in a bend moves off
 
-        # Lap counting
-        self.last_closest_index = 0
+        # Lap counting: checkpoint gates must be crossed in order, gate 0 is the start/finish line
+        self.next_gate = 1 # Gridded on the start line, so the first gate ahead is 1
+        self.gates_passed = 0
+        self.lap_x = x # Position at the last lap check; the move since then is tested against the next gate
+        self.lap_y = y
         self.lap_count = 0
         self.lap_complete = False
+        self.start_crossings = 0 # Line crossings before laps count (1 when gridded behind the line)
+        self.verbose = verbose # Print lap completions
+
+        # Last centerline index found, seeds the next closest-point query
+        self.track_hint = None
+        self.track_distance = 0.0 # Distance to the centerline at that query
+
+        # Last controls applied (for replays and telemetry)
+        self.last_command = 0.0
+        self.last_action = "straight"
         
         # Car design
         self.color = color
@@ -53,50 +66,78 @@ class Car:
     def get_track_info(self, track):
         """Returns (progress_index, curvature, distance_to_center)"""
         car_pos = (self.x, self.y)
-        closest_point, idx = closest_point_on_track(car_pos, track.centerline)
+        closest_point, idx = track.closest_point(car_pos, self.track_hint)
+        self.track_hint = idx
         
         # Distance to centerline (for heuristic)
         dist_to_center = distance(car_pos, closest_point)
+        self.track_distance = dist_to_center
         
-        # Estimate curvature using next few points
-        n = len(track.centerline)
-        p0 = track.centerline[(idx - 1) % n]
-        p1 = track.centerline[idx]
-        p2 = track.centerline[(idx + 1) % n]
-        curvature = compute_curvature(p0, p1, p2)
+        # Curvature precomputed per centerline index
+        curvature = track.curvature_at(idx)
         
         return idx, curvature, dist_to_center
 
     def ai_control_speed(self, curvature: float):
         """Fuzzy logic to set acceleration."""
         acc_command = get_acceleration_action(self.speed, curvature)
+        self.last_command = acc_command
         
         # Convert continuous command to discrete actions
         if acc_command > 0.3:
             self.accelerate()
         elif acc_command < -0.3:
             self.brake()
+        elif self.speed < self.launch_speed:
+            self.accelerate()
         else:
             self.maintain()
 
-    def update_lap_progress(self, track):
-        if self.lap_complete or self.lap_count >= 5:
-            return
+    def follow_speed(self, target):
+        """Speed control toward a target speed (racing line mode) instead of the fuzzy controller."""
+        if self.speed + self.acceleration_rate <= target:
+            self.last_command = 1.0
+            self.accelerate()
+        elif self.speed - target > self.brake_rate / 2:
+            self.last_command = -1.0
+            self.brake()
+        else:
+            self.last_command = 0.0
+            self.maintain()
 
-        car_pos = (self.x, self.y)
-        _, nearest_idx = closest_point_on_track(car_pos, track.centerline)
-        
-        # Detect finish line crossing by checking if high index -> low index
-        if self.last_closest_index > len(track.centerline) * 0.9 and nearest_idx < 10:
+    def update_lap_progress(self, track):
+        """
+        Test the move since the last call against the next checkpoint gate.
+        Returns the fraction of the move at which it was crossed, or None.
+        """
+        x0, y0 = self.lap_x, self.lap_y
+        self.lap_x, self.lap_y = self.x, self.y
+        if self.lap_complete or self.lap_count >= RACE_LAPS:
+            return None
+
+        t = track.gate_crossing(self.next_gate, x0, y0, self.x, self.y)
+        if t is None:
+            return None
+
+        gate = self.next_gate
+        self.next_gate = (gate + 1) % len(track.gates)
+        if gate == 0 and self.start_crossings:
+            self.start_crossings -= 1 # Reached the line from the grid, the race starts here
+            return None
+
+        self.gates_passed += 1
+        if gate == 0:
             self.lap_count += 1
-            print(f"Car completed lap {self.lap_count}")
-            if self.lap_count >= 5:
+            if self.verbose:
+                print(f"Car completed lap {self.lap_count}")
+            if self.lap_count >= RACE_LAPS:
                 self.lap_complete = True
-
-        self.last_closest_index = nearest_idx
+        return t
 
     def draw(self, surface):
         """Draw the car as a rotated rectangle."""
+        import pygame
+
         # Create a surface for the car
         car_surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
         pygame.draw.rect(car_surface, self.color, (0, 0, self.width, self.height))
@@ -12,4 +12,118 @@ TRACK_WIDTH = 200
 CAR_WIDTH = 20
 CAR_HEIGHT = 12
 CAR1_COLOR = (255, 0, 0)
-CAR2_COLOR = (0, 0, 255)
\ No newline at end of file
+CAR2_COLOR = (0, 0, 255)
+
+# Fuzzy speed controller
+FUZZY_CONTROLLER = "table" # "table" => precomputed lookup surface, "skfuzzy" => full inference each call
+FUZZY_TABLE_SPEED_STEP = 0.1
+FUZZY_TABLE_CURVE_STEP = 0.01
+FUZZY_TABLE_CACHE_DIR = ".fuzzy_cache" # Computed tables are stored here and reloaded (None => always rebuild)
+FUZZY_TABLE_MAX_ERROR = 0.01 # Largest difference to skfuzzy allowed at the default grid (checked by python -m ai.fuzzy)
+
+# AI agent profiles => HeuristicAgent keyword arguments
+# Cautious AI: values safety over speed
+CAUTIOUS_AGENT = {
+    "lookahead_depth": 3,
+    "progress_weight": 0.5, # Speed and safety trade-off
+    "centering_weight": 0.3, # Strongly penalizes drifting
+    "off_track_penalty": 1000,
+    "opponent_weight": 20, # Keeps well clear of other cars
+}
+# Aggressive AI: pushes forward, tolerates more risk
+AGGRESSIVE_AGENT = {
+    "lookahead_depth": 3,
+    "progress_weight": 1.2, # Values progress more
+    "centering_weight": 0.05, # Doesn't care much about centering
+    "off_track_penalty": 1000,
+    "opponent_weight": 5, # Only avoids the worst contacts
+}
+# Racing line AI: follows the track's precomputed racing line and speed profile
+RACING_LINE_AGENT = {
+    "search": "line",
+    "line_lookahead": 20, # Steers at least this far (px) ahead on the line
+}
+
+# Steering policy table (see ai/policy_table.py)
+POLICY_TABLE_SIZE = 100000 # Memoized decisions kept per track and agent; the least recently used go first
+POLICY_OFFSET_BIN = 5.0 # Px of lateral offset from the centerline per bin
+POLICY_HEADING_BIN = 0.05 # Rad of heading error per bin (a third of a steering step)
+POLICY_SPEED_BIN = 0.5 # Speed per bin
+POLICY_VERIFY_EVERY = 0 # Every Nth table hit is also searched live to measure agreement (0 => never)
+
+# Race rules
+RACE_LAPS = 5
+
+# Race roster => one entry per car; longer races cycle through it (see race.simulation.make_roster)
+RACE_ROSTER = [
+    {"agent": CAUTIOUS_AGENT, "color": CAR1_COLOR},
+    {"agent": AGGRESSIVE_AGENT, "color": CAR2_COLOR},
+]
+
+# Starting grid => rows of cars behind the start line
+GRID_LATERAL_SPACING = 30 # Between car centers across the track
+GRID_ROW_SPACING = 30 # Between rows along the centerline
+GRID_EDGE_MARGIN = 15 # Kept free at each track edge
+
+# Car-to-car contact
+COLLISION_SPEED_FACTOR = 0.8 # Speed kept by both cars after a contact
+OPPONENT_SENSE_RADIUS = 60 # Cars within this distance are passed to the agents
+
+# Track geometry tables
+TRACK_CURVATURE_WINDOW = 0 # Average curvature over +-N indices (0 => raw three-point curvature)
+TRACK_FUTURE_LOOKAHEADS = (10, 30) # Future heading distances precomputed per track
+TRACK_CACHE_DIR = ".track_cache" # Seeded tracks are stored here and reloaded (None => always regenerate)
+TRACK_GATE_MARGIN = 20 # Px the checkpoint gates reach past each track edge (cars running wide still count)
+
+# Centerline resampling by arc length (see track/resample.py)
+TRACK_RESAMPLE = "adaptive" # "uniform", "adaptive" (dense in bends, sparse on straights) or None (generator points)
+TRACK_RESAMPLE_SPACING = 6.0 # Uniform mode: px between points
+TRACK_ADAPTIVE_TURN = 0.08 # Adaptive mode: heading change (rad) per point
+TRACK_ADAPTIVE_MIN_SPACING = 3.0 # Adaptive mode: px between points in the tightest bends
+TRACK_ADAPTIVE_MAX_SPACING = 30.0 # Adaptive mode: px between points on straights
+TRACK_PROGRESS_UNIT = 6.0 # Px of arc length per unit of agent progress, heading lookahead and curvature
+                          # (about the generators' point spacing, so tuned weights keep their scale)
+
+# Track validity (generated layouts failing any of these are rejected from corpora)
+TRACK_MIN_RADIUS = TRACK_WIDTH / 2 # Tighter bends fold the inner edge over itself
+TRACK_RADIUS_SPAN = 40 # Px either side of a point over which its bend radius is measured
+TRACK_CLOSURE_GAP = 3.0 # Largest gap between the last and first point, in median point spacings
+TRACK_CLOSURE_TURN = 0.5 # Largest heading change (rad) where the loop closes
+
+# Rendering
+RENDER_ANGLE_STEPS = 72 # Pre-rotated car sprites per full turn (5 degrees each)
+RENDER_TEXT_CACHE_SIZE = 512 # Cached text surfaces before the cache is reset
+HUD_STANDINGS = 8 # Cars listed in the on-screen standings
+
+# Simulation timing
+SIM_TICK_RATE = 60 # Simulation ticks per second of real time at 1x
+SIM_MAX_STEPS_PER_FRAME = 5 # Ticks per simulation pass (per 1x of speed) before backlog is dropped
+SIM_SPEEDS = {"1": 1, "2": 2, "3": 10, "0": None} # Key => fast-forward multiplier (None => max)
+SIM_SNAPSHOT_SLOTS = 3 # State snapshots the simulation thread rotates through for the renderer
+SIM_IDLE_INTERVAL = 0.05 # Seconds the simulation thread waits between control checks once the race is over
+
+# Replays
+REPLAY_KEYFRAME_INTERVAL = 60 # Ticks per keyframe block (seek cost is at most this many deltas)
+REPLAY_BUFFER_BYTES = 64 * 1024 # Packed ticks handed to the writer thread at a time
+
+# Live telemetry (see race/telemetry.py)
+TELEMETRY_ADDRESS = "127.0.0.1:8765" # host:port, or unix:/path for a Unix socket
+TELEMETRY_RING_SIZE = 1024 # Frames kept for subscribers to catch up on
+TELEMETRY_POLL_INTERVAL = 0.01 # Seconds between checks for new frames
+TELEMETRY_HIGH_WATER = 64 * 1024 # Unsent bytes after which a subscriber only gets the newest tick
+TELEMETRY_DROP_BYTES = 1024 * 1024 # Unsent bytes after which a subscriber is disconnected
+
+# Compiled kernels (see utils/kernels.py)
+KERNEL_BACKEND = "auto" # "auto" => numba, if installed, once warm_up() runs (tournament, optimizer, benchmarks),
+                        # "numba" => always (required), "python" => plain Python/NumPy paths
+KERNEL_CACHE_DIR = ".kernel_cache" # Compiled kernels are stored here so later runs skip the JIT (None => numba's default)
+
+# Profiling
+PROFILER_WINDOW = 600 # Ticks/frames kept per phase for the rolling percentiles
+PROFILER_OVERLAY_REFRESH = 30 # Frames between overlay text updates
+
+# Racing line (see track/racing_line.py)
+RACING_LINE_SPACING = 5.0 # Centerline arc length between line stations (px)
+RACING_LINE_MARGIN = 20 # Kept free at each track edge
+RACING_LINE_ITERATIONS = 100 # Active-set iterations allowed for the minimum-curvature solve
+RACING_LINE_SPEED_FACTOR = 3.0 # Scale on the turn-rate speed limit in bends (followers cut inside the line; 4+ reaches the edge)
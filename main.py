@@ -1,61 +1,54 @@
 import pygame
 import sys
-import math
+import time
 
-from config import SCREEN_WIDTH, SCREEN_HEIGHT, FPS, CAR1_COLOR, CAR2_COLOR, CAR_WIDTH, CAR_HEIGHT
-from track.track import Track
-from car.car import Car
-from ai.heuristic_agent import HeuristicAgent
-from utils.geometry import get_track_heading
+from config import SCREEN_WIDTH, SCREEN_HEIGHT, FPS, SIM_SPEEDS, PROFILER_OVERLAY_REFRESH, HUD_STANDINGS
+from race.simulation import RaceSimulation, make_roster
+from race.runner import SimulationThread
+from race.replay import ReplayRecorder
+from race.telemetry import TelemetryPublisher, TelemetryServer
+from render.renderer import Renderer
+from utils.profiler import Profiler
 
-def main():
+def main(seed=None, record=None, profile=None, cars=None, telemetry=None):
     
     # pygame setup
     pygame.init()
-    font = pygame.font.SysFont(None, 36)
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("AI Race Track Duel")
     clock = pygame.time.Clock()
 
-    # Track setup
-    track = Track()
-
-    # Car initialization
-    start_index = 0
-    start_pos = track.centerline[start_index]
-    start_angle = get_track_heading(track.centerline, start_index)
-
-    # Perpendicular vector to heading
-    perp_x = -math.sin(start_angle)
-    perp_y = math.cos(start_angle)
-
-    # Car positions
-    car1_pos = (start_pos[0] + perp_x * 15, start_pos[1] + perp_y * 15)
-    car2_pos = (start_pos[0] - perp_x * 15, start_pos[1] - perp_y * 15)
-
-    car1 = Car(car1_pos[0], car1_pos[1], angle=start_angle, color=CAR1_COLOR)
-    car2 = Car(car2_pos[0], car2_pos[1], angle=start_angle, color=CAR2_COLOR)
-
-
-    # Agent1 -> Cautious AI: values safety over speed
-    agent1 = HeuristicAgent(
-        lookahead_depth=3,
-        progress_weight=0.5, # Speed and safety trade-off
-        centering_weight=0.3, # Strongly penalizes drifting
-        off_track_penalty=1000
-    )
-
-    # Agent2 -> Aggressive AI: pushes forward, tolerates more risk
-    agent2 = HeuristicAgent(
-        lookahead_depth=3,
-        progress_weight=1.2, # Values progress more
-        centering_weight=0.05, # Doesn't care much about centering
-        off_track_penalty=1000
-    )
-
-    # Race completion flags
-    race_finished = False
-    winner = None
+    # Track, cars and agents from the roster (cars => cycle it to that many; see config)
+    sim = RaceSimulation(seed=seed, verbose=True, roster=make_roster(cars) if cars else None)
+    track = sim.track
+    if record:
+        sim.recorder = ReplayRecorder(record, track, len(sim.cars), colors=[car.color for car in sim.cars])
+    server = None
+    if telemetry:
+        sim.telemetry = TelemetryPublisher(sim)
+        server = TelemetryServer(sim.telemetry, telemetry).start()
+    renderer = Renderer(screen, track)
+
+    # Fixed-rate simulation on its own thread; frames draw its latest snapshot, so slow ticks do not drop frames
+    runner = SimulationThread(sim)
+
+    # Profiler (P toggles it and its overlay); with a profile path it starts on and is exported on exit
+    profiler = None
+    profiled = None # Last profiler used, kept for the export
+    overlay = []
+    frame = 0
+
+    def set_profiling(on):
+        nonlocal profiler, profiled
+        if on:
+            profiler = profiled = Profiler().enable()
+        elif profiler is not None:
+            profiler.disable()
+            profiler = None
+        runner.set_profiler(profiler)
+
+    set_profiling(bool(profile))
+    runner.start()
 
     # Actual game loop
     running = True
@@ -63,76 +56,75 @@ def main():
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.KEYDOWN and event.unicode in SIM_SPEEDS:
+                runner.set_speed(SIM_SPEEDS[event.unicode])
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                set_profiling(profiler is None)
+                overlay = []
 
-        # Track details 
-        _, curvature1, _ = car1.get_track_info(track)
-        _, curvature2, _ = car2.get_track_info(track)
-
-        # Speed controlling
-        car1.ai_control_speed(curvature1)
-        car2.ai_control_speed(curvature2)
-
-        # Steering controlling
-        action1 = agent1.decide_action(car1, track)
-        action2 = agent2.decide_action(car2, track)
+        if runner.error is not None:
+            break
 
-        if action1 == "left": car1.turn_left()
-        elif action1 == "right": car1.turn_right()
-
-        if action2 == "left": car2.turn_left()
-        elif action2 == "right": car2.turn_right()
-
-        # Update physics
-        car1.update()
-        car2.update()
-
-        # Lap count upgrade
-        car1.update_lap_progress(track)
-        car2.update_lap_progress(track)
-
-        if not race_finished:
-            if car1.lap_complete:
-                winner = "Car 1"
-                race_finished = True
-                car1.speed = car2.speed = 0
-
-            elif car2.lap_complete:
-                winner = "Car 2"
-                race_finished = True
-                car1.speed = car2.speed = 0
-
-        # Draw
-        screen.fill((30, 100, 30))
-        track.draw(screen)
-        car1.draw(screen)
-        car2.draw(screen)
+        # Latest published state; drawn alpha of the way from the tick before it
+        clock.tick(FPS)
+        snapshot = runner.buffer.latest()
+        cars = snapshot.cars
+        alpha = 1.0 if snapshot.interval is None else min((time.perf_counter() - snapshot.time) / snapshot.interval, 1.0)
 
-        # Speed text display
-        car1_speed_text = font.render(f"Car1 - {car1.speed:.1f}", True, (255, 0, 0))
-        car2_speed_text = font.render(f"Car2 - {car2.speed:.1f}", True, (0, 0, 255))
+        # Draw (track is pre-baked into the renderer background)
+        draw_start = time.perf_counter()
+        renderer.begin_frame()
+        for car, pose in zip(cars, snapshot.previous):
+            renderer.draw_car(car, pose, alpha)
 
         screen_width, screen_height = screen.get_size()
 
-        car1_lap_count = font.render(f"Current Lap - {car1.lap_count}", True, (255, 0, 0))
-        car2_lap_count = font.render(f"Current Lap - {car2.lap_count}", True, (0, 0, 255))
+        # Standings (leader first): name, speed and current lap
+        order = sorted(range(len(cars)), key=lambda i: (
+            -cars[i].gates_passed, cars[i].start_crossings, -track.distance_at(cars[i].track_hint or 0)))
+        for row, i in enumerate(order[:HUD_STANDINGS]):
+            car = cars[i]
+            standing_text = renderer.text(f"{sim.names[i]} - {car.speed:.1f} - Lap {car.lap_count}", car.color)
+            renderer.blit(standing_text, (screen_width - standing_text.get_width() - 10, 10 + 24 * row))
 
-        # Car1 speed
-        screen.blit(car1_speed_text, (10, 10))
-        screen.blit(car1_lap_count, (10, 30))
-        # Car2 speed
-        screen.blit(car2_speed_text, (screen_width - car2_speed_text.get_width() - 10, 10))
-        screen.blit(car2_lap_count, (screen_width - car2_lap_count.get_width() - 10, 30))
+        # Fast-forward indicator
+        speed_label = "max" if snapshot.speed is None else f"{snapshot.speed}x"
+        speed_text = renderer.text(f"Sim {speed_label} (1/2/3/0)", (255, 255, 255))
+        renderer.blit(speed_text, (screen_width//2 - speed_text.get_width()//2, 10))
 
         # Victory text
-        if race_finished:
-            font = pygame.font.SysFont(None, 72)
-            text = font.render(f"{winner} Wins!", True, (255, 255, 0))
-            screen.blit(text, (SCREEN_WIDTH//2 - text.get_width()//2, SCREEN_HEIGHT//2 - 50))
-        
-        pygame.display.flip()
-        clock.tick(FPS)
-
+        if snapshot.finished:
+            text = renderer.text(f"{snapshot.winner} Wins!", (255, 255, 0), size=72)
+            renderer.blit(text, (SCREEN_WIDTH//2 - text.get_width()//2, SCREEN_HEIGHT//2 - 50))
+
+        # Performance overlay; text is refreshed every few frames so it stays cached in between
+        if profiler is not None:
+            if frame % PROFILER_OVERLAY_REFRESH == 0 or not overlay:
+                overlay = profiler.overlay_lines()
+            for i, line in enumerate(overlay):
+                renderer.blit(renderer.text(line, (255, 255, 255), size=20), (10, 10 + 16 * i))
+            profiler.add("draw", time.perf_counter() - draw_start)
+
+            display_start = time.perf_counter()
+            renderer.end_frame()
+            profiler.add("display", time.perf_counter() - display_start)
+        else:
+            renderer.end_frame()
+        frame += 1
+
+    # Stop the simulation before closing what it writes to
+    runner.stop()
+    if sim.recorder is not None:
+        sim.recorder.close()
+    if server is not None:
+        server.close()
+    if profiler is not None:
+        profiler.disable()
+    if profile and profiled is not None:
+        profiled.export(profile)
     pygame.quit()
+    if runner.error is not None:
+        raise runner.error
     sys.exit()
 
 if __name__ == "__main__":
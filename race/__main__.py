@@ -0,0 +1,120 @@
+import argparse
+import os
+import time
+
+from config import RACE_LAPS, RACE_ROSTER, TELEMETRY_ADDRESS
+
+
+def _replay_path(record, race, races):
+    if races == 1:
+        return record
+    root, ext = os.path.splitext(record)
+    return f"{root}-{race}{ext}"
+
+
+def run_headless(seed, ticks, races, record=None, profile=None, cars=None, telemetry=None, policy_table=False):
+    # Only the simulation is imported here, never pygame
+    from race.simulation import RaceSimulation, make_roster
+    from race.replay import ReplayRecorder
+    from race.telemetry import TelemetryPublisher, TelemetryServer
+    from utils.profiler import Profiler
+
+    profiler = Profiler().enable() if profile else None
+    server = None
+    total_ticks = 0
+    start = time.perf_counter()
+    for r in range(races):
+        race_seed = None if seed is None else seed + r
+        roster = make_roster(cars or len(RACE_ROSTER))
+        if policy_table:
+            roster = [dict(entry, agent=dict(entry["agent"], policy_table=True)) for entry in roster]
+        sim = RaceSimulation(seed=race_seed, roster=roster)
+        if record:
+            sim.recorder = ReplayRecorder(_replay_path(record, r, races), sim.track, len(sim.cars),
+                                          colors=[car.color for car in sim.cars])
+        sim.profiler = profiler
+        if telemetry:
+            # One server for the whole run; each race gets its own publisher
+            sim.telemetry = TelemetryPublisher(sim)
+            if server is None:
+                server = TelemetryServer(sim.telemetry, telemetry).start()
+            server.publisher = sim.telemetry
+        total_ticks += sim.run(ticks)
+        if sim.recorder is not None:
+            sim.recorder.close()
+
+        winner = sim.names[sim.winner] if sim.finished else "none"
+        laps = ", ".join(str(car.lap_count) for car in sim.cars)
+        print(f"race {r} seed={race_seed} ticks={sim.tick} winner={winner} laps=[{laps}] contacts={sim.contacts}")
+        if policy_table:
+            # Cars with the same agent settings share one table
+            users = {}
+            for name, agent in zip(sim.names, sim.agents):
+                if agent.policy is not None:
+                    users.setdefault(id(agent.policy), (agent.policy, []))[1].append(name)
+            for table, names in users.values():
+                stats = table.stats()
+                print(f"  {', '.join(names)}: policy table {stats['entries']} entries, hit rate {stats['hit_rate']:.1%}")
+
+    elapsed = time.perf_counter() - start
+    print(f"{races} race(s), {total_ticks} ticks in {elapsed:.2f}s "
+          f"=> {total_ticks / elapsed:.0f} ticks/s, {races / elapsed * 60:.1f} races/min")
+    if server is not None:
+        server.close()
+
+    if profiler is not None:
+        profiler.disable()
+        for line in profiler.overlay_lines():
+            print(line)
+        profiler.export(profile)
+
+
+def run_batch(seed, ticks, cars):
+    from config import AGGRESSIVE_AGENT
+    from track.track import Track
+    from race.batch import BatchSimulation
+
+    sim = BatchSimulation.at_start(Track(seed=seed), cars)
+    # The vectorized engine has no opponents or collisions, so only the track weights apply
+    weights = {k: AGGRESSIVE_AGENT[k] for k in ("progress_weight", "centering_weight", "off_track_penalty", "lookahead_depth")}
+    policy = lambda s: s.heuristic_steer(**weights)
+
+    start = time.perf_counter()
+    while sim.tick < ticks and not sim.lap_complete.all():
+        sim.step(policy)
+    elapsed = time.perf_counter() - start
+
+    print(f"{cars} cars, {sim.tick} ticks in {elapsed:.2f}s => {sim.tick / elapsed:.1f} ticks/s, "
+          f"{sim.lap_complete.sum()} finished, mean laps {sim.lap_count.mean():.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m race", description="AI Race Track Duel")
+    parser.add_argument("--headless", action="store_true", help="run without a window and without a frame cap")
+    parser.add_argument("--seed", type=int, default=None, help="track seed (race i uses seed + i)")
+    parser.add_argument("--ticks", type=int, default=20000, help=f"tick limit per race ({RACE_LAPS} laps to win)")
+    parser.add_argument("--races", type=int, default=1, help="number of races to run headless")
+    parser.add_argument("--record", metavar="PATH", help="write a replay (headless with --races N: PATH-<i>)")
+    parser.add_argument("--batch", type=int, default=0, metavar="CARS",
+                        help="headless: run CARS aggressive agents on the vectorized engine instead")
+    parser.add_argument("--cars", type=int, default=None, help="number of cars, cycling through RACE_ROSTER")
+    parser.add_argument("--profile", metavar="PATH", help="time each tick phase and write the stats (.json or .csv)")
+    parser.add_argument("--telemetry", nargs="?", const=TELEMETRY_ADDRESS, metavar="ADDRESS",
+                        help=f"stream live telemetry (host:port or unix:/path, default {TELEMETRY_ADDRESS}); "
+                             "watch it with python -m race.telemetry")
+    parser.add_argument("--policy-table", action="store_true",
+                        help="headless: agents reuse decisions from a per-track policy table (see python -m ai.policy_table)")
+    args = parser.parse_args()
+
+    if args.headless and args.batch:
+        run_batch(args.seed, args.ticks, args.batch)
+    elif args.headless:
+        run_headless(args.seed, args.ticks, args.races, args.record, args.profile, args.cars, args.telemetry,
+                     args.policy_table)
+    else:
+        from main import main as run_window
+        run_window(seed=args.seed, record=args.record, profile=args.profile, cars=args.cars, telemetry=args.telemetry)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import numpy as np
+
+from config import RACE_LAPS, TRACK_PROGRESS_UNIT
+from car.car import Car
+from ai.fuzzy import get_acceleration_table
+
+# Steering command per car: -1 => left, 0 => straight, 1 => right
+ACTION_STEER = {"left": -1, "right": 1, "straight": 0}
+
+# HeuristicAgent tries its actions in this order; ties keep the first one
+_AGENT_STEER = np.array([ACTION_STEER[a] for a in ["left", "right", "straight"]])
+
+
+class BatchSimulation:
+    """
+    Struct-of-arrays race engine: every car is one slot in NumPy arrays and
+    each step() advances all of them at once. Per tick it follows the same
+    order as the scalar path (track info, fuzzy speed control, steering,
+    physics, lap progress) so results match Car for the same inputs.
+
+    It is not a drop-in RaceSimulation: it leaves out car-to-car collisions
+    and opponent sensing, every car starts on the line (there is no
+    start_crossings, so no grid rows behind it), and heuristic_steer is the
+    hold search only. Races using any of those diverge from the scalar path.
+    """
+
+    def __init__(self, track, x, y, angle, speed=None, laps=RACE_LAPS, cell_size=6.0, max_candidates=12):
+        self.track = track
+        self.laps = laps
+        self.cell_size = cell_size
+
+        # Car constants, taken from the scalar Car so both paths agree
+        template = Car(0.0, 0.0, verbose=False)
+        self.max_speed = template.max_speed
+        self.acceleration_rate = template.acceleration_rate
+        self.brake_rate = template.brake_rate
+        self.turn_rate = template.turn_rate
+        self.launch_speed = template.launch_speed
+
+        # Track tables
+        self.n = len(track.centerline)
+        self.px = track.points[:, 0].copy()
+        self.py = track.points[:, 1].copy()
+        self.arc_length = np.asarray(track.arc_length)
+        self.curvature = track.curvature
+        self.future_heading = track.future_heading_table(10)
+        self.fuzzy_table = get_acceleration_table()
+        self._build_cell_candidates(track.width, max_candidates)
+
+        # Car state
+        self.x = np.array(x, dtype=np.float64)
+        self.y = np.array(y, dtype=np.float64)
+        self.angle = np.array(angle, dtype=np.float64)
+        count = len(self.x)
+        self.speed = np.zeros(count) if speed is None else np.array(speed, dtype=np.float64)
+        self.lap_count = np.zeros(count, dtype=np.int64)
+        self.lap_complete = np.zeros(count, dtype=bool)
+        self.finish_tick = np.full(count, -1, dtype=np.int64)
+        self.finish_time = np.full(count, np.nan) # Interpolated within the finishing tick
+        self.next_gate = np.ones(count, dtype=np.int64) # Checkpoint gate each car must cross next (see Car)
+
+        # Nearest centerline index for the current positions
+        self.track_index, self.dist_to_center = self.closest_indices(self.x, self.y)
+        self.tick = 0
+
+    @classmethod
+    def at_start(cls, track, count, **kwargs):
+        """count cars spread evenly across the track at the start line."""
+        start_x, start_y = track.centerline[0]
+        start_angle = track.heading[0]
+
+        half = track.width / 2 - 10
+        offsets = np.linspace(-half, half, count) if count > 1 else np.zeros(1)
+        x = start_x - np.sin(start_angle) * offsets
+        y = start_y + np.cos(start_angle) * offsets
+        return cls(track, x, y, np.full(count, start_angle), **kwargs)
+
+    def __len__(self):
+        return len(self.x)
+
+    # -------------------------------------------------
+    # Closest centerline point for many positions
+    # -------------------------------------------------
+    def _build_cell_candidates(self, margin, max_candidates):
+        """
+        For every grid cell, the centerline points that can be the nearest one
+        for some position inside that cell: a point qualifies if it is no
+        farther from the cell than the best worst-case distance of any point.
+        """
+        size = self.cell_size
+        self.origin_x = self.px.min() - margin
+        self.origin_y = self.py.min() - margin
+        self.grid_w = int((self.px.max() + margin - self.origin_x) // size) + 1
+        self.grid_h = int((self.py.max() + margin - self.origin_y) // size) + 1
+
+        cx, cy = np.meshgrid(np.arange(self.grid_w), np.arange(self.grid_h), indexing="ij")
+        cell_x = self.origin_x + cx.ravel() * size
+        cell_y = self.origin_y + cy.ravel() * size
+
+        # Closest and farthest distance from each point to each cell, a chunk of cells at a time
+        possible = np.zeros((len(cell_x), self.n), dtype=bool)
+        for start in range(0, len(cell_x), 2048):
+            rows = slice(start, start + 2048)
+            x0 = cell_x[rows, None]
+            y0 = cell_y[rows, None]
+            near_x = np.clip(self.px, x0, x0 + size) - self.px
+            near_y = np.clip(self.py, y0, y0 + size) - self.py
+            far_x = np.maximum(np.abs(self.px - x0), np.abs(self.px - x0 - size))
+            far_y = np.maximum(np.abs(self.py - y0), np.abs(self.py - y0 - size))
+            bound = np.hypot(far_x, far_y).min(axis=1, keepdims=True)
+            possible[rows] = np.hypot(near_x, near_y) <= bound
+
+        # Padded with the first candidate; crowded cells go to a wider table
+        counts = possible.sum(axis=1)
+        crowded = np.flatnonzero(counts > max_candidates)
+        self.cell_crowded = np.full(len(counts), -1, dtype=np.int64)
+        self.cell_crowded[crowded] = np.arange(len(crowded))
+        self.cell_candidates = self._pad_candidates(possible, np.flatnonzero(counts <= max_candidates), len(counts), max_candidates)
+        self.crowded_candidates = self._pad_candidates(possible[crowded], range(len(crowded)), len(crowded), counts.max())
+
+        # Candidate coordinates stored per row so a query gathers whole rows
+        self.cell_xy = (self.px[self.cell_candidates], self.py[self.cell_candidates])
+        self.crowded_xy = (self.px[self.crowded_candidates], self.py[self.crowded_candidates])
+
+    @staticmethod
+    def _pad_candidates(possible, rows, count, width):
+        table = np.zeros((count, width), dtype=np.int64)
+        for row in rows:
+            found = np.flatnonzero(possible[row])
+            table[row] = found[0]
+            table[row, :len(found)] = found
+        return table
+
+    def _closest_candidates(self, x, y, rows, candidates, coords):
+        dx = coords[0][rows] - x[:, None]
+        dy = coords[1][rows] - y[:, None]
+        d2 = dx * dx + dy * dy
+        best_d2 = d2.min(axis=1)
+
+        # Lowest index among equal distances, like the linear scan
+        candidates = candidates[rows]
+        best_i = np.where(d2 == best_d2[:, None], candidates, self.n).min(axis=1)
+        return best_i, np.sqrt(best_d2)
+
+    def closest_indices(self, x, y):
+        """
+        Nearest centerline index and distance for each (x, y), same as
+        closest_point_on_track. Only the candidates of each position's grid
+        cell are compared; positions off the grid fall back to the full scan.
+        """
+        shape = np.shape(x)
+        x = np.ravel(np.asarray(x, dtype=np.float64))
+        y = np.ravel(np.asarray(y, dtype=np.float64))
+        best_i = np.empty(len(x), dtype=np.int64)
+        best_d = np.empty(len(x))
+
+        gx = np.floor((x - self.origin_x) / self.cell_size).astype(np.int64)
+        gy = np.floor((y - self.origin_y) / self.cell_size).astype(np.int64)
+        inside = (gx >= 0) & (gx < self.grid_w) & (gy >= 0) & (gy < self.grid_h)
+        cell = np.where(inside, gx * self.grid_h + gy, 0)
+        crowded = self.cell_crowded[cell]
+
+        rows = inside & (crowded < 0)
+        best_i[rows], best_d[rows] = self._closest_candidates(
+            x[rows], y[rows], cell[rows], self.cell_candidates, self.cell_xy)
+
+        rows = inside & (crowded >= 0)
+        if rows.any():
+            best_i[rows], best_d[rows] = self._closest_candidates(
+                x[rows], y[rows], crowded[rows], self.crowded_candidates, self.crowded_xy)
+
+        rows = ~inside
+        if rows.any():
+            best_i[rows], best_d[rows] = self._closest_exact(x[rows], y[rows])
+        return best_i.reshape(shape), best_d.reshape(shape)
+
+    def _closest_exact(self, x, y, chunk=4096):
+        """Full scan over every centerline point."""
+        best_i = np.empty(len(x), dtype=np.int64)
+        best_d = np.empty(len(x))
+        for start in range(0, len(x), chunk):
+            rows = slice(start, start + chunk)
+            d = np.hypot(self.px - x[rows, None], self.py - y[rows, None])
+            best_i[rows] = d.argmin(axis=1)
+            best_d[rows] = d[np.arange(len(d)), best_i[rows]]
+        return best_i, best_d
+
+    def progress(self, x, y):
+        """
+        Track.progress for many positions: (distance along the track, closest
+        index, distance to the centerline), projected onto the segments either
+        side of the closest point with the same arithmetic.
+        """
+        idx, _ = self.closest_indices(x, y)
+        last = self.n - 1 # Same point as index 0
+        idx = np.where(idx == last, 0, idx)
+        prev = np.where(idx > 0, idx - 1, last - 1)
+
+        best_d = best_s = None
+        for a in (idx, prev): # The segment leaving idx wins ties
+            ax, ay = self.px[a], self.py[a]
+            abx = self.px[a + 1] - ax
+            aby = self.py[a + 1] - ay
+            length_sq = abx * abx + aby * aby
+            t = np.clip(((x - ax) * abx + (y - ay) * aby) / np.where(length_sq == 0, 1.0, length_sq), 0.0, 1.0)
+            t = np.where(length_sq == 0, 0.0, t)
+            d = np.hypot(x - (ax + t * abx), y - (ay + t * aby))
+            s = self.arc_length[a] + t * (self.arc_length[a + 1] - self.arc_length[a])
+            if best_d is None:
+                best_d, best_s = d, s
+            else:
+                closer = d < best_d
+                best_d = np.where(closer, d, best_d)
+                best_s = np.where(closer, s, best_s)
+        return best_s, idx, best_d
+
+    # -------------------------------------------------
+    # Tick
+    # -------------------------------------------------
+    def control_speed(self):
+        """Fuzzy speed control from the curvature at each car's track index."""
+        command = self.fuzzy_table.lookup_many(self.speed, self.curvature[self.track_index])
+        brake = command < -0.3
+        accelerate = (command > 0.3) | (~brake & (self.speed < self.launch_speed))
+        maintain = ~(accelerate | brake)
+
+        self.speed[accelerate] = np.minimum(self.speed[accelerate] + self.acceleration_rate, self.max_speed)
+        self.speed[brake] = np.maximum(self.speed[brake] - self.brake_rate, 0.0)
+        self.speed[maintain] = np.maximum(self.speed[maintain] - 0.05, 0.0)
+
+    def heuristic_steer(self, progress_weight=1.0, centering_weight=0.1, off_track_penalty=1000, lookahead_depth=3):
+        """
+        HeuristicAgent.decide_action for every car at once. Weights may be
+        scalars or per-car arrays, which is what population evaluation needs.
+        """
+        progress_weight = np.asarray(progress_weight, dtype=np.float64)[..., None]
+        centering_weight = np.asarray(centering_weight, dtype=np.float64)[..., None]
+        off_track_penalty = np.asarray(off_track_penalty, dtype=np.float64)[..., None]
+
+        # Hold each action for lookahead_depth steps: shape (cars, actions)
+        x = np.repeat(self.x[:, None], 3, axis=1)
+        y = np.repeat(self.y[:, None], 3, axis=1)
+        angle = np.repeat(self.angle[:, None], 3, axis=1)
+        speed = self.speed[:, None]
+        turn = _AGENT_STEER * self.turn_rate
+        for _ in range(lookahead_depth):
+            angle = angle + turn
+            x = x + speed * np.cos(angle)
+            y = y + speed * np.sin(angle)
+
+        along, idx, dist = self.progress(x, y)
+
+        # Relative to each car's own progress across the start line, as Track.unwrap_progress
+        origin = self.arc_length[self.track_index][:, None]
+        length = self.arc_length[-1]
+        along = np.where(along - origin > length / 2, along - length, np.where(origin - along > length / 2, along + length, along))
+
+        progress_score = progress_weight * along / TRACK_PROGRESS_UNIT
+        centering_penalty = -centering_weight * dist
+        collision_penalty = np.where(dist > self.track.width // 2, -off_track_penalty, 0)
+
+        diff = angle - self.future_heading[idx]
+        alignment_bonus = -0.5 * np.abs(np.arctan2(np.sin(diff), np.cos(diff)))
+
+        score = progress_score + centering_penalty + collision_penalty + alignment_bonus
+        return _AGENT_STEER[score.argmax(axis=1)]
+
+    def step(self, steer=None):
+        """
+        Advance every car one tick. steer => array of -1/0/1 per car (see
+        ACTION_STEER), or a callable taking this simulation and returning one;
+        it runs after speed control, like the agents in the scalar loop.
+        None drives straight.
+        """
+        self.control_speed()
+
+        if callable(steer):
+            steer = steer(self)
+        if steer is not None:
+            self.angle += np.asarray(steer) * self.turn_rate
+
+        # Physics
+        x0, y0 = self.x.copy(), self.y.copy()
+        self.x += self.speed * np.cos(self.angle)
+        self.y += self.speed * np.sin(self.angle)
+
+        # The new index is next tick's track info
+        self.track_index, self.dist_to_center = self.closest_indices(self.x, self.y)
+        self.tick += 1
+
+        # Lap progress: each move against the car's next gate, as Track.gate_crossing
+        track = self.track
+        gate = self.next_gate
+        gx, gy, dx, dy = track.gate_x[gate], track.gate_y[gate], track.gate_dx[gate], track.gate_dy[gate]
+        before = (x0 - gx) * dx + (y0 - gy) * dy
+        after = (self.x - gx) * dx + (self.y - gy) * dy
+        racing = ~self.lap_complete & (self.lap_count < self.laps)
+        crossed = racing & (before < 0) & (after >= 0)
+        t = before / np.where(crossed, before - after, 1.0)
+        lateral = (x0 + t * (self.x - x0) - gx) * dy - (y0 + t * (self.y - y0) - gy) * dx
+        crossed &= np.abs(lateral) <= track.gate_half_width
+
+        self.next_gate = np.where(crossed, (gate + 1) % len(track.gates), gate)
+        lap = crossed & (gate == 0)
+        self.lap_count += lap
+
+        finished = lap & (self.lap_count >= self.laps)
+        self.lap_complete |= finished
+        self.finish_tick[finished] = self.tick
+        self.finish_time[finished] = self.tick - 1 + t[finished]
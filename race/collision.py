@@ -0,0 +1,164 @@
+import math
+
+from config import COLLISION_SPEED_FACTOR
+
+# Cell offsets that visit every neighbouring pair of cells exactly once
+_HALF_NEIGHBOURHOOD = [(0, 0), (1, 0), (-1, 1), (0, 1), (1, 1)]
+_NEIGHBOURHOOD = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+class SpatialHash:
+    """
+    Uniform hash grid over car positions, rebuilt every tick. Each item lives
+    in the one cell holding its position, so any two items closer than
+    cell_size are in the same or in adjacent cells.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def build(self, positions):
+        """positions => list of (x, y); items are their list indices."""
+        size = self.cell_size
+        cells = {}
+        for i, (x, y) in enumerate(positions):
+            key = (int(x // size), int(y // size))
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [i]
+            else:
+                bucket.append(i)
+        self.cells = cells
+        return self
+
+    def pairs(self):
+        """Every (i, j), i < j, of items in the same or adjacent cells, in a fixed order."""
+        cells = self.cells
+        found = []
+        for (cx, cy), bucket in cells.items():
+            for dx, dy in _HALF_NEIGHBOURHOOD:
+                if dx == 0 and dy == 0:
+                    for a in range(len(bucket)):
+                        for b in range(a + 1, len(bucket)):
+                            found.append((bucket[a], bucket[b]))
+                    continue
+                other = cells.get((cx + dx, cy + dy))
+                if other is not None:
+                    for i in bucket:
+                        for j in other:
+                            found.append((i, j) if i < j else (j, i))
+        found.sort()
+        return found
+
+    def near(self, x, y):
+        """Items in the cell of (x, y) and the eight around it."""
+        size = self.cell_size
+        cx, cy = int(x // size), int(y // size)
+        items = []
+        for dx, dy in _NEIGHBOURHOOD:
+            bucket = self.cells.get((cx + dx, cy + dy))
+            if bucket is not None:
+                items.extend(bucket)
+        return items
+
+
+def _axes(car):
+    c = math.cos(car.angle)
+    s = math.sin(car.angle)
+    return (c, s), (-s, c)
+
+
+def obb_overlap(a, b):
+    """
+    Separating-axis test between two cars as oriented rectangles (width along
+    the heading, height across it). Returns (nx, ny, depth) with the unit
+    normal pointing from a to b, or None if they do not touch.
+    """
+    dx = b.x - a.x
+    dy = b.y - a.y
+    a_fwd, a_side = _axes(a)
+    b_fwd, b_side = _axes(b)
+    a_half = (a.width / 2, a.height / 2)
+    b_half = (b.width / 2, b.height / 2)
+
+    best = None
+    for ax, ay in (a_fwd, a_side, b_fwd, b_side):
+        ra = a_half[0] * abs(a_fwd[0] * ax + a_fwd[1] * ay) + a_half[1] * abs(a_side[0] * ax + a_side[1] * ay)
+        rb = b_half[0] * abs(b_fwd[0] * ax + b_fwd[1] * ay) + b_half[1] * abs(b_side[0] * ax + b_side[1] * ay)
+        d = dx * ax + dy * ay
+        depth = ra + rb - abs(d)
+        if depth <= 0:
+            return None
+        if best is None or depth < best[2]:
+            sign = 1.0 if d >= 0 else -1.0
+            best = (ax * sign, ay * sign, depth)
+    return best
+
+
+def resolve_collisions(cars, grid, track=None, touching=None):
+    """
+    Broad phase on the hash grid, exact rectangle test on the candidate
+    pairs, then push each touching pair apart along the contact normal.
+    touching => set of the (i, j) pairs in contact after the last call,
+    updated in place. Only a pair that was not already touching counts as
+    a contact and scrubs both cars' speed, so cars leaning on each other
+    are not slowed again every tick. track => pushes never move a car off
+    it (see _keep_on_track). Returns the number of new contacts.
+    """
+    grid.build([(car.x, car.y) for car in cars])
+    previous = touching if touching is not None else ()
+    now = set()
+    contacts = 0
+    for i, j in grid.pairs():
+        a, b = cars[i], cars[j]
+        hit = obb_overlap(a, b)
+        if hit is None:
+            continue
+
+        nx, ny, depth = hit
+        push = depth / 2
+        ax, ay, bx, by = a.x, a.y, b.x, b.y
+        a.x -= nx * push
+        a.y -= ny * push
+        b.x += nx * push
+        b.y += ny * push
+        if track is not None:
+            _keep_on_track(a, track, ax, ay)
+            _keep_on_track(b, track, bx, by)
+
+        now.add((i, j))
+        if (i, j) not in previous:
+            a.speed *= COLLISION_SPEED_FACTOR
+            b.speed *= COLLISION_SPEED_FACTOR
+            contacts += 1
+
+    if touching is not None:
+        touching.clear()
+        touching.update(now)
+    return contacts
+
+
+def _keep_on_track(car, track, x0, y0):
+    """
+    Pull a car pushed from (x0, y0) back toward the centerline, to the
+    track edge or to its distance before the push if it was further out.
+    """
+    (px, py), _, _ = track.project((car.x, car.y), car.track_hint)
+    dx = car.x - px
+    dy = car.y - py
+    d = math.hypot(dx, dy)
+    limit = track.width / 2
+    if d <= limit:
+        return
+
+    (qx, qy), _, _ = track.project((x0, y0), car.track_hint)
+    limit = max(limit, math.hypot(x0 - qx, y0 - qy))
+    if d > limit:
+        car.x = px + dx * limit / d
+        car.y = py + dy * limit / d
+
+
+def collision_cell_size(car):
+    """Smallest cell for which touching cars are always in adjacent cells."""
+    return math.hypot(car.width, car.height)
@@ -0,0 +1,341 @@
+import argparse
+import json
+import math
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from config import AGGRESSIVE_AGENT
+
+# Tunable parameters => (name, low, high). Agent weights first, then fuzzy
+# triangle breakpoints as "<input>.<term>.<a|b|c>"; the breakpoints not listed
+# keep their values from ai/fuzzy.py (e.g. the universe ends).
+PARAMETERS = [
+    ("progress_weight", 0.1, 3.0),
+    ("centering_weight", 0.0, 1.0),
+    ("off_track_penalty", 100.0, 5000.0),
+    ("speed.slow.c", 2.0, 12.0),
+    ("speed.medium.a", 0.0, 10.0),
+    ("speed.medium.b", 2.0, 14.0),
+    ("speed.medium.c", 6.0, 15.0),
+    ("speed.fast.a", 4.0, 14.0),
+    ("speed.fast.b", 8.0, 15.0),
+    ("curve.gentle.c", 0.1, 1.0),
+    ("curve.sharp.a", 0.0, 0.9),
+    ("curve.sharp.b", 0.2, 1.0),
+    ("accel.maintain.a", -1.0, 0.0),
+    ("accel.maintain.c", 0.0, 1.0),
+]
+
+OPT_LAPS = 2 # Laps per time trial
+OPT_MAX_TICKS = 3000 # A trial not done by then counts as a DNF
+OFF_TRACK_WEIGHT = 2.0 # Cost per tick spent outside the track edge
+DNF_PENALTY = 3000 # Extra cost for not finishing a trial
+
+_BREAKPOINTS = {"a": 0, "b": 1, "c": 2}
+
+
+def default_vector():
+    """The hand-tuned starting point: AGGRESSIVE_AGENT weights and the fuzzy.py breakpoints."""
+    from ai import fuzzy
+
+    terms = {"speed": fuzzy.SPEED_TERMS, "curve": fuzzy.CURVE_TERMS, "accel": fuzzy.ACCEL_TERMS}
+    vector = []
+    for name, _, _ in PARAMETERS:
+        if "." in name:
+            group, term, point = name.split(".")
+            vector.append(float(terms[group][term][_BREAKPOINTS[point]]))
+        else:
+            vector.append(float(AGGRESSIVE_AGENT[name]))
+    return vector
+
+
+def decode(vector):
+    """Parameter vector => (agent config, (speed, curve, acceleration) fuzzy terms)."""
+    from ai import fuzzy
+
+    agent = dict(AGGRESSIVE_AGENT)
+    terms = {
+        "speed": {k: list(v) for k, v in fuzzy.SPEED_TERMS.items()},
+        "curve": {k: list(v) for k, v in fuzzy.CURVE_TERMS.items()},
+        "accel": {k: list(v) for k, v in fuzzy.ACCEL_TERMS.items()},
+    }
+    for (name, _, _), value in zip(PARAMETERS, vector):
+        if "." in name:
+            group, term, point = name.split(".")
+            terms[group][term][_BREAKPOINTS[point]] = value
+        else:
+            agent[name] = value
+
+    # A triangle needs a <= b <= c whatever the search proposes
+    for group in terms.values():
+        for term, abc in group.items():
+            group[term] = sorted(abc)
+    return agent, (terms["speed"], terms["curve"], terms["accel"])
+
+
+# -------------------------------------------------
+# Evaluation (runs in the worker processes)
+# -------------------------------------------------
+_tracks = {} # Seed => Track, built once per worker
+
+def _init_worker():
+    # Candidates are scored with the table controller, which is what the tuned terms build
+    import ai.fuzzy
+    from utils.kernels import warm_up
+    ai.fuzzy.FUZZY_CONTROLLER = "table"
+    warm_up()
+
+
+def time_trial(track, agent_config, budget=math.inf, laps=OPT_LAPS, max_ticks=OPT_MAX_TICKS):
+    """
+    One car alone on the track. Cost => ticks to finish the laps plus
+    OFF_TRACK_WEIGHT per tick off the track, plus DNF_PENALTY if it never
+    finishes. Stops as soon as the cost exceeds budget and returns that
+    partial cost, which is already a lower bound of the full one.
+    """
+    from race.simulation import RaceSimulation
+
+    sim = RaceSimulation(track=track, agent_configs=[agent_config])
+    car = sim.cars[0]
+    half_width = track.width / 2
+    off_track = 0
+
+    while len(sim.lap_ticks[0]) < laps and sim.tick < max_ticks:
+        sim.step()
+        # The tick's own track query, made before the car moved
+        if car.track_distance > half_width:
+            off_track += 1
+        cost = sim.tick + OFF_TRACK_WEIGHT * off_track
+        if cost > budget:
+            return cost, False
+
+    cost = sim.tick + OFF_TRACK_WEIGHT * off_track
+    if len(sim.lap_ticks[0]) < laps:
+        cost += DNF_PENALTY
+    return cost, True
+
+
+def evaluate(vector, track_seeds, cutoff=math.inf):
+    """
+    Total time-trial cost over the seeded tracks. A candidate whose running
+    total passes cutoff (it can no longer reach the elite) is stopped early;
+    returns (cost, complete).
+    """
+    from ai.fuzzy import FuzzyTable, set_acceleration_table
+    from track.track import Track
+
+    agent, terms = decode(vector)
+    set_acceleration_table(FuzzyTable(terms=terms))
+
+    total = 0.0
+    for seed in track_seeds:
+        if seed not in _tracks:
+            _tracks[seed] = Track(seed=seed)
+        cost, complete = time_trial(_tracks[seed], agent, budget=cutoff - total)
+        total += cost
+        if not complete:
+            return total, False
+    return total, True
+
+
+def _evaluate_star(args):
+    key, vector, track_seeds, cutoff = args
+    return key, evaluate(vector, track_seeds, cutoff)
+
+
+# -------------------------------------------------
+# Genetic algorithm
+# -------------------------------------------------
+def _round(vector):
+    # Candidates are kept at the precision of their memo key, so a key decodes to the exact vector
+    return [float(f"{v:.6g}") for v in vector]
+
+
+def _key(vector):
+    return ",".join(f"{v:.6g}" for v in vector)
+
+
+class Optimizer:
+    """
+    Real-coded genetic algorithm over PARAMETERS: elitism, tournament
+    selection, blend crossover and Gaussian mutation scaled to each bound.
+    All state (population, scores, memo, RNG) lives in a JSON checkpoint
+    that is rewritten after every generation, so a run can be resumed.
+    """
+
+    def __init__(self, track_seeds, population=16, elite=4, mutation=0.1, seed=0, vectors=None):
+        self.track_seeds = list(track_seeds)
+        self.population_size = population
+        self.elite = elite
+        self.mutation = mutation
+
+        self.low = np.array([low for _, low, _ in PARAMETERS])
+        self.high = np.array([high for _, _, high in PARAMETERS])
+        self.rng = np.random.default_rng(seed)
+
+        self.generation = 0
+        self.memo = {} # key => (cost, complete); incomplete costs are lower bounds
+        self.history = [] # best cost per generation
+
+        if vectors is not None:
+            self.population = vectors # Resumed from a checkpoint
+            return
+
+        # First generation: the hand-tuned vector plus random ones
+        start = np.clip(default_vector(), self.low, self.high)
+        randoms = self.rng.uniform(self.low, self.high, size=(population - 1, len(PARAMETERS)))
+        self.population = [_round(v) for v in [start.tolist()] + randoms.tolist()]
+
+    # -------------------------------------------------
+    # Checkpoints
+    # -------------------------------------------------
+    def state(self):
+        return {
+            "parameters": [name for name, _, _ in PARAMETERS],
+            "track_seeds": self.track_seeds,
+            "population_size": self.population_size,
+            "elite": self.elite,
+            "mutation": self.mutation,
+            "generation": self.generation,
+            "population": self.population,
+            "memo": self.memo,
+            "history": self.history,
+            "rng": self.rng.bit_generator.state,
+        }
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state(), f)
+        os.replace(tmp, path) # An interrupted write never replaces a good checkpoint
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            state = json.load(f)
+        if state["parameters"] != [name for name, _, _ in PARAMETERS]:
+            raise ValueError(f"{path} was written for a different parameter list")
+
+        opt = cls(state["track_seeds"], state["population_size"], state["elite"], state["mutation"],
+                  vectors=state["population"])
+        opt.generation = state["generation"]
+        opt.memo = {key: tuple(value) for key, value in state["memo"].items()}
+        opt.history = state["history"]
+        opt.rng.bit_generator.state = state["rng"]
+        return opt
+
+    # -------------------------------------------------
+    # Search
+    # -------------------------------------------------
+    def score_population(self, pool):
+        """
+        Costs of the current population; only vectors not in the memo are raced.
+        A candidate stopped early only has a lower bound, so it counts as
+        math.inf and ranks behind every complete one.
+        """
+        known = sorted(self.memo[_key(v)][0] for v in self.population if _key(v) in self.memo
+                       and self.memo[_key(v)][1])
+        # Anything worse than the current elite cut can stop early
+        cutoff = known[self.elite - 1] if len(known) >= self.elite else math.inf
+
+        pending = {}
+        for vector in self.population:
+            key = _key(vector)
+            if key not in self.memo and key not in pending:
+                pending[key] = vector
+
+        jobs = [(key, vector, self.track_seeds, cutoff) for key, vector in pending.items()]
+        for key, result in pool.imap_unordered(_evaluate_star, jobs):
+            self.memo[key] = result
+        return [cost if complete else math.inf for cost, complete in (self.memo[_key(v)] for v in self.population)]
+
+    def _tournament(self, costs, size=3):
+        picks = self.rng.integers(len(costs), size=size)
+        return self.population[min(picks, key=lambda i: costs[i])]
+
+    def next_generation(self, costs):
+        order = np.argsort(costs, kind="stable")
+        children = [self.population[i] for i in order[:self.elite]]
+        span = self.high - self.low
+
+        while len(children) < self.population_size:
+            a = np.array(self._tournament(costs))
+            b = np.array(self._tournament(costs))
+
+            # Blend crossover, then mutate each gene with probability 1/n
+            w = self.rng.uniform(-0.25, 1.25, size=len(a))
+            child = a + w * (b - a)
+            mutate = self.rng.random(len(a)) < 1.0 / len(a)
+            child += mutate * self.rng.normal(0, self.mutation, size=len(a)) * span
+            children.append(_round(np.clip(child, self.low, self.high)))
+
+        self.population = children
+        self.generation += 1
+
+    def best(self):
+        """(cost, vector) of the best fully scored candidate so far."""
+        complete = [(cost, key) for key, (cost, done) in self.memo.items() if done]
+        if not complete:
+            return None
+        cost, key = min(complete)
+        return cost, [float(v) for v in key.split(",")]
+
+    def run(self, generations, workers=None, checkpoint=None, log=print):
+        from utils.kernels import warm_up
+        warm_up() # Compiled once here; the workers load the cached kernels
+        with Pool(workers, initializer=_init_worker) as pool:
+            while self.generation < generations:
+                start = time.perf_counter()
+                costs = self.score_population(pool)
+                finished = [cost for cost in costs if cost < math.inf]
+                best = min(finished)
+                self.history.append(best)
+                log(f"generation {self.generation}: best {best:.1f}, median {float(np.median(finished)):.1f}, "
+                    f"{len(costs) - len(finished)} cut ({len(self.memo)} scored, {time.perf_counter() - start:.1f}s)")
+
+                self.next_generation(costs)
+                if checkpoint:
+                    self.save(checkpoint)
+        return self.best()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m race.optimizer",
+                                     description="Tune agent weights and fuzzy breakpoints on seeded time trials")
+    parser.add_argument("--generations", type=int, default=20, help="total generations (a resumed run continues up to this)")
+    parser.add_argument("--population", type=int, default=16)
+    parser.add_argument("--elite", type=int, default=4, help="best candidates kept unchanged each generation")
+    parser.add_argument("--mutation", type=float, default=0.1, help="mutation size as a fraction of each range")
+    parser.add_argument("--seeds", type=int, default=4, help="number of tracks (seeds 0..N-1)")
+    parser.add_argument("--seed", type=int, default=0, help="optimizer RNG seed")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--checkpoint", default="optimizer_checkpoint.json", help="resumed from if it exists")
+    parser.add_argument("--output", metavar="JSON", help="write the best agent config and fuzzy terms here")
+    args = parser.parse_args()
+
+    if os.path.exists(args.checkpoint):
+        opt = Optimizer.load(args.checkpoint)
+        print(f"resuming {args.checkpoint} at generation {opt.generation} ({len(opt.memo)} scored)")
+    else:
+        opt = Optimizer(range(args.seeds), args.population, args.elite, args.mutation, args.seed)
+
+    result = opt.run(args.generations, args.workers, args.checkpoint)
+    if result is None:
+        print("no candidate finished scoring")
+        return
+
+    cost, vector = result
+    agent, (speed_terms, curve_terms, accel_terms) = decode(vector)
+    best = {"cost": cost, "agent": agent,
+            "fuzzy": {"speed": speed_terms, "curve": curve_terms, "accel": accel_terms}}
+    print(json.dumps(best, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(best, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
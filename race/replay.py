@@ -0,0 +1,257 @@
+import argparse
+import csv
+import os
+import queue
+import struct
+import threading
+from types import SimpleNamespace
+
+from config import REPLAY_KEYFRAME_INTERVAL, REPLAY_BUFFER_BYTES
+
+# File layout
+#   header:  magic, version, car count, keyframe interval, track width, point count
+#   points:  closed track centerline as float64 (x, y) pairs
+#   colors:  one RGB triplet per car (version 2 on)
+#   blocks:  one keyframe tick followed by (interval - 1) delta ticks, all fixed size,
+#            so the block holding any tick is found by arithmetic alone
+MAGIC = b"RPLY"
+VERSION = 2
+READABLE_VERSIONS = (1, 2) # Version 1 has no colors; playback falls back to the default roster
+_HEADER = struct.Struct("<4sHHHHI")
+_POINT = struct.Struct("<dd")
+_COLOR = struct.Struct("<BBB")
+
+# Fixed-point scales; deltas are taken between quantized values so nothing drifts
+POS_SCALE = 100 # 0.01 px
+ANGLE_SCALE = 10000 # 0.0001 rad
+SPEED_SCALE = 1000
+COMMAND_SCALE = 100
+
+# Per car: keyframe => absolute values, delta => change since the previous tick
+_KEY_CAR = struct.Struct("<iiiHBb")
+_DELTA_CAR = struct.Struct("<hhhhBb")
+
+ACTIONS = ["left", "right", "straight"]
+_ACTION_CODE = {action: i for i, action in enumerate(ACTIONS)}
+
+
+def _quantize(car):
+    return (
+        round(car.x * POS_SCALE),
+        round(car.y * POS_SCALE),
+        round(car.angle * ANGLE_SCALE),
+        round(car.speed * SPEED_SCALE),
+        _ACTION_CODE.get(car.last_action, 2),
+        round(max(-1.0, min(1.0, car.last_command)) * COMMAND_SCALE),
+    )
+
+
+class ReplayRecorder:
+    """
+    Streams per-tick car state to a replay file. Ticks are packed into an
+    in-memory buffer; full buffers are handed to a writer thread, so the sim
+    loop never waits on the disk and memory stays bounded however long the
+    session runs.
+    """
+
+    def __init__(self, path, track, car_count, colors=None, keyframe_interval=REPLAY_KEYFRAME_INTERVAL,
+                 buffer_bytes=REPLAY_BUFFER_BYTES):
+        if colors is None:
+            from race.simulation import make_roster
+            colors = [entry["color"] for entry in make_roster(car_count)]
+        self.car_count = car_count
+        self.keyframe_interval = keyframe_interval
+        self.buffer_bytes = buffer_bytes
+        self.ticks = 0
+
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, car_count, keyframe_interval, track.width, len(track.centerline)))
+        for point in track.centerline:
+            self._file.write(_POINT.pack(*point))
+        for color in colors:
+            self._file.write(_COLOR.pack(*color))
+
+        self._buffer = bytearray()
+        self._previous = None
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                break
+            self._file.write(chunk)
+
+    def record(self, cars):
+        """Append one tick for all cars."""
+        state = [_quantize(car) for car in cars]
+
+        if self.ticks % self.keyframe_interval == 0:
+            for values in state:
+                self._buffer += _KEY_CAR.pack(*values)
+        else:
+            for values, prev in zip(state, self._previous):
+                self._buffer += _DELTA_CAR.pack(
+                    values[0] - prev[0], values[1] - prev[1], values[2] - prev[2], values[3] - prev[3],
+                    values[4], values[5],
+                )
+
+        self._previous = state
+        self.ticks += 1
+
+        if len(self._buffer) >= self.buffer_bytes:
+            self._queue.put(bytes(self._buffer))
+            self._buffer.clear()
+
+    def close(self):
+        if self._buffer:
+            self._queue.put(bytes(self._buffer))
+            self._buffer.clear()
+        self._queue.put(None)
+        self._writer.join()
+        self._file.close()
+
+
+class ReplayReader:
+    """Random access to a replay file; any tick is decoded from its block's keyframe."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        magic, version, self.car_count, self.keyframe_interval, self.track_width, n_points = \
+            _HEADER.unpack(self._file.read(_HEADER.size))
+        if magic != MAGIC or version not in READABLE_VERSIONS:
+            raise ValueError(f"{path} is not a replay file of version {READABLE_VERSIONS}")
+
+        self.centerline = [_POINT.unpack(self._file.read(_POINT.size)) for _ in range(n_points)]
+        self.colors = None # Recorded car colors, None for a version 1 file
+        if version >= 2:
+            self.colors = [_COLOR.unpack(self._file.read(_COLOR.size)) for _ in range(self.car_count)]
+        self._data_start = self._file.tell()
+
+        self._key_size = _KEY_CAR.size * self.car_count
+        self._delta_size = _DELTA_CAR.size * self.car_count
+        self._block_size = self._key_size + (self.keyframe_interval - 1) * self._delta_size
+
+        data = os.path.getsize(path) - self._data_start
+        blocks, rest = divmod(data, self._block_size)
+        # A file still being written may end inside a record; count whole ticks only
+        self.ticks = blocks * self.keyframe_interval
+        if rest >= self._key_size:
+            self.ticks += 1 + (rest - self._key_size) // self._delta_size
+
+    def __len__(self):
+        return self.ticks
+
+    def close(self):
+        self._file.close()
+
+    def _decode_block(self, raw):
+        """Yield the quantized state of every tick stored in raw, keyframe first."""
+        state = [list(v) for v in _KEY_CAR.iter_unpack(raw[:self._key_size])]
+        yield state
+        for offset in range(self._key_size, len(raw), self._delta_size):
+            for car, d in zip(state, _DELTA_CAR.iter_unpack(raw[offset:offset + self._delta_size])):
+                car[0] += d[0]
+                car[1] += d[1]
+                car[2] += d[2]
+                car[3] += d[3]
+                car[4] = d[4]
+                car[5] = d[5]
+            yield state
+
+    @staticmethod
+    def _to_floats(state):
+        return [
+            (x / POS_SCALE, y / POS_SCALE, angle / ANGLE_SCALE, speed / SPEED_SCALE, ACTIONS[action], command / COMMAND_SCALE)
+            for x, y, angle, speed, action, command in state
+        ]
+
+    def _read_block(self, block, last_tick_in_block):
+        self._file.seek(self._data_start + block * self._block_size)
+        return self._file.read(self._key_size + last_tick_in_block * self._delta_size)
+
+    def state_at(self, tick):
+        """List of (x, y, angle, speed, action, command) per car at one tick."""
+        if not 0 <= tick < self.ticks:
+            raise IndexError(f"tick {tick} out of range 0..{self.ticks - 1}")
+        block, t = divmod(tick, self.keyframe_interval)
+        for state in self._decode_block(self._read_block(block, t)):
+            pass
+        return self._to_floats(state)
+
+    def iter_ticks(self, start=0, stop=None):
+        """Yield (tick, state) for start <= tick < stop, one block in memory at a time."""
+        stop = self.ticks if stop is None else min(stop, self.ticks)
+        tick = start
+        while tick < stop:
+            block, first = divmod(tick, self.keyframe_interval)
+            block_start = block * self.keyframe_interval
+            last = min(self.keyframe_interval, stop - block_start) - 1
+            for t, state in enumerate(self._decode_block(self._read_block(block, last))):
+                if t >= first:
+                    yield block_start + t, self._to_floats(state)
+            tick = block_start + last + 1
+
+    def export_csv(self, path, start=0, stop=None):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["tick", "car", "x", "y", "angle", "speed", "action", "command"])
+            for tick, state in self.iter_ticks(start, stop):
+                for i, car in enumerate(state):
+                    writer.writerow([tick, i, *car])
+
+
+def play(reader, start=0, stop=None):
+    """Show a segment of a replay in a window at the sim tick rate."""
+    import pygame
+
+    from config import SCREEN_WIDTH, SCREEN_HEIGHT, SIM_TICK_RATE, CAR_WIDTH, CAR_HEIGHT
+    from race.simulation import make_roster
+    from render.renderer import Renderer
+    from track.track import Track
+
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("AI Race Track Duel - replay")
+    clock = pygame.time.Clock()
+
+    track = Track.from_centerline(reader.centerline, reader.track_width)
+    renderer = Renderer(screen, track)
+    colors = reader.colors or [entry["color"] for entry in make_roster(reader.car_count)]
+
+    for tick, state in reader.iter_ticks(start, stop):
+        if any(event.type == pygame.QUIT for event in pygame.event.get()):
+            break
+
+        renderer.begin_frame()
+        for i, (x, y, angle, speed, action, command) in enumerate(state):
+            pose = SimpleNamespace(x=x, y=y, angle=angle, width=CAR_WIDTH, height=CAR_HEIGHT, color=colors[i % len(colors)])
+            renderer.draw_car(pose)
+        renderer.blit(renderer.text(f"Tick {tick}", (255, 255, 255)), (10, 10))
+        renderer.end_frame()
+        clock.tick(SIM_TICK_RATE)
+
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m race.replay", description="Play or export a race replay")
+    parser.add_argument("path")
+    parser.add_argument("--start", type=int, default=0, help="first tick")
+    parser.add_argument("--stop", type=int, default=None, help="tick to stop before")
+    parser.add_argument("--export", metavar="CSV", help="write the segment to CSV instead of playing it")
+    args = parser.parse_args()
+
+    reader = ReplayReader(args.path)
+    print(f"{args.path}: {reader.ticks} ticks, {reader.car_count} cars")
+    if args.export:
+        reader.export_csv(args.export, args.start, args.stop)
+    else:
+        play(reader, args.start, args.stop)
+    reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from config import SIM_SNAPSHOT_SLOTS, SIM_IDLE_INTERVAL
+from race.timestep import FixedTimestep
+
+# What the renderer needs of one car; same attribute names as Car, so Renderer.draw_car takes it as is
+CarSnapshot = namedtuple("CarSnapshot", "x y angle speed width height color lap_count gates_passed start_crossings track_hint")
+
+# cars and previous (x, y, angle per car one tick earlier) are tuples. interval => real seconds per tick (None => max speed)
+RaceSnapshot = namedtuple("RaceSnapshot", "tick cars previous finished winner speed interval time")
+
+
+class SnapshotBuffer:
+    """
+    Latest-value handoff from one writer thread to a reader. The writer
+    fills the slot after the newest one and then bumps seq; the reader
+    takes slots[seq]. Snapshots are immutable, so the reader can keep
+    drawing one while newer ones are written, and neither side locks. A
+    reader that is lapped between reading seq and its slot just gets a
+    newer snapshot.
+    """
+
+    def __init__(self, slots=SIM_SNAPSHOT_SLOTS):
+        self.slots = [None] * slots
+        self.seq = -1 # Snapshots published so far - 1
+
+    def publish(self, snapshot):
+        seq = self.seq + 1
+        self.slots[seq % len(self.slots)] = snapshot
+        self.seq = seq
+
+    def latest(self):
+        seq = self.seq
+        return None if seq < 0 else self.slots[seq % len(self.slots)]
+
+
+class SimulationThread(threading.Thread):
+    """
+    Runs a RaceSimulation at its fixed tick rate on its own thread and
+    publishes a RaceSnapshot after every batch of ticks. The render loop
+    only reads buffer.latest(), so a slow AI tick delays the next snapshot
+    instead of a frame. Controls from the window (speed, profiler, stop)
+    are queued and applied between ticks.
+    """
+
+    def __init__(self, sim, timestep=None):
+        super().__init__(name="simulation", daemon=True)
+        self.sim = sim
+        self.timestep = timestep or FixedTimestep()
+        self.buffer = SnapshotBuffer()
+        self.error = None # Exception that stopped the thread, re-raised by the window
+        self._commands = queue.SimpleQueue()
+        self._stopping = threading.Event()
+        self._previous = self._poses()
+        self._publish()
+
+    # -------------------------------------------------
+    # Controls (called from the window thread)
+    # -------------------------------------------------
+    def set_speed(self, speed):
+        self._commands.put(("speed", speed))
+
+    def set_profiler(self, profiler):
+        self._commands.put(("profiler", profiler))
+
+    def stop(self):
+        self._stopping.set()
+        if self.is_alive():
+            self.join()
+
+    # -------------------------------------------------
+    # Simulation thread
+    # -------------------------------------------------
+    def run(self):
+        try:
+            self._loop()
+        except BaseException as e:
+            self.error = e
+
+    def _loop(self):
+        timestep = self.timestep
+        last = time.perf_counter()
+        while not self._stopping.is_set():
+            self._apply_commands()
+            now = time.perf_counter()
+            if self.sim.finished:
+                # Nothing changes any more; only wait for controls or stop
+                last = now
+                self._stopping.wait(SIM_IDLE_INTERVAL)
+                continue
+
+            if timestep.advance(now - last, self._tick):
+                self._publish()
+            last = now
+            if timestep.speed is not None:
+                # Sleep until the next tick is owed
+                self._stopping.wait(max(0.0, (timestep.dt - timestep.accumulator) / timestep.speed))
+
+    def _apply_commands(self):
+        while True:
+            try:
+                command, value = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            if command == "speed":
+                self.timestep.speed = value
+                self.timestep.accumulator = 0.0
+            elif command == "profiler":
+                self.sim.profiler = value
+
+    def _tick(self):
+        # Keep the state before the newest tick for render interpolation
+        self._previous = self._poses()
+        self.sim.step()
+
+    def _poses(self):
+        return tuple((car.x, car.y, car.angle) for car in self.sim.cars)
+
+    def _publish(self):
+        sim = self.sim
+        speed = self.timestep.speed
+        cars = tuple(CarSnapshot(car.x, car.y, car.angle, car.speed, car.width, car.height, car.color, car.lap_count,
+                                 car.gates_passed, car.start_crossings, car.track_hint) for car in sim.cars)
+        self.buffer.publish(RaceSnapshot(
+            sim.tick, cars, self._previous, sim.finished, sim.names[sim.winner] if sim.finished else None,
+            speed, None if speed is None else self.timestep.dt / speed, time.perf_counter()))
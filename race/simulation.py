@@ -0,0 +1,217 @@
+import colorsys
+import math
+
+from config import CAR1_COLOR, CAR2_COLOR, RACE_ROSTER, OPPONENT_SENSE_RADIUS
+from config import GRID_LATERAL_SPACING, GRID_ROW_SPACING, GRID_EDGE_MARGIN
+from track.track import Track
+from car.car import Car
+from ai.heuristic_agent import HeuristicAgent
+from race.collision import SpatialHash, collision_cell_size, resolve_collisions
+
+
+def make_roster(count, roster=RACE_ROSTER):
+    """
+    count roster entries, cycling through roster. Cars past the end of the
+    roster get their own colour, spread around the hue circle.
+    """
+    entries = []
+    for i in range(count):
+        entry = dict(roster[i % len(roster)])
+        if i >= len(roster):
+            r, g, b = colorsys.hsv_to_rgb((i * 0.618034) % 1.0, 0.8, 1.0)
+            entry["color"] = (int(r * 255), int(g * 255), int(b * 255))
+        entries.append(entry)
+    return entries
+
+
+class RaceSimulation:
+    """
+    Steps cars, agents and lap logic without any rendering or frame cap.
+    main.py draws on top of it; the headless CLI just calls step() in a loop.
+    """
+
+    def __init__(self, track=None, seed=None, agent_configs=None, colors=None, verbose=False,
+                 roster=None, collisions=True):
+        self.track = track if track is not None else Track(seed=seed)
+
+        # roster => [{"agent": HeuristicAgent kwargs, "color": rgb}]; agent_configs/colors build one
+        if roster is None and agent_configs is None:
+            roster = RACE_ROSTER
+        elif roster is None:
+            roster = [{"agent": cfg} for cfg in agent_configs]
+        if colors is None:
+            colors = [entry.get("color", (CAR1_COLOR, CAR2_COLOR)[i % 2]) for i, entry in enumerate(roster)]
+
+        self.agents = [HeuristicAgent(**entry["agent"]) for entry in roster]
+        self.cars = self._grid_cars(len(self.agents), colors, verbose)
+        self.names = [f"Car {i + 1}" for i in range(len(self.cars))]
+
+        # Car-to-car contact and opponent sensing
+        self.collisions = collisions
+        self.collision_grid = SpatialHash(collision_cell_size(self.cars[0])) if self.cars else None
+        self.sense_opponents = any(agent.opponent_weight for agent in self.agents)
+
+        # Race state
+        self.tick = 0
+        self.finished = False
+        self.winner = None # Index into self.cars
+        self.lap_ticks = [[] for _ in self.cars] # Tick at which each lap was completed
+        self.split_times = [[] for _ in self.cars] # Time (ticks, interpolated within the tick) at each checkpoint gate passed
+        self.contacts = 0 # Car-to-car contacts so far
+        self.touching = set() # (i, j) pairs of cars in contact after the last tick
+        self.recorder = None # Optional ReplayRecorder, fed once per tick
+        self.telemetry = None # Optional TelemetryPublisher, fed once per tick
+        self.profiler = None # Optional Profiler timing each tick phase
+
+    def _grid_cars(self, count, colors, verbose):
+        """
+        Rows of cars across the track, GRID_LATERAL_SPACING apart, the first
+        on the start line and the rest further back along the centerline.
+        Cars behind the line only start counting laps once they reach it.
+        """
+        track = self.track
+        usable = track.width - 2 * GRID_EDGE_MARGIN
+        columns = max(1, min(count, int(usable // GRID_LATERAL_SPACING) + 1))
+
+        cars = []
+        for i in range(count):
+            row, column = divmod(i, columns)
+            in_row = min(columns, count - row * columns)
+            x, y, heading = track.point_at_distance(-row * GRID_ROW_SPACING)
+
+            # Offset along the perpendicular to the heading
+            offset = GRID_LATERAL_SPACING * ((in_row - 1) / 2 - column)
+            x -= math.sin(heading) * offset
+            y += math.cos(heading) * offset
+
+            car = Car(x, y, angle=heading, color=colors[i % len(colors)], verbose=verbose)
+            if row > 0:
+                car.start_crossings = 1
+                car.next_gate = 0
+            cars.append(car)
+        return cars
+
+    def step(self):
+        """Advance the race by one tick."""
+        if self.finished:
+            return
+
+        profiler = self.profiler
+        if profiler is None:
+            curvatures = self._track_info()
+            self._control_speed(curvatures)
+            self._steer()
+            self._physics()
+            if self.collisions:
+                self._collide()
+            self._lap_progress()
+        else:
+            curvatures = profiler.time("track_info", self._track_info)
+            profiler.time("speed_control", self._control_speed, curvatures)
+            profiler.time("decide_action", self._steer)
+            profiler.time("update", self._physics)
+            if self.collisions:
+                profiler.time("collisions", self._collide)
+            profiler.time("lap_progress", self._lap_progress)
+            profiler.tick()
+
+        cars = self.cars
+        finishers = [i for i, car in enumerate(cars) if car.lap_complete]
+        if finishers:
+            # Several cars can finish on the same tick; the first across the line wins
+            self.winner = min(finishers, key=lambda i: self.split_times[i][-1])
+            self.finished = True
+            for c in cars:
+                c.speed = 0
+            self.save_policies()
+
+        if self.recorder is not None:
+            self.recorder.record(cars)
+        if self.telemetry is not None:
+            self.telemetry.publish(self)
+
+    # Tick phases, kept separate so a profiler can time each one
+    def _track_info(self):
+        return [car.get_track_info(self.track)[1] for car in self.cars]
+
+    def _control_speed(self, curvatures):
+        track = self.track
+        for car, agent, curvature in zip(self.cars, self.agents, curvatures):
+            if agent.search == "line":
+                car.follow_speed(agent.target_speed(car, track))
+            else:
+                car.ai_control_speed(curvature)
+
+    def _steer(self):
+        track = self.track
+        opponents = self._opponents() if self.sense_opponents else [None] * len(self.cars)
+        for car, agent, near in zip(self.cars, self.agents, opponents):
+            action = agent.decide_action(car, track, near)
+            car.last_action = action
+            if action == "left": car.turn_left()
+            elif action == "right": car.turn_right()
+
+    def _opponents(self):
+        """Per car, (x, y, vx, vy) of the other cars within OPPONENT_SENSE_RADIUS, before anyone steers."""
+        states = [(car.x, car.y, car.speed * math.cos(car.angle), car.speed * math.sin(car.angle)) for car in self.cars]
+        grid = SpatialHash(OPPONENT_SENSE_RADIUS).build([(x, y) for x, y, _, _ in states])
+
+        radius_sq = OPPONENT_SENSE_RADIUS * OPPONENT_SENSE_RADIUS
+        opponents = []
+        for i, (x, y, _, _) in enumerate(states):
+            near = []
+            for j in grid.near(x, y):
+                if j != i:
+                    other = states[j]
+                    dx = other[0] - x
+                    dy = other[1] - y
+                    if dx * dx + dy * dy <= radius_sq:
+                        near.append(other)
+            opponents.append(near)
+        return opponents
+
+    def _collide(self):
+        self.contacts += resolve_collisions(self.cars, self.collision_grid, self.track, self.touching)
+
+    def _physics(self):
+        for car in self.cars:
+            car.update()
+        self.tick += 1
+
+    def _lap_progress(self):
+        start = self.tick - 1 # Cars moved from start to self.tick this step
+        for car, laps, splits in zip(self.cars, self.lap_ticks, self.split_times):
+            t = car.update_lap_progress(self.track)
+            if t is not None:
+                splits.append(start + t)
+            if car.lap_count > len(laps):
+                laps.append(self.tick)
+
+    def lap_times(self, index):
+        """Ticks taken by each completed lap of one car, to the moment it crossed the line."""
+        gates = len(self.track.gates)
+        ends = [0.0] + self.split_times[index][gates - 1::gates]
+        return [b - a for a, b in zip(ends, ends[1:])]
+
+    def sector_times(self, index):
+        """Ticks taken gate to gate by one car, one list of sectors per lap started."""
+        times = [0.0] + self.split_times[index]
+        sectors = [b - a for a, b in zip(times, times[1:])]
+        gates = len(self.track.gates)
+        return [sectors[i:i + gates] for i in range(0, len(sectors), gates)]
+
+    def run(self, max_ticks):
+        """Step until someone wins or max_ticks is reached; returns ticks run."""
+        start = self.tick
+        while not self.finished and self.tick - start < max_ticks:
+            self.step()
+        if not self.finished:
+            self.save_policies()
+        return self.tick - start
+
+    def save_policies(self):
+        """Persist the policy tables the agents filled during the race (no-op without any)."""
+        for agent in self.agents:
+            policy = getattr(agent, "policy", None)
+            if policy is not None:
+                policy.save()
@@ -0,0 +1,276 @@
+import argparse
+import asyncio
+import os
+import socket
+import struct
+import threading
+
+from config import TELEMETRY_ADDRESS, TELEMETRY_RING_SIZE, TELEMETRY_POLL_INTERVAL
+from config import TELEMETRY_HIGH_WATER, TELEMETRY_DROP_BYTES
+from race.replay import ACTIONS, COMMAND_SCALE
+
+# Wire format: a stream of frames, each a fixed header then its payload
+#   header:  payload bytes, kind, tick
+#   HELLO:   car count, track width, point count, then (x, y) float32 per centerline point
+#   TICK:    per car x, y, angle, speed (float32), action code, command, lap count
+#   LAP:     car, lap number, ticks the lap took
+#   FINISH:  winning car
+# New subscribers get HELLO first and then live frames only.
+_FRAME = struct.Struct("<IBI")
+_HELLO = struct.Struct("<HHI")
+_POINT = struct.Struct("<ff")
+_CAR = struct.Struct("<ffffBbH")
+_LAP = struct.Struct("<HHI")
+_FINISH = struct.Struct("<H")
+
+HELLO, TICK, LAP, FINISH = range(4)
+_ACTION_CODE = {action: i for i, action in enumerate(ACTIONS)}
+
+
+def _frame(kind, tick, payload):
+    return _FRAME.pack(len(payload), kind, tick) + payload
+
+
+class RingBuffer:
+    """
+    Fixed-size ring of frames for one writer and any number of readers.
+    The writer stores a frame and then bumps head; readers keep their own
+    cursor and never lock or signal the writer, so a stalled reader cannot
+    hold up the simulation. A reader that falls a full ring behind just
+    loses the frames it missed.
+    """
+
+    def __init__(self, capacity=TELEMETRY_RING_SIZE):
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.head = 0 # Frames written so far
+
+    def push(self, frame):
+        self.slots[self.head % self.capacity] = frame
+        self.head += 1
+
+    def read(self, cursor):
+        """(frames from cursor up to head, new cursor, frames lost)."""
+        head = self.head
+        lost = max(0, head - self.capacity - cursor)
+        cursor += lost
+        frames = [self.slots[i % self.capacity] for i in range(cursor, head)]
+
+        # Slots the writer reused while we copied may hold newer frames; drop them
+        lapped = self.head - self.capacity - cursor
+        if lapped > 0:
+            frames = frames[lapped:]
+            lost += lapped
+        return frames, head, lost
+
+
+class TelemetryPublisher:
+    """Packs per-tick car state and lap/finish events into a ring; fed by RaceSimulation.step()."""
+
+    def __init__(self, sim, capacity=TELEMETRY_RING_SIZE):
+        self.ring = RingBuffer(capacity)
+        self._laps = [len(laps) for laps in sim.lap_ticks]
+        self._finished = sim.finished
+
+        track = sim.track
+        points = b"".join(_POINT.pack(x, y) for x, y in track.centerline)
+        self.hello = _frame(HELLO, sim.tick, _HELLO.pack(len(sim.cars), int(track.width), len(track.centerline)) + points)
+
+    def publish(self, sim):
+        tick = sim.tick
+        ring = self.ring
+        payload = b"".join([
+            _CAR.pack(car.x, car.y, car.angle, car.speed, _ACTION_CODE.get(car.last_action, 2),
+                      round(max(-1.0, min(1.0, car.last_command)) * COMMAND_SCALE), car.lap_count)
+            for car in sim.cars
+        ])
+        ring.push(_frame(TICK, tick, payload))
+
+        for i, laps in enumerate(sim.lap_ticks):
+            while self._laps[i] < len(laps):
+                lap = self._laps[i]
+                lap_ticks = laps[lap] - (laps[lap - 1] if lap else 0)
+                ring.push(_frame(LAP, tick, _LAP.pack(i, lap + 1, lap_ticks)))
+                self._laps[i] += 1
+
+        if sim.finished and not self._finished:
+            ring.push(_frame(FINISH, tick, _FINISH.pack(sim.winner)))
+            self._finished = True
+
+
+def _downsample(frames):
+    """Every event frame, but of the tick frames only the newest."""
+    last_tick = max((i for i, frame in enumerate(frames) if frame[4] == TICK), default=None)
+    return [frame for i, frame in enumerate(frames) if frame[4] != TICK or i == last_tick]
+
+
+class TelemetryServer:
+    """
+    asyncio server on its own thread, serving a publisher's ring to any
+    number of subscribers over TCP ("host:port") or a Unix socket
+    ("unix:/path"). Each subscriber is polled from its own cursor; one that
+    cannot keep up gets only the newest tick (events are always kept), and
+    one that stops reading altogether is disconnected. Setting a new
+    publisher (next race) sends every subscriber its HELLO.
+    """
+
+    def __init__(self, publisher, address=TELEMETRY_ADDRESS, poll_interval=TELEMETRY_POLL_INTERVAL,
+                 high_water=TELEMETRY_HIGH_WATER, drop_bytes=TELEMETRY_DROP_BYTES):
+        self.publisher = publisher
+        self.address = address
+        self.poll_interval = poll_interval
+        self.high_water = high_water
+        self.drop_bytes = drop_bytes
+        self.subscribers = 0
+        self.dropped = 0 # Subscribers disconnected for falling behind
+
+        self._thread = None
+        self._loop = None
+        self._stop = None
+        self._ready = threading.Event()
+        self._error = None
+
+    def start(self):
+        """Bind and start serving; returns once the socket is listening."""
+        self._thread = threading.Thread(target=asyncio.run, args=(self._serve(),), daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+            self._thread.join()
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        try:
+            if self.address.startswith("unix:"):
+                path = self.address[len("unix:"):]
+                if os.path.exists(path):
+                    os.unlink(path) # Left over from a previous run
+                server = await asyncio.start_unix_server(self._subscriber, path)
+            else:
+                host, port = self.address.rsplit(":", 1)
+                server = await asyncio.start_server(self._subscriber, host, int(port))
+        except OSError as e:
+            self._error = e
+            self._ready.set()
+            return
+
+        self._ready.set()
+        async with server:
+            await self._stop.wait()
+        while self.subscribers:
+            await asyncio.sleep(self.poll_interval) # Each notices the stop within one poll
+        if self.address.startswith("unix:"):
+            os.unlink(self.address[len("unix:"):])
+
+    async def _subscriber(self, reader, writer):
+        transport = writer.transport
+        publisher = None
+        self.subscribers += 1
+        try:
+            while not self._stop.is_set() and not reader.at_eof() and not transport.is_closing():
+                # A new race => a new publisher; start the subscriber over on it
+                if publisher is not self.publisher:
+                    publisher = self.publisher
+                    writer.write(publisher.hello)
+                    cursor = publisher.ring.head
+
+                await asyncio.sleep(self.poll_interval)
+                frames, cursor, lost = publisher.ring.read(cursor)
+                if not frames:
+                    continue
+
+                # Never wait on a slow subscriber: send less, or let it go
+                pending = transport.get_write_buffer_size()
+                if pending > self.drop_bytes:
+                    self.dropped += 1
+                    break
+                if lost or pending > self.high_water:
+                    frames = _downsample(frames)
+                writer.write(b"".join(frames))
+        except ConnectionError:
+            pass
+        finally:
+            self.subscribers -= 1
+            writer.close()
+
+
+# -------------------------------------------------
+# Client side
+# -------------------------------------------------
+def decode(kind, payload):
+    """Frame payload => plain Python values."""
+    if kind == HELLO:
+        cars, width, count = _HELLO.unpack_from(payload)
+        points = list(_POINT.iter_unpack(payload[_HELLO.size:_HELLO.size + count * _POINT.size]))
+        return {"cars": cars, "width": width, "centerline": points}
+    if kind == TICK:
+        return [
+            (x, y, angle, speed, ACTIONS[action], command / COMMAND_SCALE, laps)
+            for x, y, angle, speed, action, command, laps in _CAR.iter_unpack(payload)
+        ]
+    if kind == LAP:
+        car, lap, ticks = _LAP.unpack(payload)
+        return {"car": car, "lap": lap, "ticks": ticks}
+    if kind == FINISH:
+        return {"winner": _FINISH.unpack(payload)[0]}
+    raise ValueError(f"unknown telemetry frame kind {kind}")
+
+
+def _recv_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return bytes(data)
+
+
+def subscribe(address=TELEMETRY_ADDRESS):
+    """Blocking client: yields (kind, tick, decoded payload) until the server goes away."""
+    if address.startswith("unix:"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(address[len("unix:"):])
+    else:
+        host, port = address.rsplit(":", 1)
+        sock = socket.create_connection((host, int(port)))
+
+    with sock:
+        while True:
+            header = _recv_exactly(sock, _FRAME.size)
+            if header is None:
+                return
+            size, kind, tick = _FRAME.unpack(header)
+            payload = _recv_exactly(sock, size)
+            if payload is None:
+                return
+            yield kind, tick, decode(kind, payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m race.telemetry", description="Print a live race telemetry stream")
+    parser.add_argument("address", nargs="?", default=TELEMETRY_ADDRESS, help="host:port or unix:/path")
+    parser.add_argument("--every", type=int, default=60, help="print one tick in this many")
+    args = parser.parse_args()
+
+    for kind, tick, data in subscribe(args.address):
+        if kind == HELLO:
+            print(f"connected at tick {tick}: {data['cars']} cars, {len(data['centerline'])} track points")
+        elif kind == TICK and tick % args.every == 0:
+            cars = "  ".join(f"{x:6.1f},{y:6.1f} v{speed:4.1f} L{laps}" for x, y, _, speed, _, _, laps in data)
+            print(f"tick {tick:6d}  {cars}")
+        elif kind == LAP:
+            print(f"tick {tick:6d}  Car {data['car'] + 1} finished lap {data['lap']} in {data['ticks']} ticks")
+        elif kind == FINISH:
+            print(f"tick {tick:6d}  Car {data['winner'] + 1} wins")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import time
+
+from config import SIM_TICK_RATE, SIM_MAX_STEPS_PER_FRAME
+
+
+class FixedTimestep:
+    """
+    Turns real frame time into a whole number of simulation ticks.
+    The simulation only ever advances by complete ticks, so the race result
+    depends on the tick count alone, never on how fast frames are drawn.
+    """
+
+    def __init__(self, tick_rate=SIM_TICK_RATE, max_steps_per_frame=SIM_MAX_STEPS_PER_FRAME):
+        self.dt = 1.0 / tick_rate
+        self.max_steps_per_frame = max_steps_per_frame
+        self.speed = 1 # Fast-forward multiplier; None => as fast as possible
+        self.accumulator = 0.0
+        self.dropped_ticks = 0 # Ticks given up because the sim could not keep up
+
+    def advance(self, frame_seconds, step):
+        """Call step() once per tick owed for frame_seconds of real time; returns ticks run."""
+        if self.speed is None:
+            # Max speed: fill the frame's time budget with ticks
+            deadline = time.perf_counter() + max(frame_seconds, self.dt)
+            ticks = 0
+            while time.perf_counter() < deadline:
+                step()
+                ticks += 1
+            self.accumulator = 0.0
+            return ticks
+
+        self.accumulator += frame_seconds * self.speed
+        ticks = int(self.accumulator / self.dt)
+
+        # Under load run at most a bounded number of ticks per frame (frame skip)
+        # and drop the rest of the backlog instead of spiralling
+        limit = self.max_steps_per_frame * self.speed
+        if ticks > limit:
+            self.dropped_ticks += ticks - limit
+            ticks = limit
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= ticks * self.dt
+
+        for _ in range(ticks):
+            step()
+        return ticks
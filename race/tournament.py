@@ -0,0 +1,179 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+from multiprocessing import Pool
+
+from config import CAUTIOUS_AGENT, AGGRESSIVE_AGENT
+
+ELO_START = 1500
+ELO_K = 32
+
+
+def default_agents():
+    return {"cautious": CAUTIOUS_AGENT, "aggressive": AGGRESSIVE_AGENT}
+
+
+def make_jobs(agents, track_seeds):
+    """
+    Every pairing on every track, once from each side of the grid.
+    Job ids (and the track seed inside each job) depend only on the inputs,
+    so results are the same whatever order the workers finish in.
+    """
+    jobs = []
+    for name_a, name_b in itertools.combinations(sorted(agents), 2):
+        for seed in track_seeds:
+            for left, right in ((name_a, name_b), (name_b, name_a)):
+                jobs.append((len(jobs), seed, left, agents[left], right, agents[right]))
+    return jobs
+
+
+def _init_worker():
+    # Load the fuzzy table and compiled kernels once per worker instead of once per race
+    from ai.fuzzy import get_acceleration_table
+    from utils.kernels import warm_up
+    get_acceleration_table()
+    warm_up()
+
+
+def run_job(job, max_ticks, layout="oval"):
+    """Race two configs on one seeded track; returns a plain result dict."""
+    from race.simulation import RaceSimulation
+    from track.track import Track
+
+    job_id, seed, name_a, cfg_a, name_b, cfg_b = job
+    sim = RaceSimulation(track=Track(seed=seed, layout=layout), agent_configs=[cfg_a, cfg_b])
+    sim.run(max_ticks)
+
+    names = [name_a, name_b]
+    return {
+        "job": job_id,
+        "seed": seed,
+        "agents": names,
+        "winner": names[sim.winner] if sim.finished else None,
+        "ticks": sim.tick,
+        "laps": [car.lap_count for car in sim.cars],
+        "lap_times": [sim.lap_times(i) for i in range(len(names))],
+    }
+
+
+def _run_job_star(args):
+    return run_job(*args)
+
+
+def run_tournament(agents, track_seeds, workers=None, max_ticks=20000, layout="oval"):
+    """
+    Run all jobs over a process pool. imap_unordered with chunksize 1 hands a
+    worker its next job as soon as it is free, so a slow race never holds up
+    the others.
+    """
+    jobs = make_jobs(agents, track_seeds)
+    start = time.perf_counter()
+
+    # Build the table and kernel caches once here, so the workers only read them
+    from ai.fuzzy import load_or_build_table
+    from utils.kernels import warm_up
+    load_or_build_table()
+    warm_up()
+
+    if workers == 1:
+        _init_worker()
+        results = [run_job(job, max_ticks, layout) for job in jobs]
+    else:
+        with Pool(workers, initializer=_init_worker) as pool:
+            results = list(pool.imap_unordered(_run_job_star, [(job, max_ticks, layout) for job in jobs], chunksize=1))
+
+    results.sort(key=lambda r: r["job"])
+    elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def elo_ratings(names, results):
+    """Sequential Elo over results in job order; a timeout counts as a draw."""
+    ratings = {name: float(ELO_START) for name in names}
+    for r in results:
+        a, b = r["agents"]
+        expected_a = 1 / (1 + 10 ** ((ratings[b] - ratings[a]) / 400))
+        score_a = 0.5 if r["winner"] is None else float(r["winner"] == a)
+        ratings[a] += ELO_K * (score_a - expected_a)
+        ratings[b] -= ELO_K * (score_a - expected_a)
+    return ratings
+
+
+def summarize(agents, results):
+    """Per-agent standings: races, wins, draws, win rate, mean lap time, Elo."""
+    ratings = elo_ratings(agents, results)
+    standings = []
+    for name in sorted(agents):
+        played = [r for r in results if name in r["agents"]]
+        wins = sum(r["winner"] == name for r in played)
+        draws = sum(r["winner"] is None for r in played)
+        laps = [t for r in played for t in r["lap_times"][r["agents"].index(name)]]
+        standings.append({
+            "agent": name,
+            "races": len(played),
+            "wins": wins,
+            "draws": draws,
+            "win_rate": wins / len(played) if played else 0.0,
+            "mean_lap_ticks": sum(laps) / len(laps) if laps else None,
+            "elo": round(ratings[name], 1),
+        })
+    standings.sort(key=lambda s: s["elo"], reverse=True)
+    return standings
+
+
+def write_results(out_dir, agents, results, standings, elapsed):
+    os.makedirs(out_dir, exist_ok=True)
+
+    with open(os.path.join(out_dir, "standings.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(standings[0]))
+        writer.writeheader()
+        writer.writerows(standings)
+
+    with open(os.path.join(out_dir, "tournament.json"), "w") as f:
+        json.dump({
+            "agents": agents,
+            "elapsed_seconds": elapsed,
+            "standings": standings,
+            "races": results,
+        }, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m race.tournament", description="Round-robin HeuristicAgent tournament")
+    parser.add_argument("--agents", help="JSON file mapping agent name -> HeuristicAgent kwargs (default: cautious vs aggressive)")
+    parser.add_argument("--tracks", type=int, default=8, help="number of seeded tracks")
+    parser.add_argument("--seed", type=int, default=0, help="first track seed; tracks use seed, seed + 1, ...")
+    parser.add_argument("--corpus", help="JSON from python -m track.generator; races on its layout and seeds instead")
+    parser.add_argument("--ticks", type=int, default=20000, help="tick limit per race (timeout => draw)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--out", default="tournament_results", help="output directory for CSV/JSON")
+    args = parser.parse_args()
+
+    if args.agents:
+        with open(args.agents) as f:
+            agents = json.load(f)
+    else:
+        agents = default_agents()
+
+    layout = "oval"
+    track_seeds = list(range(args.seed, args.seed + args.tracks))
+    if args.corpus:
+        with open(args.corpus) as f:
+            corpus = json.load(f)
+        layout, track_seeds = corpus["layout"], corpus["seeds"][:args.tracks]
+    results, elapsed = run_tournament(agents, track_seeds, args.workers, args.ticks, layout)
+    standings = summarize(agents, results)
+    write_results(args.out, agents, results, standings, elapsed)
+
+    total_ticks = sum(r["ticks"] for r in results)
+    for s in standings:
+        print(f"{s['agent']:>12}  elo {s['elo']:7.1f}  win rate {s['win_rate']:.2f}  "
+              f"({s['wins']}W {s['draws']}D / {s['races']})")
+    print(f"{len(results)} races in {elapsed:.2f}s => {total_ticks / elapsed:.0f} ticks/s, results in {args.out}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import math
+
+import pygame
+
+from config import RENDER_ANGLE_STEPS, RENDER_TEXT_CACHE_SIZE
+
+BACKGROUND_COLOR = (30, 100, 30)
+
+
+class Renderer:
+    """
+    Draws a race with as little per-frame work as possible: the track is baked
+    into a background surface once, cars come from pre-rotated sprites, text
+    surfaces are cached by content, and only the rectangles that changed are
+    sent to the display.
+    """
+
+    def __init__(self, screen, track, angle_steps=RENDER_ANGLE_STEPS):
+        self.screen = screen
+        self.angle_steps = angle_steps
+
+        # Static layer: grass + track, drawn once
+        self.background = pygame.Surface(screen.get_size()).convert()
+        self.background.fill(BACKGROUND_COLOR)
+        track.draw(self.background)
+
+        self.fonts = {size: pygame.font.SysFont(None, size) for size in (20, 36, 72)}
+        self._sprites = {} # (width, height, color) -> list of rotated surfaces
+        self._text = {} # (text, color, size) -> rendered surface
+
+        # Dirty rectangles of the previous and current frame
+        self._previous = []
+        self._current = []
+        self._full_redraw = True
+
+    # -------------------------------------------------
+    # Cached resources
+    # -------------------------------------------------
+    def _car_sprites(self, car):
+        key = (car.width, car.height, car.color)
+        sprites = self._sprites.get(key)
+        if sprites is None:
+            base = pygame.Surface((car.width, car.height), pygame.SRCALPHA)
+            pygame.draw.rect(base, car.color, (0, 0, car.width, car.height))
+            pygame.draw.rect(base, (0, 0, 0), (0, 0, car.width, car.height), 1)  # border
+
+            step = 360 / self.angle_steps
+            sprites = [pygame.transform.rotate(base, -i * step).convert_alpha() for i in range(self.angle_steps)]
+            self._sprites[key] = sprites
+        return sprites
+
+    def text(self, text, color, size=36):
+        """Rendered text surface; only rendered again when the string changes."""
+        key = (text, color, size)
+        surface = self._text.get(key)
+        if surface is None:
+            if len(self._text) >= RENDER_TEXT_CACHE_SIZE:
+                self._text.clear()
+            surface = self.fonts[size].render(text, True, color)
+            self._text[key] = surface
+        return surface
+
+    # -------------------------------------------------
+    # Frame
+    # -------------------------------------------------
+    def begin_frame(self):
+        """Restore the background wherever something was drawn last frame."""
+        if self._full_redraw:
+            self.screen.blit(self.background, (0, 0))
+        else:
+            for rect in self._previous:
+                self.screen.blit(self.background, rect, rect)
+        self._current = []
+
+    def blit(self, surface, pos):
+        self._current.append(self.screen.blit(surface, pos))
+
+    def draw_car(self, car, previous=None, alpha=1.0):
+        """previous => (x, y, angle) one tick earlier; drawn alpha of the way to the current state."""
+        x, y, angle = car.x, car.y, car.angle
+        if previous is not None:
+            px, py, pangle = previous
+            x = px + (x - px) * alpha
+            y = py + (y - py) * alpha
+            angle = pangle + (angle - pangle) * alpha
+
+        sprites = self._car_sprites(car)
+        i = round(angle / (2 * math.pi) * self.angle_steps) % self.angle_steps
+        sprite = sprites[i]
+        self.blit(sprite, sprite.get_rect(center=(x, y)))
+
+    def end_frame(self):
+        if self._full_redraw:
+            pygame.display.flip()
+            self._full_redraw = False
+        else:
+            pygame.display.update(self._previous + self._current)
+        self._previous = self._current
@@ -0,0 +1,38 @@
+import numpy as np
+
+from config import CAUTIOUS_AGENT, AGGRESSIVE_AGENT
+from race.batch import BatchSimulation
+from race.simulation import RaceSimulation
+from track.track import Track
+
+TICKS = 800 # Past the first lap, so every gate including the start line is crossed
+
+
+def test_batch_matches_race_simulation():
+    # Hold search without opponent sensing and without collisions: what BatchSimulation models
+    configs = [dict(CAUTIOUS_AGENT, opponent_weight=0), dict(AGGRESSIVE_AGENT, opponent_weight=0)] * 2
+    sim = RaceSimulation(track=Track(seed=2), agent_configs=configs, collisions=False)
+    track = sim.track
+    cars = sim.cars
+    batch = BatchSimulation(track, [car.x for car in cars], [car.y for car in cars], [car.angle for car in cars])
+
+    progress_weight = np.array([config["progress_weight"] for config in configs])
+    centering_weight = np.array([config["centering_weight"] for config in configs])
+    steer = lambda b: b.heuristic_steer(progress_weight, centering_weight, configs[0]["off_track_penalty"],
+                                        configs[0]["lookahead_depth"])
+
+    for _ in range(TICKS):
+        sim.step()
+        batch.step(steer)
+        assert batch.x.tolist() == [car.x for car in cars]
+        assert batch.y.tolist() == [car.y for car in cars]
+        assert batch.speed.tolist() == [car.speed for car in cars]
+
+        along, _, _ = batch.progress(batch.x, batch.y)
+        expected = [track.progress((car.x, car.y))[0] for car in cars]
+        np.testing.assert_allclose(along, expected, rtol=0, atol=1e-9)
+
+        assert batch.next_gate.tolist() == [car.next_gate for car in cars]
+        assert batch.lap_count.tolist() == [car.lap_count for car in cars]
+
+    assert min(car.lap_count for car in cars) >= 1
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from config import FUZZY_TABLE_MAX_ERROR
+from ai.fuzzy import MAX_CURVE, MAX_SPEED, FuzzyTable, compute_fuzzy_acceleration
+
+# skfuzzy's own np.maximum calls are deprecated in NumPy 2
+pytestmark = pytest.mark.filterwarnings("ignore::DeprecationWarning:skfuzzy")
+
+
+@pytest.fixture(scope="module")
+def table():
+    return FuzzyTable()
+
+
+def test_table_within_error_bound(table):
+    assert table.max_error() < FUZZY_TABLE_MAX_ERROR
+
+
+def test_table_matches_skfuzzy_on_grid_nodes(table):
+    rng = np.random.default_rng(1)
+    for i, j in zip(rng.integers(len(table.speeds), size=50), rng.integers(len(table.curves), size=50)):
+        exact = compute_fuzzy_acceleration(table.speeds[i], table.curves[j])
+        assert abs(table.lookup(table.speeds[i], table.curves[j]) - exact) < FUZZY_TABLE_MAX_ERROR
+
+
+def test_lookup_many_matches_scalar_lookup(table):
+    rng = np.random.default_rng(2)
+    # Includes inputs outside the range, which both clamp
+    speeds = rng.uniform(-1, MAX_SPEED + 1, 1000)
+    curves = rng.uniform(-0.1, MAX_CURVE + 0.1, 1000)
+    scalar = [table.lookup(s, c) for s, c in zip(speeds.tolist(), curves.tolist())]
+    np.testing.assert_allclose(table.lookup_many(speeds, curves), scalar, rtol=0, atol=1e-12)
+
+
+def test_save_load_round_trip(table, tmp_path):
+    path = tmp_path / "table.npy"
+    table.save(path)
+    loaded = FuzzyTable.load(path)
+    np.testing.assert_array_equal(loaded.values, table.values)
+    assert loaded.lookup(7.3, 0.42) == table.lookup(7.3, 0.42)
+
+
+def test_load_rejects_other_grid(table, tmp_path):
+    path = tmp_path / "table.npy"
+    table.save(path)
+    with pytest.raises(ValueError):
+        FuzzyTable.load(path, speed_step=table.speed_step * 2)
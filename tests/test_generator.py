@@ -0,0 +1,8 @@
+from track.generator import LAYOUTS, generate, validate
+
+
+def test_default_oval_layout_validates():
+    seeds = range(500)
+    reasons = validate(generate("oval", seeds), intended_crossings=LAYOUTS["oval"][1])
+    assert not [(seed, reason) for seed, reason in zip(seeds, reasons) if reason]
+
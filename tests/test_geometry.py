@@ -0,0 +1,52 @@
+import math
+import random
+
+import pytest
+
+from track.track import Track
+from utils.geometry import CenterlineIndex, closest_point_on_track
+
+
+def _queries(points, rng, count):
+    """Positions on, near and far off the centerline (where the radius walk has to expand)."""
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+    span = max(max(xs) - min(xs), max(ys) - min(ys))
+    for _ in range(count):
+        x, y = rng.choice(points)
+        reach = rng.choice([1.0, 50.0, 150.0, 2 * span, 20 * span])
+        yield x + rng.uniform(-reach, reach), y + rng.uniform(-reach, reach)
+
+
+@pytest.mark.parametrize("layout", ["oval", "technical", "figure8"])
+def test_closest_point_matches_linear_scan(layout):
+    track = Track(seed=3, layout=layout, cache_dir=None)
+    points = track.centerline
+    index = CenterlineIndex(points)
+    rng = random.Random(layout)
+    for pos in _queries(points, rng, 2000):
+        expected = closest_point_on_track(pos, points)
+        assert index.closest_point(pos) == expected
+        for hint in (0, rng.randrange(len(points)), expected[1], len(points) - 1):
+            assert index.closest_point(pos, hint) == expected
+
+
+def test_closest_point_ties_go_to_lower_index():
+    # Every query below is equally far from two or more points
+    square = [(0.0, 0.0), (100.0, 0.0), (100.0, 100.0), (0.0, 100.0), (0.0, 0.0)]
+    index = CenterlineIndex(square, cell_size=30.0)
+    for pos in [(50.0, 50.0), (50.0, -500.0), (1000.0, 50.0), (0.0, 0.0), (-3.0, -3.0)]:
+        expected = closest_point_on_track(pos, square)
+        for hint in (None, 0, 1, 2, 3, 4):
+            assert index.closest_point(pos, hint) == expected
+
+
+def test_loaded_index_matches_built_index(tmp_path):
+    built = Track(seed=5, cache_dir=str(tmp_path))
+    loaded = Track(seed=5, cache_dir=str(tmp_path))
+    assert loaded._centerline is None # Loaded from the cache: the index comes from the stored cells
+    rng = random.Random(5)
+    for pos in _queries(built.centerline, rng, 500):
+        hint = rng.randrange(len(built.centerline))
+        assert loaded.closest_point(pos, hint) == built.closest_point(pos, hint)
+        assert loaded.index.project(pos, hint) == built.index.project(pos, hint)
@@ -0,0 +1,24 @@
+import pytest
+
+from utils import kernels
+
+
+@pytest.fixture(scope="module")
+def results():
+    # With numba the compiled kernels are checked; without it their plain Python versions
+    return kernels.check(seeds=(1, 2), samples=300, ticks=400)
+
+
+@pytest.mark.parametrize("name", sorted(kernels.CHECK_TOLERANCES))
+def test_kernels_match_python_paths(results, name):
+    value, tolerance, passed = results[name]
+    assert passed, f"{name} differs by {value}, tolerance {tolerance}"
+
+
+def test_override_restores_enabled_on_error():
+    before = kernels.ENABLED
+    with pytest.raises(RuntimeError):
+        with kernels.override(not before):
+            assert kernels.ENABLED is not before
+            raise RuntimeError("kernel failed")
+    assert kernels.ENABLED == before
@@ -0,0 +1,58 @@
+import pytest
+
+from race.replay import MAGIC, POS_SCALE, ReplayReader, ReplayRecorder, _COLOR, _HEADER, _POINT
+from race.simulation import RaceSimulation, make_roster
+from track.track import Track
+
+TICKS = 250 # Crosses a keyframe boundary
+
+
+@pytest.fixture(scope="module")
+def recorded(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("replay") / "race.rply")
+    roster = [dict(entry, color=color) for entry, color in zip(make_roster(3), [(1, 2, 3), (40, 50, 60), (200, 100, 0)])]
+    sim = RaceSimulation(track=Track(seed=1), roster=roster)
+    sim.recorder = ReplayRecorder(path, sim.track, len(sim.cars), colors=[car.color for car in sim.cars])
+    for _ in range(TICKS):
+        sim.step()
+    sim.recorder.close()
+    return path, sim
+
+
+def test_round_trip(recorded):
+    path, sim = recorded
+    reader = ReplayReader(path)
+    assert len(reader) == TICKS
+    assert reader.colors == [car.color for car in sim.cars]
+    for car, (x, y, angle, speed, _, _) in zip(sim.cars, reader.state_at(TICKS - 1)):
+        assert (x, y, angle, speed) == pytest.approx((car.x, car.y, car.angle, car.speed), abs=1.0 / POS_SCALE)
+    reader.close()
+
+
+def test_reads_version_1(recorded, tmp_path):
+    # Same file without the color table: still readable, colors left to the player
+    path, sim = recorded
+    with open(path, "rb") as f:
+        data = f.read()
+    fields = list(_HEADER.unpack(data[:_HEADER.size]))
+    assert fields[0] == MAGIC
+    fields[1] = 1
+    colors_start = _HEADER.size + fields[5] * _POINT.size
+    old = tmp_path / "v1.rply"
+    old.write_bytes(_HEADER.pack(*fields) + data[_HEADER.size:colors_start]
+                    + data[colors_start + len(sim.cars) * _COLOR.size:])
+
+    reader = ReplayReader(str(old))
+    new = ReplayReader(path)
+    assert reader.colors is None
+    assert len(reader) == TICKS
+    assert reader.state_at(TICKS - 1) == new.state_at(TICKS - 1)
+    reader.close()
+    new.close()
+
+
+def test_rejects_unknown_version(tmp_path):
+    path = tmp_path / "future.rply"
+    path.write_bytes(_HEADER.pack(MAGIC, 99, 1, 1, 60, 0))
+    with pytest.raises(ValueError):
+        ReplayReader(str(path))
@@ -0,0 +1,57 @@
+import math
+
+import pytest
+
+from config import COLLISION_SPEED_FACTOR
+from car.car import Car
+from race.collision import SpatialHash, collision_cell_size, resolve_collisions
+from race.simulation import RaceSimulation, make_roster
+from track.track import Track
+
+GRID_CARS = 12 # Two rows, so half the field starts behind the line
+START_TICKS = 300 # Cars need about 150 ticks to reach the first gate ahead of them
+
+
+@pytest.mark.parametrize("collisions", [False, True])
+@pytest.mark.parametrize("seed", [1, 2, 3, 4])
+@pytest.mark.parametrize("layout", ["oval", "technical", "chicane"])
+def test_every_grid_car_gets_going(layout, seed, collisions):
+    sim = RaceSimulation(track=Track(seed=seed, layout=layout), roster=make_roster(GRID_CARS), collisions=collisions)
+    sim.run(START_TICKS)
+    stalled = [i for i, car in enumerate(sim.cars) if car.start_crossings or not car.gates_passed]
+    assert not stalled
+
+
+def _pair(track, lateral, gap):
+    """Two cars side by side across the track halfway round, the first lateral px off the centerline."""
+    x, y, heading = track.point_at_distance(track.length / 2)
+    side = (-math.sin(heading), math.cos(heading))
+    return [Car(x + side[0] * offset, y + side[1] * offset, heading, verbose=False) for offset in (lateral, lateral - gap)]
+
+
+def test_contact_scrubs_speed_once():
+    track = Track(seed=1)
+    cars = _pair(track, 0.0, 8.0)
+    start = [(car.x, car.y) for car in cars]
+    grid = SpatialHash(collision_cell_size(cars[0]))
+    touching = set()
+    for car in cars:
+        car.speed = 10.0
+
+    # Still leaning on each other on the next ticks => one contact, one scrub
+    contacts = 0
+    for _ in range(3):
+        for car, (x, y) in zip(cars, start):
+            car.x, car.y = x, y
+        contacts += resolve_collisions(cars, grid, track, touching)
+    assert contacts == 1
+    assert [car.speed for car in cars] == [10.0 * COLLISION_SPEED_FACTOR] * 2
+
+
+def test_push_keeps_cars_on_track():
+    track = Track(seed=1)
+    cars = _pair(track, track.width / 2 - 1.0, 8.0)
+    resolve_collisions(cars, SpatialHash(collision_cell_size(cars[0])), track, set())
+    for car in cars:
+        point, _, _ = track.project((car.x, car.y))
+        assert math.dist(point, (car.x, car.y)) <= track.width / 2 + 1e-9
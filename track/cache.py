@@ -0,0 +1,124 @@
+# track/cache.py
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from config import SCREEN_WIDTH, SCREEN_HEIGHT, TRACK_WIDTH, TRACK_FUTURE_LOOKAHEADS, TRACK_PROGRESS_UNIT
+from config import TRACK_RESAMPLE_SPACING, TRACK_ADAPTIVE_TURN, TRACK_ADAPTIVE_MIN_SPACING, TRACK_ADAPTIVE_MAX_SPACING
+
+# Bump whenever generation or the stored layout changes; old entries are then ignored
+TRACK_FORMAT_VERSION = 3
+
+
+def cache_key(seed, curvature_window, layout="oval", resample=None):
+    """Hash of everything that determines a generated track."""
+    inputs = {
+        "version": TRACK_FORMAT_VERSION,
+        "generator": layout,
+        "seed": seed,
+        "screen": [SCREEN_WIDTH, SCREEN_HEIGHT],
+        "width": TRACK_WIDTH,
+        "curvature_window": curvature_window,
+        "lookaheads": list(TRACK_FUTURE_LOOKAHEADS),
+        "progress_unit": TRACK_PROGRESS_UNIT,
+        "resample": resample,
+    }
+    if resample == "uniform":
+        inputs["spacing"] = TRACK_RESAMPLE_SPACING
+    elif resample == "adaptive":
+        inputs["spacing"] = [TRACK_ADAPTIVE_TURN, TRACK_ADAPTIVE_MIN_SPACING, TRACK_ADAPTIVE_MAX_SPACING]
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()[:20]
+
+
+def cache_path(cache_dir, seed, curvature_window, layout="oval", resample=None):
+    return os.path.join(cache_dir, cache_key(seed, curvature_window, layout, resample))
+
+
+def _pack_cells(cells):
+    """dict cell -> index list as CSR arrays (keys, offsets, items)."""
+    keys = sorted(cells)
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(cells[k]) for k in keys])
+    items = np.array([i for k in keys for i in cells[k]], dtype=np.int64)
+    return np.array(keys, dtype=np.int64).reshape(-1, 2), offsets, items
+
+
+def unpack_cells(keys, offsets, items):
+    """CSR arrays (as stored by write_track) back to the dict cell -> index list CenterlineIndex uses."""
+    items = items.tolist()
+    offsets = offsets.tolist()
+    return {
+        (cx, cy): items[offsets[k]:offsets[k + 1]]
+        for k, (cx, cy) in enumerate(keys.tolist())
+    }
+
+
+def write_track(track, path):
+    """
+    Store a track as a directory of raw .npy arrays plus meta.json, written to
+    a temp directory and renamed into place so concurrent writers are safe.
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+
+    arrays = {
+        "points": track.points,
+        "raw_curvature": track.raw_curvature,
+        "curvature": track.curvature,
+        "heading": track.heading,
+        "arc_length": track.arc_length,
+    }
+    for look_ahead, table in track.future_headings.items():
+        arrays[f"future_heading_{look_ahead}"] = table
+    for name, cells in (("point_cells", track.index.point_cells), ("segment_cells", track.index.segment_cells)):
+        keys, offsets, items = _pack_cells(cells)
+        arrays[f"{name}_keys"] = keys
+        arrays[f"{name}_offsets"] = offsets
+        arrays[f"{name}_items"] = items
+
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, name + ".npy"), np.ascontiguousarray(array))
+
+    meta = {
+        "version": TRACK_FORMAT_VERSION,
+        "seed": track.seed,
+        "layout": track.layout,
+        "resample": track.resample,
+        "center": [track.center_x, track.center_y],
+        "width": track.width,
+        "checkpoint_indices": track.checkpoint_indices,
+        "curvature_window": track.curvature_window,
+        "future_lookaheads": sorted(track.future_headings),
+        "index_cell_size": track.index.cell_size,
+    }
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        # Another process stored the same track first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def read_track(path):
+    """
+    Return (meta, arrays); arrays are read-only memory maps of the stored
+    files, nothing is read or copied here. The index cells stay packed as
+    <name>_keys/_offsets/_items (see unpack_cells).
+    """
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta["version"] != TRACK_FORMAT_VERSION:
+        raise ValueError(f"Track file {path} has format {meta['version']}, expected {TRACK_FORMAT_VERSION}")
+
+    arrays = {}
+    for filename in os.listdir(path):
+        if filename.endswith(".npy"):
+            arrays[filename[:-4]] = np.load(os.path.join(path, filename), mmap_mode="r")
+    return meta, arrays
@@ -0,0 +1,424 @@
+# track/generator.py
+import argparse
+import json
+import math
+import os
+import random
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from config import SCREEN_WIDTH, SCREEN_HEIGHT, TRACK_WIDTH
+from config import TRACK_MIN_RADIUS, TRACK_RADIUS_SPAN, TRACK_CLOSURE_GAP, TRACK_CLOSURE_TURN
+
+# Cell offsets that visit every neighbouring pair of cells exactly once
+_HALF_NEIGHBOURHOOD = [(0, 0), (1, 0), (-1, 1), (0, 1), (1, 1)]
+
+
+# -------------------------------------------------
+# Layouts: a batch of seeds => (batch, points, 2) open centerlines
+# -------------------------------------------------
+def _oval_params(seed):
+    # Same draws, in the same order, as the original single-track generator
+    rng = random.Random(seed)
+    base_radius = 300
+    params = []
+    for _ in range(10):
+        seg_type = rng.choice(["straight", "curve_smooth", "curve_tight"])
+        if seg_type == "straight":
+            angle_change = rng.uniform(0.1, 0.3)
+            radius = base_radius + rng.uniform(-30, 30)
+        elif seg_type == "curve_smooth":
+            angle_change = rng.uniform(0.4, 0.8)
+            radius = base_radius + rng.uniform(-60, 60)
+        else:  # curve_tight
+            angle_change = rng.uniform(1.0, 1.5)
+            radius = base_radius + rng.uniform(-120, -60)
+        params.append((angle_change, radius))
+    return params
+
+
+def generate_ovals(seeds, cx, cy, count=360, smoothing=0.5):
+    """
+    Ten arcs of random sweep and radius around the center, their sweeps
+    scaled to close exactly one turn, then re-centered. The radius steps
+    between arcs are smoothed over a circular Gaussian of smoothing rad, so
+    the loop closes without a kink and passes validate() (the tightest bend
+    over the first 20000 seeds has a radius of 130 px).
+    """
+    params = np.array([_oval_params(seed) for seed in seeds]).reshape(len(seeds), -1, 2)
+    change, radius = params[:, :, 0], params[:, :, 1]
+    ends = np.cumsum(change, axis=1) * (2 * math.pi / change.sum(axis=1, keepdims=True))
+
+    # Radius of the arc each angle falls in, then low-passed around the loop
+    angle = np.arange(count) * (2 * math.pi / count)
+    segment = np.minimum((angle[None, None, :] >= ends[:, :, None]).sum(axis=1), change.shape[1] - 1)
+    steps = np.take_along_axis(radius, segment, axis=1)
+    offset = np.angle(np.exp(1j * (angle[:, None] - angle[None, :]))) # Signed angle between samples
+    weights = np.exp(-0.5 * (offset / smoothing) ** 2)
+    r = steps @ (weights / weights.sum(axis=1, keepdims=True)).T
+
+    points = np.stack([cx + r * np.cos(angle), cy + r * np.sin(angle)], axis=-1)
+    return points - points.mean(axis=1, keepdims=True) + np.array([cx, cy])
+
+
+def generate_figure8s(seeds, cx, cy, count=360):
+    """
+    Two circles of radius r, centers 2d apart, joined by their internal
+    tangents, which cross at the center: straight across, clockwise round
+    the right loop, straight back across, anticlockwise round the left loop.
+    Points are evenly spaced along the way.
+    """
+    rngs = [np.random.default_rng(seed) for seed in seeds]
+    r = np.array([rng.uniform(140, 170) for rng in rngs])[:, None]
+    d = np.array([rng.uniform(210, 230) for rng in rngs])[:, None]
+    tilt = np.array([rng.uniform(-0.15, 0.15) for rng in rngs])[:, None]
+
+    alpha = np.arcsin(r / d) # Heading of the first straight; the crossing angle is 2 alpha
+    straight = 2 * d * np.cos(alpha)
+    arc = r * (math.pi + 2 * alpha)
+    s = np.arange(count)[None, :] * (2 * (straight + arc)) / count
+
+    # Straight from the left tangent point, right loop, straight back, left loop
+    half = d * np.cos(alpha)
+    s1 = s - straight
+    s2 = s1 - arc
+    s3 = s2 - straight
+    right = math.pi / 2 + alpha - s1 / r
+    left = math.pi / 2 - alpha + s3 / r
+    x = np.select([s1 < 0, s2 < 0, s3 < 0],
+                  [(s - half) * np.cos(alpha), d + r * np.cos(right), (half - s2) * np.cos(alpha)],
+                  -d + r * np.cos(left))
+    y = np.select([s1 < 0, s2 < 0, s3 < 0],
+                  [(s - half) * np.sin(alpha), r * np.sin(right), -(half - s2) * np.sin(alpha)],
+                  r * np.sin(left))
+
+    c, sn = np.cos(tilt), np.sin(tilt)
+    return np.stack([cx + c * x - sn * y, cy + sn * x + c * y], axis=-1)
+
+
+# Blueprint of the technical layout, relative to the center
+_TECHNICAL_CONTROL = np.array([(200, 150), (200, -100), (0, -200), (-200, -100), (-200, 50), (0, 200)], dtype=float)
+
+
+def generate_technicals(seeds, cx, cy, span_points=50):
+    """
+    The blueprint polygon, scaled and with every corner jittered, rounded
+    into a closed uniform cubic B-spline.
+    """
+    rngs = [np.random.default_rng(seed) for seed in seeds]
+    scale = np.array([rng.uniform(1.2, 1.45) for rng in rngs])[:, None, None]
+    jitter = np.array([rng.uniform(-40, 40, size=_TECHNICAL_CONTROL.shape) for rng in rngs])
+    control = (_TECHNICAL_CONTROL + jitter) * scale
+
+    # Uniform cubic B-spline basis; span k is shaped by control points k-1 .. k+2
+    u = np.arange(span_points) / span_points
+    basis = np.stack([(1 - u) ** 3, 3 * u ** 3 - 6 * u ** 2 + 4, -3 * u ** 3 + 3 * u ** 2 + 3 * u + 1, u ** 3], axis=1) / 6
+    n = len(_TECHNICAL_CONTROL)
+    spans = np.stack([control[:, (np.arange(n) + k) % n] for k in (-1, 0, 1, 2)], axis=2) # (batch, span, 4, 2)
+    points = np.einsum("uk,bskd->bsud", basis, spans).reshape(len(seeds), -1, 2)
+    return points + np.array([cx, cy])
+
+
+def generate_chicanes(seeds, cx, cy, count=360):
+    """Ellipse with one left-right-left kink: a full sine wave of radial offset over a short arc."""
+    rngs = [np.random.default_rng(seed) for seed in seeds]
+    ry = np.array([rng.uniform(220, 280) for rng in rngs])[:, None]
+    rx = ry * np.array([rng.uniform(1.0, 1.4) for rng in rngs])[:, None]
+    amplitude = np.array([rng.uniform(20, 45) for rng in rngs])[:, None]
+    sweep = np.array([rng.uniform(350, 550) for rng in rngs])[:, None] / ry # Chicane length => angle
+    # Anywhere clear of the start line at angle 0
+    start = 0.5 + np.array([rng.random() for rng in rngs])[:, None] * (2 * math.pi - 1.0 - sweep)
+
+    a = np.linspace(0, 2 * math.pi, count, endpoint=False)[None, :]
+    u = np.clip((a - start) / sweep, 0, 1)
+    offset = amplitude * np.sin(2 * math.pi * u) * np.sin(math.pi * u) ** 2
+    return np.stack([cx + (rx + offset) * np.cos(a), cy + (ry + offset) * np.sin(a)], axis=-1)
+
+
+# Layout name => (batch generator, intended self-crossings)
+LAYOUTS = {
+    "oval": (generate_ovals, 0),
+    "figure8": (generate_figure8s, 1),
+    "technical": (generate_technicals, 0),
+    "chicane": (generate_chicanes, 0),
+}
+
+
+def generate(layout, seeds, cx=SCREEN_WIDTH // 2, cy=SCREEN_HEIGHT // 2):
+    """(len(seeds), points, 2) open centerlines; the loop closes from the last point to the first."""
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown track layout {layout!r}, expected one of {sorted(LAYOUTS)}")
+    return LAYOUTS[layout][0](list(seeds), cx, cy)
+
+
+# -------------------------------------------------
+# Validity checks, each over the whole batch
+# -------------------------------------------------
+def _steps(points):
+    """Length of every segment, including the closing one from the last point to the first."""
+    return np.hypot(*(np.roll(points, -1, axis=1) - points).transpose(2, 0, 1))
+
+
+def closure_ok(points, gap=TRACK_CLOSURE_GAP, turn=TRACK_CLOSURE_TURN):
+    """The closing segment is no longer than gap median spacings and bends no more than turn at either end."""
+    steps = _steps(points)
+    closing = steps[:, -1] <= gap * np.median(steps, axis=1)
+
+    d_last = points[:, -1] - points[:, -2]
+    d_close = points[:, 0] - points[:, -1]
+    d_first = points[:, 1] - points[:, 0]
+    heading = [np.arctan2(d[:, 1], d[:, 0]) for d in (d_last, d_close, d_first)]
+    bends = [np.abs(np.angle(np.exp(1j * (h1 - h0)))) for h0, h1 in zip(heading, heading[1:])]
+    return closing & (bends[0] <= turn) & (bends[1] <= turn)
+
+
+def min_radius(points, span=TRACK_RADIUS_SPAN):
+    """
+    Smallest bend radius per track: the circumradius through each point and
+    the points about span px before and after it, so a kink shorter than
+    span counts as a tight bend rather than vanishing between two samples.
+    """
+    k = max(1, int(round(span / float(np.median(_steps(points))))))
+    a = np.roll(points, k, axis=1) - points
+    b = np.roll(points, -k, axis=1) - points
+    cross = np.abs(a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0])
+    sides = np.hypot(*a.transpose(2, 0, 1)) * np.hypot(*b.transpose(2, 0, 1)) * np.hypot(*(b - a).transpose(2, 0, 1))
+    radius = np.where(cross > 1e-12, sides / np.maximum(2 * cross, 1e-12), np.inf)
+    return radius.min(axis=1)
+
+
+def _hash_pairs(centers, cell_size):
+    """
+    Uniform hash grid over every item of every track at once: returns
+    (track, i, j), i != j, for all items of one track in the same or
+    adjacent cells, each unordered pair once. Items closer than cell_size
+    always end up in the result.
+    """
+    batch, count = centers.shape[:2]
+    cells = np.floor(centers / cell_size).astype(np.int64)
+    cells -= cells.reshape(-1, 2).min(axis=0) - 1 # One empty cell of padding all round
+    width = int(cells[..., 0].max()) + 2
+    height = int(cells[..., 1].max()) + 2
+
+    keys = ((np.arange(batch)[:, None] * height + cells[..., 1]) * width + cells[..., 0]).ravel()
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+
+    found = []
+    for dx, dy in _HALF_NEIGHBOURHOOD:
+        target = keys + dy * width + dx
+        lo = np.searchsorted(sorted_keys, target, side="left")
+        hi = np.searchsorted(sorted_keys, target, side="right")
+        counts = hi - lo
+        first = np.repeat(np.arange(len(keys)), counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = order[np.repeat(lo, counts) + within]
+        if dx == 0 and dy == 0:
+            keep = first < second
+            first, second = first[keep], second[keep]
+        found.append((first, second))
+
+    first = np.concatenate([f for f, _ in found])
+    second = np.concatenate([s for _, s in found])
+    return first // count, first % count, second % count
+
+
+def _cross2(a, b):
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+
+def crossings(points):
+    """
+    Proper crossings between non-adjacent segments, via the hash grid (two
+    segments can only cross if their midpoints are within the longest
+    segment length of each other). Returns (track, point, acute angle) arrays.
+    """
+    batch, count = points.shape[:2]
+    ends = np.roll(points, -1, axis=1)
+    mids = (points + ends) / 2
+    track, i, j = _hash_pairs(mids, float(_steps(points).max()))
+
+    gap = np.abs(i - j)
+    keep = (gap > 1) & (gap < count - 1)
+    track, i, j = track[keep], i[keep], j[keep]
+
+    p, r = points[track, i], ends[track, i] - points[track, i]
+    q, s = points[track, j], ends[track, j] - points[track, j]
+    denom = _cross2(r, s)
+    parallel = np.abs(denom) < 1e-12
+    denom = np.where(parallel, 1.0, denom)
+    t = _cross2(q - p, s) / denom
+    u = _cross2(q - p, r) / denom
+    hit = ~parallel & (t > 0) & (t < 1) & (u > 0) & (u < 1)
+
+    at = p[hit] + t[hit, None] * r[hit]
+    cos = np.abs((r[hit] * s[hit]).sum(axis=1)) / (np.hypot(*r[hit].T) * np.hypot(*s[hit].T))
+    return track[hit], at, np.arccos(np.clip(cos, 0.0, 1.0))
+
+
+def clearance_ok(points, width=TRACK_WIDTH, crossing=None):
+    """
+    Parts of the centerline further apart along the track than a half turn
+    at the minimum radius must stay width apart, or their surfaces overlap.
+    Near an intended crossing (track, point, angle) the two legs approach
+    each other by design: points within width / sin(angle) of it are exempt.
+    """
+    batch = len(points)
+    arc = np.concatenate([np.zeros((batch, 1)), np.cumsum(_steps(points), axis=1)], axis=1)
+    length = arc[:, -1]
+
+    # Points about width / 8 apart are plenty to compare distances of width
+    stride = max(1, int(round(width / 8 / float(np.median(_steps(points))))))
+    points, arc = points[:, ::stride], arc[:, :-1:stride]
+
+    track, i, j = _hash_pairs(points, width)
+    flat, count = points.reshape(-1, 2), points.shape[1]
+    gap = flat[track * count + i] - flat[track * count + j]
+    close = (gap ** 2).sum(axis=1) < width ** 2
+    track, i, j = track[close], i[close], j[close]
+
+    along = np.abs(arc[track, i] - arc[track, j])
+    along = np.minimum(along, length[track] - along)
+    bad = along > math.pi * width / 2
+
+    if crossing is not None:
+        x_track, x_point, x_angle = crossing
+        reach = np.full(batch, -1.0)
+        centre = np.zeros((batch, 2))
+        reach[x_track] = width / np.maximum(np.sin(x_angle), 1e-3)
+        centre[x_track] = x_point
+        near_i = np.hypot(*(points[track, i] - centre[track]).T) < reach[track]
+        near_j = np.hypot(*(points[track, j] - centre[track]).T) < reach[track]
+        bad &= ~(near_i & near_j)
+
+    ok = np.ones(batch, dtype=bool)
+    ok[track[bad]] = False
+    return ok
+
+
+def validate(points, width=TRACK_WIDTH, intended_crossings=0, radius=TRACK_MIN_RADIUS):
+    """
+    Reason each track is rejected ("closure", "radius", "crossing" or
+    "clearance"), or "" if it is valid. Checks run cheapest first and each
+    only on the tracks that passed the ones before.
+    """
+    reasons = np.full(len(points), "", dtype=object)
+
+    alive = np.flatnonzero(closure_ok(points))
+    reasons[np.setdiff1d(np.arange(len(points)), alive)] = "closure"
+    if len(alive) == 0:
+        return reasons
+
+    tight = min_radius(points[alive]) < radius
+    reasons[alive[tight]] = "radius"
+    alive = alive[~tight]
+    if len(alive) == 0:
+        return reasons
+
+    x_track, x_point, x_angle = crossings(points[alive])
+    per_track = np.bincount(x_track, minlength=len(alive))
+    wrong = per_track != intended_crossings
+    reasons[alive[wrong]] = "crossing"
+
+    # Only tracks with the intended crossings left; remap their crossing rows
+    keep = np.flatnonzero(~wrong)
+    rows = np.isin(x_track, keep)
+    remap = np.full(len(alive), -1)
+    remap[keep] = np.arange(len(keep))
+    crossing = (remap[x_track[rows]], x_point[rows], x_angle[rows]) if intended_crossings else None
+    alive = alive[keep]
+    if len(alive) == 0:
+        return reasons
+
+    reasons[alive[~clearance_ok(points[alive], width, crossing)]] = "clearance"
+    return reasons
+
+
+# -------------------------------------------------
+# Corpora
+# -------------------------------------------------
+def check_batch(layout, seeds):
+    """Generate and validate one batch; returns (valid seeds, rejection reasons)."""
+    points = generate(layout, seeds)
+    reasons = validate(points, intended_crossings=LAYOUTS[layout][1])
+    return [seed for seed, reason in zip(seeds, reasons) if not reason], [r for r in reasons if r]
+
+
+def _check_batch_star(args):
+    return check_batch(*args)
+
+
+def _store_track(args):
+    from track.track import Track
+    seed, layout = args
+    Track(seed=seed, layout=layout)
+
+
+def build_corpus(layout, count, first_seed=0, batch_size=256, workers=None, cache=False):
+    """
+    The first count valid seeds of layout from first_seed on. Batches of
+    consecutive seeds are checked over a process pool, a round of a few
+    batches per worker at a time until enough have passed; results come back
+    in seed order, so the corpus does not depend on the worker count.
+    cache => also build each track once so later runs load it from the cache.
+    """
+    start = time.perf_counter()
+    seeds, rejected, candidates = [], {}, 0
+    next_seed = first_seed
+
+    with Pool(workers) as pool:
+        per_round = 4 * (workers or os.cpu_count())
+        while len(seeds) < count:
+            jobs = [(layout, list(range(next_seed + k * batch_size, next_seed + (k + 1) * batch_size)))
+                    for k in range(per_round)]
+            next_seed += per_round * batch_size
+            for valid, reasons in pool.imap(_check_batch_star, jobs):
+                if len(seeds) >= count:
+                    break
+                candidates += batch_size
+                seeds.extend(valid)
+                for reason in reasons:
+                    rejected[reason] = rejected.get(reason, 0) + 1
+            if not seeds and candidates >= 100 * batch_size:
+                raise RuntimeError(f"No valid {layout} track in {candidates} candidates: {rejected}")
+
+        seeds = seeds[:count]
+        if cache:
+            pool.map(_store_track, [(seed, layout) for seed in seeds])
+
+    return {
+        "layout": layout,
+        "seeds": seeds,
+        "candidates": candidates,
+        "rejected": rejected,
+        "elapsed_seconds": time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m track.generator", description="Build a corpus of valid generated tracks")
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), default="technical")
+    parser.add_argument("--count", type=int, default=1000, help="valid tracks wanted")
+    parser.add_argument("--seed", type=int, default=0, help="first candidate seed")
+    parser.add_argument("--batch", type=int, default=256, help="candidates generated and checked together")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--cache", action="store_true", help="also store every corpus track in the track cache")
+    parser.add_argument("--out", default="corpus.json", help="JSON with the layout and its valid seeds")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.layout, args.count, args.seed, args.batch, args.workers, args.cache)
+    tmp = args.out + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(corpus, f)
+    os.replace(tmp, args.out)
+
+    elapsed = corpus["elapsed_seconds"]
+    print(f"{len(corpus['seeds'])} valid {args.layout} tracks of {corpus['candidates']} candidates "
+          f"in {elapsed:.2f}s ({corpus['candidates'] / elapsed:.0f} candidates/s), rejected {corpus['rejected']}")
+    print(f"corpus in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
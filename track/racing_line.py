@@ -0,0 +1,186 @@
+# track/racing_line.py
+import hashlib
+import json
+import math
+import os
+import tempfile
+
+import numpy as np
+
+from config import RACING_LINE_SPACING, RACING_LINE_MARGIN, RACING_LINE_ITERATIONS, RACING_LINE_SPEED_FACTOR
+
+# Bump whenever the optimisation changes; lines cached by older code are then ignored
+LINE_FORMAT_VERSION = 1
+
+
+class RacingLine:
+    """
+    A closed line through the track, sampled every `spacing` px of centerline
+    arc length (one station each), with the target speed at every station.
+    station_of_index maps a centerline index to its station, so a car that
+    already knows its closest centerline index finds its place in O(1).
+    """
+
+    def __init__(self, points, speed, offsets, spacing, station_of_index):
+        self.points = points
+        self.speed = speed
+        self.offsets = offsets
+        self.spacing = spacing
+        self.station_of_index = station_of_index
+
+        # Plain lists for the per-tick scalar lookups
+        self._xs = points[:, 0].tolist()
+        self._ys = points[:, 1].tolist()
+        self._speeds = speed.tolist()
+        self._stations = station_of_index.tolist()
+
+    def __len__(self):
+        return len(self._xs)
+
+    def station(self, pos, index, window=8):
+        """Station closest to pos, searched around the station of centerline index `index`."""
+        n = len(self._xs)
+        xs, ys = self._xs, self._ys
+        x, y = pos
+        best, best_d = 0, math.inf
+        start = self._stations[index]
+        for j in range(start - window, start + window + 1):
+            j %= n
+            d = (xs[j] - x) ** 2 + (ys[j] - y) ** 2
+            if d < best_d:
+                best, best_d = j, d
+        return best
+
+    def point(self, station):
+        station %= len(self._xs)
+        return self._xs[station], self._ys[station]
+
+    def speed_at(self, station):
+        return self._speeds[station % len(self._speeds)]
+
+    def save(self, path):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp-", suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, points=self.points, speed=self.speed, offsets=self.offsets,
+                     spacing=self.spacing, station_of_index=self.station_of_index)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["points"], data["speed"], data["offsets"], float(data["spacing"]), data["station_of_index"])
+
+
+def line_cache_name(spacing, margin, iterations, speed_factor, car):
+    inputs = {
+        "version": LINE_FORMAT_VERSION,
+        "spacing": spacing,
+        "margin": margin,
+        "iterations": iterations,
+        "speed_factor": speed_factor,
+        "car": [car.max_speed, car.acceleration_rate, car.brake_rate, car.turn_rate],
+    }
+    key = hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()[:20]
+    return f"racing_line-{key}.npz"
+
+
+def _second_difference(count):
+    """Cyclic second-difference matrix: row j => p[j-1] - 2 p[j] + p[j+1]."""
+    d2 = -2.0 * np.eye(count)
+    d2[np.arange(count), (np.arange(count) - 1) % count] = 1.0
+    d2[np.arange(count), (np.arange(count) + 1) % count] = 1.0
+    return d2
+
+
+def _min_curvature_offsets(base, normals, half_range, iterations):
+    """
+    Lateral offsets a (|a| <= half_range) minimising the summed squared second
+    difference of base + a * normals, i.e. the discrete curvature of the line.
+    A box-constrained least-squares problem, solved exactly by an active-set
+    method: solve for the free offsets with the others pinned to an edge,
+    pin the ones that overshoot, release the ones the gradient pulls inward.
+    """
+    count = len(base)
+    d2 = _second_difference(count)
+    A = np.vstack([d2 * normals[:, 0], d2 * normals[:, 1]])
+    b = np.concatenate([d2 @ base[:, 0], d2 @ base[:, 1]])
+    H = A.T @ A
+    c = A.T @ b
+
+    offsets = np.zeros(count)
+    pinned = np.zeros(count) # -1 => inner edge, 1 => outer edge, 0 => free
+    for _ in range(iterations):
+        free = pinned == 0
+        offsets[~free] = pinned[~free] * half_range
+        rhs = -(c[free] + H[np.ix_(free, ~free)] @ offsets[~free])
+        offsets[free] = np.linalg.solve(H[np.ix_(free, free)], rhs)
+
+        over = free & (np.abs(offsets) > half_range)
+        if over.any():
+            pinned[over] = np.sign(offsets[over])
+            offsets[over] = pinned[over] * half_range
+            continue
+
+        # Pinned offsets whose gradient points back inside the track are freed
+        gradient = H @ offsets + c
+        release = (pinned * gradient) > 0
+        if not release.any():
+            break
+        pinned[release] = 0
+    return offsets
+
+
+def _speed_profile(points, spacing, car, speed_factor, reach=4):
+    """
+    Highest speed per station the car can hold: the turn rate limits speed in
+    a bend (heading change per tick = speed * curvature), then forward and
+    backward passes respect the acceleration and braking rates. Curvature is
+    taken over +-reach stations, about the distance a car covers in a few
+    ticks, so kinks shorter than that do not count as bends.
+    """
+    prev = np.roll(points, reach, axis=0)
+    nxt = np.roll(points, -reach, axis=0)
+    heading_in = np.arctan2(points[:, 1] - prev[:, 1], points[:, 0] - prev[:, 0])
+    heading_out = np.arctan2(nxt[:, 1] - points[:, 1], nxt[:, 0] - points[:, 0])
+    turn = np.abs(np.arctan2(np.sin(heading_out - heading_in), np.cos(heading_out - heading_in)))
+    step = 0.5 * (np.hypot(*(points - prev).T) + np.hypot(*(nxt - points).T))
+    curvature = turn / np.maximum(step, 1e-9) # Heading change per px of travel
+
+    limit = np.minimum(car.max_speed, speed_factor * car.turn_rate / np.maximum(curvature, 1e-9))
+
+    # v dv = a ds per tick of constant acceleration; two laps so the loop closes
+    speed = limit.copy()
+    count = len(speed)
+    for _ in range(2):
+        for j in range(count):
+            i = j - 1
+            speed[j] = min(speed[j], math.sqrt(speed[i] ** 2 + 2 * car.acceleration_rate * spacing))
+        for j in range(count - 1, -1, -1):
+            k = (j + 1) % count
+            speed[j] = min(speed[j], math.sqrt(speed[k] ** 2 + 2 * car.brake_rate * spacing))
+    return speed
+
+
+def compute_racing_line(track, spacing=RACING_LINE_SPACING, margin=RACING_LINE_MARGIN,
+                        iterations=RACING_LINE_ITERATIONS, speed_factor=RACING_LINE_SPEED_FACTOR, car=None):
+    """
+    Minimum-curvature line inside the track edges (less margin on each side)
+    plus its speed profile for the car's acceleration, braking and turn rate.
+    """
+    if car is None:
+        from car.car import Car
+        car = Car(0.0, 0.0, verbose=False)
+
+    # Stations evenly spaced along the centerline; the centerline points themselves are not
+    count = max(8, int(round(track.length / spacing)))
+    spacing = track.length / count
+    stations = [track.point_at_distance(j * spacing) for j in range(count)]
+    base = np.array([(x, y) for x, y, _ in stations])
+    normals = np.array([(-math.sin(h), math.cos(h)) for _, _, h in stations])
+
+    offsets = _min_curvature_offsets(base, normals, track.width / 2 - margin, iterations)
+    points = base + offsets[:, None] * normals
+    speed = _speed_profile(points, spacing, car, speed_factor)
+
+    station_of_index = np.round(np.asarray(track.arc_length) / spacing).astype(np.int64) % count
+    return RacingLine(points, speed, offsets, spacing, station_of_index)
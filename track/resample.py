@@ -0,0 +1,67 @@
+# track/resample.py
+import numpy as np
+
+from config import TRACK_RESAMPLE_SPACING, TRACK_ADAPTIVE_TURN, TRACK_ADAPTIVE_MIN_SPACING, TRACK_ADAPTIVE_MAX_SPACING
+
+
+def _closed_arc_length(points):
+    """Arc length at every point of the closed loop plus the length of the whole loop at the end."""
+    loop = np.vstack([points, points[:1]])
+    return np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(loop, axis=0).T))))
+
+
+def _points_at(points, arc, s):
+    """Points at arc lengths s along the closed polyline (linear between the original points)."""
+    loop = np.vstack([points, points[:1]])
+    return np.stack([np.interp(s, arc, loop[:, 0]), np.interp(s, arc, loop[:, 1])], axis=1)
+
+
+def _unique(points):
+    # Repeated points (e.g. a closing point equal to the first) have no direction
+    keep = np.hypot(*(np.roll(points, -1, axis=0) - points).T) > 1e-9
+    return points[keep]
+
+
+def resample_uniform(points, spacing=TRACK_RESAMPLE_SPACING):
+    """Open (n, 2) centerline => the same closed loop with points every ~spacing px of arc length."""
+    points = _unique(np.asarray(points, dtype=np.float64))
+    arc = _closed_arc_length(points)
+    count = max(8, int(round(arc[-1] / spacing)))
+    return _points_at(points, arc, np.arange(count) * (arc[-1] / count))
+
+
+def resample_adaptive(points, max_turn=TRACK_ADAPTIVE_TURN, min_spacing=TRACK_ADAPTIVE_MIN_SPACING,
+                      max_spacing=TRACK_ADAPTIVE_MAX_SPACING):
+    """
+    Spacing follows the bends: each point turns the loop by about max_turn
+    rad, within [min_spacing, max_spacing] px. Curvature is measured on a
+    fine uniform copy and smoothed over max_spacing, then points are placed
+    where the running sum of 1 / spacing reaches each whole number.
+    """
+    fine = resample_uniform(points, min_spacing / 4)
+    arc = _closed_arc_length(fine)
+    step = arc[-1] / len(fine)
+
+    # Heading change per px at every fine point, smoothed over about max_spacing
+    d = np.roll(fine, -1, axis=0) - fine
+    heading = np.arctan2(d[:, 1], d[:, 0])
+    turn = np.abs(np.angle(np.exp(1j * (heading - np.roll(heading, 1)))))
+    window = max(1, int(max_spacing / step))
+    kernel = np.ones(2 * window + 1) / (2 * window + 1)
+    curvature = np.convolve(np.concatenate([turn[-window:], turn, turn[:window]]), kernel, mode="valid") / step
+
+    spacing = np.clip(max_turn / np.maximum(curvature, 1e-12), min_spacing, max_spacing)
+    density = np.concatenate(([0.0], np.cumsum(np.diff(arc) / spacing)))
+    count = max(8, int(round(density[-1])))
+    return _points_at(fine, arc, np.interp(np.arange(count) * (density[-1] / count), density, arc))
+
+
+def resample(points, mode):
+    """mode => "uniform", "adaptive" or None (points unchanged)."""
+    if mode is None:
+        return np.asarray(points, dtype=np.float64)
+    if mode == "uniform":
+        return resample_uniform(points)
+    if mode == "adaptive":
+        return resample_adaptive(points)
+    raise ValueError(f"Unknown resample mode {mode!r}, expected 'uniform', 'adaptive' or None")
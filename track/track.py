@@ -1,173 +1,369 @@
 # track/track.py
-import pygame
-import random
+import os
 
 import math
+import numpy as np
 from config import SCREEN_WIDTH, SCREEN_HEIGHT, TRACK_COLOR, TRACK_BORDER_COLOR, TRACK_WIDTH
+from config import TRACK_CURVATURE_WINDOW, TRACK_FUTURE_LOOKAHEADS, TRACK_CACHE_DIR, TRACK_RESAMPLE, TRACK_PROGRESS_UNIT
+from config import TRACK_GATE_MARGIN
+from config import RACING_LINE_SPACING, RACING_LINE_MARGIN, RACING_LINE_ITERATIONS, RACING_LINE_SPEED_FACTOR
+from track.cache import cache_path, read_track, unpack_cells, write_track
+from track.generator import generate
+from track.resample import resample as resample_centerline
+from utils import kernels
+from utils.geometry import CenterlineIndex, compute_curvature, dense_cell_grid, get_track_heading
+
+
+def _read_only(array):
+    view = array.view()
+    view.flags.writeable = False
+    return view
 
 
 class Track:
-    def __init__(self):
+    def __init__(self, seed=None, curvature_window=TRACK_CURVATURE_WINDOW, cache_dir=TRACK_CACHE_DIR, layout="oval",
+                 resample=TRACK_RESAMPLE):
+        # seed => reproducible layout; None => new random track every run
+        # layout => one of track.generator.LAYOUTS
+        # resample => "uniform"/"adaptive" arc-length resampling of the generated points (None => keep them)
+        self.seed = seed
+        self.layout = layout
+        self.resample = resample
         self.center_x = SCREEN_WIDTH // 2
         self.center_y = SCREEN_HEIGHT // 2
         self.width = TRACK_WIDTH
+
+        # Seeded tracks are reproducible, so they can be loaded instead of rebuilt
+        path = None
+        self.cache_path = None # Directory holding this track's cached data, if any
+        if seed is not None and cache_dir:
+            path = cache_path(cache_dir, seed, curvature_window, layout, resample)
+            self.cache_path = path
+            if os.path.isdir(path):
+                self._load(path)
+                return
         
-        self.centerline = self._generate_oval()
+        points = resample_centerline(generate(layout, [seed], self.center_x, self.center_y)[0], resample)
+        self._setup([tuple(p) for p in points.tolist()], curvature_window)
+
+        if path is not None:
+            self.save(path)
+
+    def _setup(self, centerline, curvature_window):
+        self._centerline = centerline
 
         # Close loop (ensure first == last)
         if self.centerline[0] != self.centerline[-1]:
             self.centerline.append(self.centerline[0])
 
-        # Place 4 evenly spaced checkpoints
-        total = len(self.centerline) - 1  # exclude duplicate last point
-        self.checkpoint_indices = [0, total // 4, total // 2, 3 * total // 4]
+        # Spatial index for closest-point queries
+        self._index = CenterlineIndex(self.centerline)
+        self._packed_cells = None
+
+        # Per-index geometry, fixed once the centerline exists
+        self._build_geometry_tables(curvature_window)
+        self._racing_line = None
+
+        # Place 4 checkpoints evenly spaced along the track, the first on the start line
+        quarters = np.arange(4) * self.length / 4
+        self.checkpoint_indices = np.searchsorted(self.arc_length, quarters).tolist()
         self.checkpoints = [self.centerline[i] for i in self.checkpoint_indices]
+        self._build_gates()
+
+    @classmethod
+    def from_centerline(cls, centerline, width=TRACK_WIDTH, curvature_window=TRACK_CURVATURE_WINDOW):
+        """Track around an existing closed centerline (e.g. stored in a replay)."""
+        track = cls.__new__(cls)
+        track.seed = None
+        track.layout = None
+        track.resample = None # Already the points the track was built on
+        track.center_x = SCREEN_WIDTH // 2
+        track.center_y = SCREEN_HEIGHT // 2
+        track.width = width
+        track.cache_path = None
+        track._setup(list(centerline), curvature_window)
+        return track
+
+    @classmethod
+    def load(cls, path):
+        """Load a track stored with save(); tables are memory-mapped, not copied."""
+        track = cls.__new__(cls)
+        track._load(path)
+        return track
+
+    def save(self, path):
+        write_track(self, path)
+
+    def _load(self, path):
+        meta, arrays = read_track(path)
+        self.cache_path = path
+        self.seed = meta["seed"]
+        self.layout = meta.get("layout", "oval")
+        self.resample = meta.get("resample")
+        self.center_x, self.center_y = meta["center"]
+        self.width = meta["width"]
+
+        # Arrays stay memory-mapped; the Python lists and the index are built on first use
+        self.points = arrays["points"]
+        self._centerline = None
+        self.checkpoint_indices = meta["checkpoint_indices"]
+        self.checkpoints = [tuple(self.points[i].tolist()) for i in self.checkpoint_indices]
+
+        self._index = None
+        self._index_cell_size = meta["index_cell_size"]
+        self._packed_cells = {name: tuple(arrays[f"{name}_{part}"] for part in ("keys", "offsets", "items"))
+                              for name in ("point_cells", "segment_cells")}
+
+        self.raw_curvature = arrays["raw_curvature"]
+        self.curvature_window = meta["curvature_window"]
+        self.curvature = arrays["curvature"]
+        self.heading = arrays["heading"]
+        self.future_headings = {k: arrays[f"future_heading_{k}"] for k in meta["future_lookaheads"]}
+        self.arc_length = arrays["arc_length"]
+        self.length = float(self.arc_length[-1])
+        self._build_scalar_views()
+        self._build_gates()
+        self._racing_line = None
+
+    def _build_geometry_tables(self, curvature_window):
+        """
+        Precompute curvature, heading, future heading and arc length per
+        centerline index so per-frame code reads them instead of redoing trig.
+        Curvature and lookaheads are per TRACK_PROGRESS_UNIT px of arc length,
+        not per point, so they mean the same however the points are spaced.
+        """
+        centerline = self.centerline
+        n = len(centerline)
+        self.points = np.array(centerline, dtype=np.float64)
+
+        # Distance along the centerline from index 0
+        segment_lengths = np.hypot(*np.diff(self.points, axis=0).T)
+        self.arc_length = np.concatenate(([0.0], np.cumsum(segment_lengths)))
+        self.length = float(self.arc_length[-1])
+
+        # Turn at each point from the previous/next point, scaled to one progress unit of travel
+        # (capped at 1, a full reversal), optionally averaged over +-curvature_window indices
+        spacing = (np.roll(np.append(segment_lengths, 0.0), 1) + np.append(segment_lengths, 0.0)) / 2
+        turn = np.array([
+            compute_curvature(centerline[(i - 1) % n], centerline[i], centerline[(i + 1) % n])
+            for i in range(n)
+        ])
+        self.raw_curvature = np.minimum(1.0, turn * TRACK_PROGRESS_UNIT / np.maximum(spacing, 1e-9))
+        self.curvature_window = curvature_window
+        if curvature_window > 0:
+            offsets = np.arange(-curvature_window, curvature_window + 1)
+            self.curvature = self.raw_curvature[(np.arange(n)[:, None] + offsets) % n].mean(axis=1)
+        else:
+            self.curvature = self.raw_curvature
+
+        # Forward heading and heading toward points further ahead
+        self.heading = np.array([get_track_heading(centerline, i) for i in range(n)])
+        self.future_headings = {}
+        for look_ahead in TRACK_FUTURE_LOOKAHEADS:
+            self.future_heading_table(look_ahead)
+        self._build_scalar_views()
+
+    def _build_scalar_views(self):
+        # Plain lists for scalar hot paths (NumPy scalar indexing is slower), built on first use
+        self._curvature_list = None
+        self._future_heading_lists = {}
+        self._arc_list = None
+
+        # Compiled kernel inputs (see kernel_tables), built on first use
+        self._kernel_tables = {}
 
-    # -------------------------------------------------
-    # Smooth oval with realistic racing curvature
-    # -------------------------------------------------
-    def _generate_oval(self):
-        random.seed()
-
-        points = []
-        cx, cy = self.center_x, self.center_y
-
-        # Track parameters
-        base_radius = 300
-        num_segments = 10  # total distinct track sections
-        segment_points = 30  # resolution per segment
-        angle = 0
-
-        # Define track segments (angle change per segment)
-        segments = []
-        for _ in range(num_segments):
-            seg_type = random.choice(["straight", "curve_smooth", "curve_tight"])
-            if seg_type == "straight":
-                angle_change = random.uniform(0.1, 0.3)  # gentle forward segment
-                radius = base_radius + random.uniform(-30, 30)
-            elif seg_type == "curve_smooth":
-                angle_change = random.uniform(0.4, 0.8)
-                radius = base_radius + random.uniform(-60, 60)
-            else:  # curve_tight
-                angle_change = random.uniform(1.0, 1.5)
-                radius = base_radius + random.uniform(-120, -60)
-            segments.append((seg_type, angle_change, radius))
-
-        # Generate points around
-        total_angle = 0
-        for seg_type, angle_change, radius in segments:
-            for i in range(segment_points):
-                t = i / segment_points
-                local_angle = angle + t * angle_change
-                x = cx + radius * math.cos(local_angle)
-                y = cy + radius * math.sin(local_angle)
-                points.append((x, y))
-            angle += angle_change
-            total_angle += angle_change
-
-        # Close loop smoothly by blending back to start
-        start_x, start_y = points[0]
-        end_x, end_y = points[-1]
-        for i in range(10):
-            t = i / 10
-            x = end_x + t * (start_x - end_x)
-            y = end_y + t * (start_y - end_y)
-            points.append((x, y))
-
-        # Normalize to center
-        avg_x = sum(p[0] for p in points) / len(points)
-        avg_y = sum(p[1] for p in points) / len(points)
-        points = [(x - avg_x + cx, y - avg_y + cy) for (x, y) in points]
-
-        return points
-
-    # # -------------------------------------------------
-    # # Figure-8 layout (overlapping cross section)
-    # # -------------------------------------------------
-    # def _generate_figure8(self):
-    #     cx, cy = self.center_x, self.center_y
-    #     r = 130
-    #     gap = 40  # center gap between loops
-    #     points = []
-
-    #     # Left loop (counterclockwise)
-    #     for i in range(100):
-    #         a = 2 * math.pi * i / 100
-    #         x = cx - gap - r * math.cos(a)
-    #         y = cy + r * math.sin(a)
-    #         points.append((x, y))
-
-    #     # Right loop (clockwise)
-    #     for i in range(100):
-    #         a = 2 * math.pi * i / 100
-    #         x = cx + gap + r * math.cos(a + math.pi)
-    #         y = cy + r * math.sin(a + math.pi)
-    #         points.append((x, y))
-
-    #     return points
-
-    # # -------------------------------------------------
-    # # Tight technical track with mix of 90° and curved turns
-    # # -------------------------------------------------
-    # def _generate_technical(self):
-    #     """Compact track with mixed tight corners and short straights."""
-    #     cx, cy = self.center_x, self.center_y
-    #     points = []
-
-    #     # Define control points of the track (like a blueprint)
-    #     control = [
-    #         (cx + 200, cy + 150),
-    #         (cx + 200, cy - 100),
-    #         (cx, cy - 200),
-    #         (cx - 200, cy - 100),
-    #         (cx - 200, cy + 50),
-    #         (cx, cy + 200),
-    #     ]
-
-    #     # Interpolate smoothly between control points
-    #     for i in range(len(control)):
-    #         x1, y1 = control[i]
-    #         x2, y2 = control[(i + 1) % len(control)]
-    #         for t in range(25):
-    #             u = t / 25
-    #             px = x1 + (x2 - x1) * u
-    #             py = y1 + (y2 - y1) * u
-    #             points.append((px, py))
-
-    #     return points
-
-    # # -------------------------------------------------
-    # # Simple loop circuit with a realistic chicane
-    # # -------------------------------------------------
-    # def _generate_simple_loop(self):
-    #     """Large loop with smooth turns and a fast chicane section."""
-    #     cx, cy = self.center_x, self.center_y
-    #     radius = 240
-    #     points = []
-
-    #     # Main circle (about 85%)
-    #     for i in range(85):
-    #         a = 2 * math.pi * i / 100
-    #         points.append((cx + radius * math.cos(a), cy + radius * math.sin(a)))
-
-    #     # Add a fast chicane (left-right-left kink)
-    #     start_x, start_y = points[-1]
-    #     chicane = [
-    #         (start_x - 60, start_y - 10),
-    #         (start_x - 90, start_y + 20),
-    #         (start_x - 50, start_y + 40),
-    #         (start_x, start_y + 20),
-    #     ]
-    #     points.extend(chicane)
-
-    #     # Close the remaining arc
-    #     for i in range(85, 100):
-    #         a = 2 * math.pi * i / 100
-    #         points.append((cx + radius * math.cos(a), cy + radius * math.sin(a)))
-
-    #     return points
+    @property
+    def centerline(self):
+        """Closed list of (x, y) points; for a loaded track, built from the memory-mapped points on first use."""
+        if self._centerline is None:
+            self._centerline = [tuple(p) for p in self.points.tolist()]
+        return self._centerline
+
+    @property
+    def index(self):
+        """CenterlineIndex over the centerline; for a loaded track, unpacked from the stored cells on first use."""
+        if self._index is None:
+            cells = tuple(unpack_cells(*self._packed_cells[name]) for name in ("point_cells", "segment_cells"))
+            self._index = CenterlineIndex(self.centerline, self._index_cell_size, cells)
+        return self._index
+
+    def future_heading_table(self, look_ahead):
+        """
+        Heading from each index toward the centerline point look_ahead
+        progress units further along; built once per distance.
+        """
+        if look_ahead not in self.future_headings:
+            ahead = (self.arc_length + look_ahead * TRACK_PROGRESS_UNIT) % self.length
+            x = np.interp(ahead, self.arc_length, self.points[:, 0])
+            y = np.interp(ahead, self.arc_length, self.points[:, 1])
+            self.future_headings[look_ahead] = np.arctan2(y - self.points[:, 1], x - self.points[:, 0])
+        return self.future_headings[look_ahead]
+
+    def _build_gates(self):
+        """
+        One gate per checkpoint: a line across the track, square to the
+        centerline there and TRACK_GATE_MARGIN wider than the track on each
+        side. Gate 0 is the start/finish line.
+        """
+        i = np.asarray(self.checkpoint_indices)
+        self.gate_x = self.points[i, 0]
+        self.gate_y = self.points[i, 1]
+        self.gate_dx = np.cos(self.heading[i]) # Forward direction through the gate
+        self.gate_dy = np.sin(self.heading[i])
+        self.gate_half_width = self.width / 2 + TRACK_GATE_MARGIN
+        self._gate_list = list(zip(self.gate_x.tolist(), self.gate_y.tolist(), self.gate_dx.tolist(), self.gate_dy.tolist()))
+
+        half = self.gate_half_width
+        self.gates = [((x - dy * half, y + dx * half), (x + dy * half, y - dx * half)) for x, y, dx, dy in self._gate_list]
+
+    def gate_crossing(self, gate, x0, y0, x1, y1):
+        """
+        Fraction (0, 1] of the move (x0, y0) => (x1, y1) at which it crosses
+        gate going forwards, or None if it does not. Constant time: a side
+        test against the gate line, then a width check where they meet.
+        """
+        gx, gy, dx, dy = self._gate_list[gate]
+        before = (x0 - gx) * dx + (y0 - gy) * dy
+        after = (x1 - gx) * dx + (y1 - gy) * dy
+        if before >= 0 or after < 0:
+            return None
+        t = before / (before - after)
+        lateral = (x0 + t * (x1 - x0) - gx) * dy - (y0 + t * (y1 - y0) - gy) * dx
+        if abs(lateral) > self.gate_half_width:
+            return None
+        return t
+
+    def kernel_tables(self, look_ahead=None):
+        """
+        (points, arc length, packed point grid, future heading table or None)
+        for utils.kernels. Read-only views of the track arrays, so loaded
+        (memory-mapped) and freshly built tracks use the same compiled kernels.
+        """
+        tables = self._kernel_tables.get(look_ahead)
+        if tables is None:
+            if None not in self._kernel_tables:
+                if self._index is None:
+                    offsets, items, *shape = dense_cell_grid(*self._packed_cells["point_cells"], self._index_cell_size)
+                else:
+                    offsets, items, *shape = self.index.point_grid()
+                grid = (_read_only(offsets), _read_only(items), *shape)
+                self._kernel_tables[None] = (_read_only(self.points), _read_only(self.arc_length), grid, None)
+            if look_ahead is not None:
+                points, arc, grid, _ = self._kernel_tables[None]
+                self._kernel_tables[look_ahead] = (points, arc, grid, _read_only(self.future_heading_table(look_ahead)))
+            tables = self._kernel_tables[look_ahead]
+        return tables
+
+    def curvature_at(self, index):
+        if self._curvature_list is None:
+            self._curvature_list = self.curvature.tolist()
+        return self._curvature_list[index]
+
+    def distance_at(self, index):
+        """Arc length from the start to centerline point index."""
+        if self._arc_list is None:
+            self._arc_list = self.arc_length.tolist()
+        return self._arc_list[index]
+
+    def future_heading_at(self, index, look_ahead):
+        table = self._future_heading_lists.get(look_ahead)
+        if table is None:
+            table = self._future_heading_lists[look_ahead] = self.future_heading_table(look_ahead).tolist()
+        return table[index]
+
+    def point_at_distance(self, s):
+        """(x, y, heading) at arc length s along the centerline, wrapping around the loop."""
+        s %= self.length
+        i = min(int(np.searchsorted(self.arc_length, s, side="right")) - 1, len(self.centerline) - 2)
+        (x0, y0), (x1, y1) = self.centerline[i], self.centerline[i + 1]
+        start, end = float(self.arc_length[i]), float(self.arc_length[i + 1])
+        t = (s - start) / (end - start) if end > start else 0.0
+        return x0 + t * (x1 - x0), y0 + t * (y1 - y0), math.atan2(y1 - y0, x1 - x0)
+
+    def racing_line(self):
+        """
+        Minimum-curvature racing line with its speed profile (see
+        track/racing_line.py). Computed on first use and stored next to the
+        cached track, so later runs just load it.
+        """
+        if self._racing_line is None:
+            from car.car import Car
+            from track.racing_line import RacingLine, compute_racing_line, line_cache_name
+
+            car = Car(0.0, 0.0, verbose=False)
+            path = None
+            if self.cache_path is not None and os.path.isdir(self.cache_path):
+                path = os.path.join(self.cache_path, line_cache_name(
+                    RACING_LINE_SPACING, RACING_LINE_MARGIN, RACING_LINE_ITERATIONS, RACING_LINE_SPEED_FACTOR, car))
+
+            if path is not None and os.path.exists(path):
+                self._racing_line = RacingLine.load(path)
+            else:
+                self._racing_line = compute_racing_line(self, car=car)
+                if path is not None:
+                    self._racing_line.save(path)
+        return self._racing_line
+
+    def closest_point(self, pos, hint=None):
+        """Return (closest_point, index); hint => last known index for a warm start."""
+        if kernels.ENABLED:
+            points, _, grid, _ = self.kernel_tables()
+            i = kernels.closest_index(points, grid, pos[0], pos[1], -1 if hint is None else hint)
+            return self.centerline[i], i
+        return self.index.closest_point(pos, hint)
+
+    def project(self, pos, hint=None):
+        """Return (point, segment_index, t) of the closest point on the centerline segments."""
+        return self.index.project(pos, hint)
+
+    def progress(self, pos, hint=None):
+        """
+        (distance along the track, closest index, distance to the centerline)
+        for pos, projected onto the two segments either side of its closest
+        point: continuous progress however far apart the points are.
+        """
+        if kernels.ENABLED:
+            points, arc, grid, _ = self.kernel_tables()
+            return kernels.progress(points, arc, grid, pos[0], pos[1], -1 if hint is None else hint)
+
+        _, i = self.index.closest_point(pos, hint)
+        points = self.centerline
+        if self._arc_list is None:
+            self._arc_list = self.arc_length.tolist()
+        arc = self._arc_list
+        last = len(points) - 1 # Same point as index 0
+        if i == last:
+            i = 0
+        prev = i - 1 if i > 0 else last - 1
+        x, y = pos
+
+        best = None
+        for a in (i, prev): # The segment leaving i wins ties, so index 0 is progress 0
+            (ax, ay), (bx, by) = points[a], points[a + 1]
+            abx = bx - ax
+            aby = by - ay
+            length_sq = abx * abx + aby * aby
+            t = 0.0 if length_sq == 0 else max(0.0, min(1.0, ((x - ax) * abx + (y - ay) * aby) / length_sq))
+            d = math.hypot(x - (ax + t * abx), y - (ay + t * aby))
+            if best is None or d < best[0]:
+                best = (d, arc[a] + t * (arc[a + 1] - arc[a]))
+        return best[1], i, best[0]
+
+    def unwrap_progress(self, along, origin):
+        """
+        along (from progress()) shifted by a lap where needed to lie within
+        half a lap of origin, so a move across the start line still scores
+        as a small step forward instead of a lap backwards.
+        """
+        if along - origin > self.length / 2:
+            return along - self.length
+        if origin - along > self.length / 2:
+            return along + self.length
+        return along
 
     def draw(self, surface):
+        import pygame
+
         if len(self.centerline) > 1:
             pygame.draw.lines(surface, TRACK_COLOR, True, self.centerline, self.width)
             pygame.draw.lines(surface, TRACK_BORDER_COLOR, True, self.centerline, 2)
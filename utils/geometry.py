@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 def distance(p1, p2):
     return math.hypot(p2[0] - p1[0], p2[1] - p1[1])
 
@@ -55,4 +57,155 @@ def get_future_heading(centerline, current_index, look_ahead=30):
     future = centerline[future_index]
     dx = future[0] - curr[0]
     dy = future[1] - curr[1]
-    return math.atan2(dy, dx)
\ No newline at end of file
+    return math.atan2(dy, dx)
+
+def project_point_on_segment(p, a, b):
+    """Return (projected_point, t) of p onto segment a-b, t in [0, 1]."""
+    abx = b[0] - a[0]
+    aby = b[1] - a[1]
+    length_sq = abx * abx + aby * aby
+    if length_sq == 0:
+        return a, 0.0
+    t = ((p[0] - a[0]) * abx + (p[1] - a[1]) * aby) / length_sq
+    t = max(0.0, min(1.0, t))
+    return (a[0] + t * abx, a[1] + t * aby), t
+
+
+def dense_cell_grid(keys, offsets, items, cell_size):
+    """
+    Cells stored sparsely as CSR arrays (keys (k, 2) in sorted order,
+    offsets, items) as a dense grid over the occupied cell range:
+    (offsets, items, min_cx, min_cy, columns, rows, cell_size). Cell
+    (cx, cy) holds items[offsets[k]:offsets[k + 1]] with
+    k = (cx - min_cx) * rows + (cy - min_cy). Sorted keys are already in
+    that order, so items is reused as is (no copy of a memory map).
+    """
+    keys = np.asarray(keys)
+    min_cx, min_cy = keys.min(axis=0).tolist()
+    max_cx, max_cy = keys.max(axis=0).tolist()
+    columns = max_cx - min_cx + 1
+    rows = max_cy - min_cy + 1
+    counts = np.zeros(columns * rows, dtype=np.int64)
+    counts[(keys[:, 0] - min_cx) * rows + (keys[:, 1] - min_cy)] = np.diff(offsets)
+    return np.concatenate(([0], np.cumsum(counts))), items, min_cx, min_cy, columns, rows, float(cell_size)
+
+
+class CenterlineIndex:
+    """
+    Uniform grid over the centerline points and segments.
+    Queries only visit the cells that can hold something closer than the
+    best candidate so far, so cost no longer grows with the point count.
+    """
+
+    def __init__(self, centerline, cell_size=40.0, cells=None):
+        self.points = centerline
+        self.cell_size = cell_size
+        self.n = len(centerline)
+
+        # cells => (point_cells, segment_cells) loaded from a track cache
+        if cells is not None:
+            self.point_cells, self.segment_cells = cells
+        else:
+            self._build_cells(centerline)
+
+        cells = list(self.point_cells) + list(self.segment_cells)
+        self.min_cell = (min(c[0] for c in cells), min(c[1] for c in cells))
+        self.max_cell = (max(c[0] for c in cells), max(c[1] for c in cells))
+
+    def _build_cells(self, centerline):
+        # cell -> point indices (ascending, so ties resolve like the linear scan)
+        self.point_cells = {}
+        for i, (x, y) in enumerate(centerline):
+            self.point_cells.setdefault(self._cell(x, y), []).append(i)
+
+        # cell -> segment indices; segment i runs from point i to point i + 1
+        self.segment_cells = {}
+        for i in range(self.n):
+            a = centerline[i]
+            b = centerline[(i + 1) % self.n]
+            cx0, cy0 = self._cell(min(a[0], b[0]), min(a[1], b[1]))
+            cx1, cy1 = self._cell(max(a[0], b[0]), max(a[1], b[1]))
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    self.segment_cells.setdefault((cx, cy), []).append(i)
+
+    def point_grid(self):
+        """point_cells as a dense_cell_grid, for utils.kernels."""
+        keys = sorted(self.point_cells)
+        offsets = np.concatenate(([0], np.cumsum([len(self.point_cells[k]) for k in keys])))
+        items = np.array([i for k in keys for i in self.point_cells[k]], dtype=np.int64)
+        return dense_cell_grid(np.array(keys, dtype=np.int64), offsets, items, self.cell_size)
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def _cells_within(self, pos, radius):
+        """All occupied-range cells overlapping the square of half-size radius."""
+        cx0, cy0 = self._cell(pos[0] - radius, pos[1] - radius)
+        cx1, cy1 = self._cell(pos[0] + radius, pos[1] + radius)
+        cx0, cy0 = max(cx0, self.min_cell[0]), max(cy0, self.min_cell[1])
+        cx1, cy1 = min(cx1, self.max_cell[0]), min(cy1, self.max_cell[1])
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                yield cx, cy
+
+    def _initial_radius(self, pos):
+        """Grow a search square until it holds a point; return that point's distance."""
+        radius = self.cell_size
+        while True:
+            found = [
+                distance(pos, self.points[i])
+                for cell in self._cells_within(pos, radius)
+                for i in self.point_cells.get(cell, ())
+            ]
+            if found:
+                return min(found)
+            radius *= 2
+
+    def _walk_nearest(self, pos, hint):
+        """Local descent along the polyline from a previous index."""
+        best_i = hint % self.n
+        best_d = distance(pos, self.points[best_i])
+        for step in (1, -1):
+            i = best_i
+            while True:
+                j = (i + step) % self.n
+                d = distance(pos, self.points[j])
+                if d >= best_d:
+                    break
+                best_i, best_d, i = j, d, j
+        return best_d
+
+    def closest_point(self, car_pos, hint=None):
+        """Same result as closest_point_on_track(car_pos, centerline)."""
+        if hint is None:
+            radius = self._initial_radius(car_pos)
+        else:
+            radius = self._walk_nearest(car_pos, hint)
+
+        best_d = float('inf')
+        best_i = 0
+        for cell in self._cells_within(car_pos, radius):
+            for i in self.point_cells.get(cell, ()):
+                d = distance(car_pos, self.points[i])
+                if d < best_d or (d == best_d and i < best_i):
+                    best_d = d
+                    best_i = i
+        return self.points[best_i], best_i
+
+    def project(self, car_pos, hint=None):
+        """Return (projected_point, segment_index, t) of the closest point on any segment."""
+        # Nearest vertex distance bounds the nearest segment distance
+        if hint is None:
+            radius = distance(car_pos, self.closest_point(car_pos)[0])
+        else:
+            radius = self._walk_nearest(car_pos, hint)
+
+        best = (float('inf'), 0, self.points[0], 0.0)
+        for cell in self._cells_within(car_pos, radius):
+            for i in self.segment_cells.get(cell, ()):
+                point, t = project_point_on_segment(car_pos, self.points[i], self.points[(i + 1) % self.n])
+                d = distance(car_pos, point)
+                if d < best[0] or (d == best[0] and i < best[1]):
+                    best = (d, i, point, t)
+        return best[2], best[1], best[3]
@@ -0,0 +1,312 @@
+# utils/kernels.py
+"""
+Optional compiled versions of the per-tick inner loops: closest point
+(the same CenterlineIndex grid search and warm start, over a packed copy
+of its point cells) and progress along the track, and the HeuristicAgent
+hold search (rollout physics included). They are written as plain Python
+over NumPy arrays, with the same arithmetic as the paths they replace,
+and compiled with numba when it is installed.
+
+ENABLED tells Track and HeuristicAgent to call them. With KERNEL_BACKEND =
+"auto" it turns on in warm_up(), which long-running entry points
+(tournament, optimizer, benchmarks) call before any race starts, so a
+single race never pays for importing numba in its first tick and never
+switches paths partway through. "numba" turns it on from import, "python"
+never. numba is only imported on the first kernel call or warm_up(), and
+compiled kernels are stored in KERNEL_CACHE_DIR, so later runs and pool
+workers load them instead of compiling again.
+"""
+import argparse
+import contextlib
+import importlib.util
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+from config import KERNEL_BACKEND, KERNEL_CACHE_DIR
+
+if KERNEL_BACKEND not in ("auto", "numba", "python"):
+    raise ValueError(f"Unknown KERNEL_BACKEND {KERNEL_BACKEND!r}, expected 'auto', 'numba' or 'python'")
+COMPILED = KERNEL_BACKEND != "python" and importlib.util.find_spec("numba") is not None
+if KERNEL_BACKEND == "numba" and not COMPILED:
+    raise ImportError("KERNEL_BACKEND is 'numba' but numba is not installed (pip install numba)")
+ENABLED = KERNEL_BACKEND == "numba" # "auto" => set by warm_up()
+
+
+# -------------------------------------------------
+# Kernels
+# -------------------------------------------------
+def _nearest_in(points, grid, x, y, radius):
+    """(index, distance) of the nearest point in the grid cells within radius of (x, y), lowest index on ties; (-1, inf) if none."""
+    offsets, items, min_cx, min_cy, columns, rows, cell_size = grid
+    cx0 = max(math.floor((x - radius) / cell_size) - min_cx, 0)
+    cx1 = min(math.floor((x + radius) / cell_size) - min_cx, columns - 1)
+    cy0 = max(math.floor((y - radius) / cell_size) - min_cy, 0)
+    cy1 = min(math.floor((y + radius) / cell_size) - min_cy, rows - 1)
+    best_i = -1
+    best_d = math.inf
+    for cx in range(cx0, cx1 + 1):
+        for cy in range(cy0, cy1 + 1):
+            k = cx * rows + cy
+            for j in range(offsets[k], offsets[k + 1]):
+                i = items[j]
+                d = math.hypot(points[i, 0] - x, points[i, 1] - y)
+                if d < best_d or (d == best_d and i < best_i):
+                    best_d = d
+                    best_i = i
+    return best_i, best_d
+
+
+def _walk_radius(points, x, y, hint):
+    """CenterlineIndex._walk_nearest: local descent from hint, returns the distance reached."""
+    n = len(points)
+    best_i = hint % n
+    best_d = math.hypot(points[best_i, 0] - x, points[best_i, 1] - y)
+    for step in (1, -1):
+        i = best_i
+        while True:
+            j = (i + step) % n
+            d = math.hypot(points[j, 0] - x, points[j, 1] - y)
+            if d >= best_d:
+                break
+            best_i = j
+            best_d = d
+            i = j
+    return best_d
+
+
+def closest_index(points, grid, x, y, hint):
+    """CenterlineIndex.closest_point over its packed point grid (see point_grid); hint < 0 => no warm start."""
+    if hint < 0:
+        radius = grid[6]
+        while True:
+            i, d = _nearest_in(points, grid, x, y, radius)
+            if i >= 0:
+                radius = d
+                break
+            radius *= 2
+    else:
+        radius = _walk_radius(points, x, y, hint)
+    return _nearest_in(points, grid, x, y, radius)[0]
+
+
+def progress(points, arc, grid, x, y, hint):
+    """Track.progress for (x, y) over the closed centerline points with arc lengths arc."""
+    i = closest_index(points, grid, x, y, hint)
+    last = len(points) - 1 # Same point as index 0
+    if i == last:
+        i = 0
+    prev = i - 1 if i > 0 else last - 1
+
+    best_d = math.inf
+    best_s = 0.0
+    for a in (i, prev): # The segment leaving i wins ties, so index 0 is progress 0
+        ax = points[a, 0]
+        ay = points[a, 1]
+        abx = points[a + 1, 0] - ax
+        aby = points[a + 1, 1] - ay
+        length_sq = abx * abx + aby * aby
+        t = 0.0 if length_sq == 0 else max(0.0, min(1.0, ((x - ax) * abx + (y - ay) * aby) / length_sq))
+        d = math.hypot(x - (ax + t * abx), y - (ay + t * aby))
+        if d < best_d:
+            best_d = d
+            best_s = arc[a] + t * (arc[a + 1] - arc[a])
+    return best_s, i, best_d
+
+
+def hold_scores(x, y, angle, speed, turns, depth, points, arc, grid, hint, future_heading, half_width,
+                progress_weight, centering_weight, off_track_penalty, unit):
+    """
+    HeuristicAgent hold search: for each turn in turns, hold it for depth
+    steps and score the end state like HeuristicAgent._evaluate (hint =>
+    the car's track index, -1 if none; progress is unwrapped around its arc
+    length like Track.unwrap_progress). Returns rows of (score, x, y).
+    """
+    out = np.empty((len(turns), 3))
+    length = arc[len(arc) - 1]
+    for k in range(len(turns)):
+        nx, ny, nangle = x, y, angle
+        for _ in range(depth):
+            nangle += turns[k]
+            nx = nx + speed * math.cos(nangle)
+            ny = ny + speed * math.sin(nangle)
+
+        along, idx, dist = progress(points, arc, grid, nx, ny, hint)
+        if hint >= 0:
+            if along - arc[hint] > length / 2:
+                along -= length
+            elif arc[hint] - along > length / 2:
+                along += length
+        progress_score = progress_weight * along / unit
+        centering_penalty = -centering_weight * dist
+        collision_penalty = -off_track_penalty if dist > half_width else 0.0
+        heading_error = abs(math.atan2(math.sin(nangle - future_heading[idx]), math.cos(nangle - future_heading[idx])))
+        out[k, 0] = progress_score + centering_penalty + collision_penalty + -0.5 * heading_error
+        out[k, 1] = nx
+        out[k, 2] = ny
+    return out
+
+
+# -------------------------------------------------
+# Compilation
+# -------------------------------------------------
+_PYTHON_KERNELS = {f.__name__: f for f in (_nearest_in, _walk_radius, closest_index, progress, hold_scores)}
+_compiled = False
+
+
+def _compile():
+    global _compiled
+    if _compiled:
+        return
+    if KERNEL_CACHE_DIR:
+        os.environ.setdefault("NUMBA_CACHE_DIR", os.path.abspath(KERNEL_CACHE_DIR)) # Read when numba is imported
+    import numba
+
+    # Kernels calling each other resolve the compiled versions, since all are swapped in before any compiles.
+    # nogil => a simulation thread running one lets the window thread draw meanwhile
+    for name, func in _PYTHON_KERNELS.items():
+        globals()[name] = numba.njit(cache=True, nogil=True)(func)
+    _compiled = True
+
+
+def _compile_on_first_call(name):
+    def call(*args):
+        _compile()
+        return globals()[name](*args)
+    return call
+
+
+if COMPILED:
+    for _name in _PYTHON_KERNELS:
+        globals()[_name] = _compile_on_first_call(_name)
+
+
+def warm_up():
+    """
+    Compile (or load from KERNEL_CACHE_DIR) every kernel now and enable
+    them, e.g. before starting pool workers. No-op without numba.
+    """
+    global ENABLED
+    if not COMPILED:
+        return
+    _compile()
+
+    # Tables of a tiny track have the same types as the real calls, so these are the specialisations they use
+    from track.track import Track
+
+    points, arc, grid, heading = Track.from_centerline([(0.0, 0.0), (10.0, 0.0), (0.0, 10.0)]).kernel_tables(10)
+    closest_index(points, grid, 1.0, 1.0, -1)
+    progress(points, arc, grid, 1.0, 1.0, 0)
+    hold_scores(1.0, 1.0, 0.0, 1.0, (-0.1, 0.1, 0.0), 3, points, arc, grid, 0, heading, 100.0, 1.0, 0.1, 1000.0, 6.0)
+    ENABLED = True
+
+
+@contextlib.contextmanager
+def override(enabled):
+    """Run the block with ENABLED set to enabled; the previous value is restored afterwards, also on errors."""
+    global ENABLED
+    saved = ENABLED
+    ENABLED = enabled
+    try:
+        yield
+    finally:
+        ENABLED = saved
+
+
+# -------------------------------------------------
+# Equivalence with the pure-Python paths
+# -------------------------------------------------
+# Largest difference check() accepts per comparison. Indices and decisions
+# must match exactly. numba's hypot can differ from CPython's by one ulp,
+# so distances and progress may move by rounding error (~1e-13 px) but no
+# more. The race compares car states, so a flipped decision fails it.
+CHECK_TOLERANCES = {"closest_index": 0, "progress": 1e-9, "decide_action": 0, "race": 1e-9}
+
+
+def check(seeds=(1, 2, 3), samples=500, ticks=600, tolerances=CHECK_TOLERANCES):
+    """
+    Pins the kernels to the paths they replace over seeded tracks:
+    {comparison: (worst difference or mismatch count, tolerance, passed)}.
+    Without numba the kernels run as plain Python, which still checks
+    their logic. The race check steps the same race with ENABLED off and on.
+    tests/test_kernels.py asserts these; python -m utils.kernels prints them.
+    """
+    import random
+
+    from ai.heuristic_agent import HeuristicAgent
+    from car.car import Car
+    from config import AGGRESSIVE_AGENT
+    from race.simulation import RaceSimulation
+    from track.track import Track
+
+    worst = {"closest_index": 0, "progress": 0.0, "decide_action": 0, "race": 0.0}
+    for seed in seeds:
+        track = Track(seed=seed)
+        rng = random.Random(seed)
+        points, arc, grid, _ = track.kernel_tables()
+        positions = []
+        hints = [] # Warm starts near (not at) each position's index, and none
+        for _ in range(samples):
+            i = rng.randrange(len(track.centerline))
+            x, y = track.centerline[i]
+            positions.append((x + rng.uniform(-track.width, track.width), y + rng.uniform(-track.width, track.width)))
+            hints.append(rng.choice((None, (i + rng.randint(-20, 20)) % len(track.centerline))))
+
+        with override(False):
+            for (x, y), hint in zip(positions, hints):
+                k_hint = -1 if hint is None else hint
+                _, i = track.closest_point((x, y), hint)
+                worst["closest_index"] += closest_index(points, grid, x, y, k_hint) != i
+                along, i, d = track.progress((x, y), hint)
+                k_along, k_i, k_d = progress(points, arc, grid, x, y, k_hint)
+                worst["progress"] = max(worst["progress"], float(abs(k_along - along)), float(abs(k_d - d)), float(k_i != i))
+
+        agent = HeuristicAgent(**AGGRESSIVE_AGENT)
+        for x, y in positions:
+            car = Car(x, y, angle=rng.uniform(-math.pi, math.pi), verbose=False)
+            car.speed = rng.uniform(0, car.max_speed)
+            with override(False):
+                expected = agent.decide_action(car, track)
+            with override(True):
+                worst["decide_action"] += agent.decide_action(car, track) != expected
+
+        states = []
+        for enabled in (False, True):
+            with override(enabled):
+                sim = RaceSimulation(track=track)
+                sim.run(ticks)
+            states.append(np.array([(car.x, car.y, car.angle, car.speed, car.lap_count) for car in sim.cars]))
+        worst["race"] = max(worst["race"], float(np.max(np.abs(states[0] - states[1]))))
+    return {name: (value, tolerances[name], value <= tolerances[name]) for name, value in worst.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m utils.kernels",
+                                     description="Compile and cache the kernels, then check them against the Python paths "
+                                                 "(exit status 1 if they differ beyond CHECK_TOLERANCES)")
+    parser.add_argument("--no-check", action="store_true", help="only compile")
+    args = parser.parse_args()
+
+    # Run as python -m this file is __main__; Track and HeuristicAgent read ENABLED from the imported module
+    from utils import kernels
+
+    start = time.perf_counter()
+    kernels.warm_up()
+    backend = "numba" if kernels.COMPILED else "python (numba not installed or KERNEL_BACKEND = 'python')"
+    print(f"kernels: {backend}, ready in {time.perf_counter() - start:.2f}s")
+
+    if not args.no_check:
+        results = kernels.check()
+        for name, (value, tolerance, passed) in results.items():
+            print(f"{name:15s} {value:<12g} tolerance {tolerance:<8g} {'ok' if passed else 'FAIL'}")
+        failed = [name for name, (_, _, passed) in results.items() if not passed]
+        if failed:
+            print(f"kernels differ from the Python paths beyond tolerance: {', '.join(failed)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
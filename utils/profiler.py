@@ -0,0 +1,138 @@
+import csv
+import json
+import time
+from collections import deque
+
+from config import PROFILER_WINDOW
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    i = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[i]
+
+
+class Profiler:
+    """
+    Per-phase timings over a rolling window of ticks plus counters for the
+    expensive calls. Nothing is patched or timed until enable(); callers hold
+    a Profiler only while profiling, so the disabled path has no extra work.
+    """
+
+    def __init__(self, window=PROFILER_WINDOW):
+        self.window = window
+        self.phases = {} # phase -> deque of seconds per tick
+        self.counters = {} # call name -> total calls
+        self.ticks = 0
+        self._patches = []
+
+    # -------------------------------------------------
+    # Timing
+    # -------------------------------------------------
+    def time(self, phase, func, *args):
+        """Run func(*args) and add its duration to phase."""
+        start = time.perf_counter()
+        result = func(*args)
+        self.add(phase, time.perf_counter() - start)
+        return result
+
+    def add(self, phase, seconds):
+        samples = self.phases.get(phase)
+        if samples is None:
+            samples = self.phases[phase] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def tick(self):
+        self.ticks += 1
+
+    # -------------------------------------------------
+    # Call counters
+    # -------------------------------------------------
+    def enable(self):
+        """Wrap the expensive calls with counters."""
+        from ai.fuzzy import FuzzyTable
+        import ai.fuzzy
+        from ai.heuristic_agent import HeuristicAgent
+        from track.track import Track
+        from utils import kernels
+        from utils.geometry import CenterlineIndex
+
+        self._count_calls(CenterlineIndex, "closest_point", "closest_point")
+        self._count_calls(CenterlineIndex, "project", "project")
+        self._count_calls(FuzzyTable, "lookup", "fuzzy_table_lookup")
+        self._count_calls(ai.fuzzy, "compute_fuzzy_acceleration", "fuzzy_compute")
+        self._count_calls(HeuristicAgent, "_evaluate", "rollout_evaluation")
+
+        # Compiled kernels never reach the methods above; count the same queries where they are entered
+        self._count_calls(Track, "closest_point", "closest_point", calls=lambda *args: int(kernels.ENABLED))
+        self._count_calls(Track, "progress", "closest_point", calls=lambda *args: int(kernels.ENABLED))
+        self._count_calls(HeuristicAgent, "_kernel_scores", "rollout_evaluation", "closest_point",
+                          calls=lambda agent, car, track: len(agent.actions))
+        return self
+
+    def disable(self):
+        for owner, name, original in reversed(self._patches):
+            setattr(owner, name, original)
+        self._patches = []
+
+    def _count_calls(self, owner, name, *names, calls=None):
+        """Add to counters names on every owner.name call; calls(*args) => how many calls it stands for (default 1)."""
+        original = getattr(owner, name)
+        counters = self.counters
+        for counter in names:
+            counters.setdefault(counter, 0)
+
+        def counted(*args, **kwargs):
+            n = 1 if calls is None else calls(*args)
+            for counter in names:
+                counters[counter] += n
+            return original(*args, **kwargs)
+
+        setattr(owner, name, counted)
+        self._patches.append((owner, name, original))
+
+    # -------------------------------------------------
+    # Reporting
+    # -------------------------------------------------
+    def stats(self):
+        """{phase: {mean, p50, p95, p99} in ms} over the window, plus calls per tick."""
+        # Copies first: with a simulation thread, samples are added while the window reads them
+        phases = {}
+        for phase, samples in list(self.phases.items()):
+            values = sorted(samples.copy())
+            phases[phase] = {
+                "samples": len(values),
+                "mean_ms": 1000 * sum(values) / len(values) if values else 0.0,
+                "p50_ms": 1000 * _percentile(values, 0.50),
+                "p95_ms": 1000 * _percentile(values, 0.95),
+                "p99_ms": 1000 * _percentile(values, 0.99),
+            }
+        calls = {
+            name: {"total": total, "per_tick": total / self.ticks if self.ticks else 0.0}
+            for name, total in list(self.counters.items())
+        }
+        return {"ticks": self.ticks, "phases": phases, "calls": calls}
+
+    def overlay_lines(self):
+        """Short text lines for the in-game overlay."""
+        stats = self.stats()
+        lines = [f"{phase:<13} p50 {s['p50_ms']:6.3f}  p95 {s['p95_ms']:6.3f}  p99 {s['p99_ms']:6.3f} ms"
+                 for phase, s in stats["phases"].items()]
+        lines += [f"{name:<20} {c['per_tick']:8.1f} /tick" for name, c in stats["calls"].items()]
+        return lines
+
+    def export(self, path):
+        """Write stats as JSON, or as CSV when path ends in .csv."""
+        stats = self.stats()
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["kind", "name", "samples_or_total", "mean_ms_or_per_tick", "p50_ms", "p95_ms", "p99_ms"])
+                for phase, s in stats["phases"].items():
+                    writer.writerow(["phase", phase, s["samples"], s["mean_ms"], s["p50_ms"], s["p95_ms"], s["p99_ms"]])
+                for name, c in stats["calls"].items():
+                    writer.writerow(["calls", name, c["total"], c["per_tick"], "", "", ""])
+        else:
+            with open(path, "w") as f:
+                json.dump(stats, f, indent=2)